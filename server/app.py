@@ -1,30 +1,324 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, g, redirect, request, jsonify, send_file, url_for
+from werkzeug.utils import safe_join
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from flask_cors import CORS
-from PIL import Image
 import io
+import itertools
 import json
+import math
+import base64
 import tempfile
+import shutil
 from datetime import datetime
 import os
 
 from helpers.ExifHelper import ExifHelper
-from helpers.LocationHelper import LocationHelper
-from helpers.VideoHelper import VideoHelper
+from helpers.LocationHelper import LocationHelper, PathStatsAccumulator
+from helpers.VideoHelper import VideoHelper, ENCODE_PROFILES
 from helpers.GeotaggerHelper import GeotaggerHelper
 from helpers.GeotaggerHelperInterval import GeotaggerHelperInterval
+from helpers.PhotoGeotaggerHelper import PhotoGeotaggerHelper
+from helpers.MissionGeotaggerHelper import MissionGeotaggerHelper
+from helpers.FrameCacheHelper import FrameCacheHelper
+from helpers.UploadHelper import UploadHelper, SpoolingRequest
+from helpers.ResultCacheHelper import ResultCacheHelper
+from helpers.AdmissionHelper import AdmissionHelper, AdmissionRejected
+from helpers.ResponseHelper import ResponseHelper
+from helpers.ThumbnailHelper import ThumbnailHelper, THUMBNAIL_SIZES
+from helpers.ResumableUploadHelper import ResumableUploadHelper, OffsetMismatchError, is_content_hash
+from helpers.FrameIndexHelper import FrameIndexHelper, to_epoch
+from helpers.FrameWriterHelper import FrameWriterHelper
+from helpers.FrameRingHelper import ring_size
+from helpers.FrameStorageHelper import LocalFrameStorage, create_frame_storage
+from helpers.FrameTimelineHelper import FrameTimelineHelper
+
+# Uploads, caches, stored videos and geotagged frames live under this directory
+DATA_DIR = os.environ.get('GEOTAGGER_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+
+# Server processes running this app (set by gunicorn.conf.py). Memory budgets and job slots below
+# are totals for the machine; each process gets its share, since every worker has its own copy
+PROCESSES = max(1, int(os.environ.get('GEOTAGGER_PROCESSES', 1)))
+
+def process_share(total):
+    """This process's part of a machine-wide limit, at least 1."""
+    return max(1, total // PROCESSES)
+
+# Uploaded files are streamed to spool files while the body is parsed, never read into memory.
+# Same filesystem as video_store, so stored videos are hard links instead of copies
+UPLOAD_SPOOL_DIR = os.path.join(DATA_DIR, 'upload_spool')
+SpoolingRequest.spool_dir = UPLOAD_SPOOL_DIR
+
+# Resumable uploads; finished files are kept by SHA-256 and can be referenced by hash
+RESUMABLE_UPLOADS = ResumableUploadHelper(
+    upload_dir=os.path.join(DATA_DIR, 'upload_sessions'),
+    blob_dir=os.path.join(DATA_DIR, 'upload_store')
+)
 
 app = Flask(__name__)
+app.request_class = SpoolingRequest
 # Enable CORS for all routes
 CORS(app)
 
+# Uploaded videos are kept here (by content hash) so frames can be fetched lazily
+VIDEO_STORE_DIR = os.path.join(DATA_DIR, 'video_store')
+
+# Encoded preview frames shared by all requests (memory tier + disk tier)
+FRAME_CACHE = FrameCacheHelper(
+    cache_dir=os.path.join(DATA_DIR, 'frame_cache'),
+    memory_budget=process_share(256 * 1024 * 1024),
+    disk_budget=2 * 1024 * 1024 * 1024,
+    processes=PROCESSES
+)
+
+# Presentation timestamp and keyframe flag of every frame, indexed once per video (by content
+# hash) from its packets; maps times to frames exactly and picks seek targets
+FRAME_TIMELINES = FrameTimelineHelper(os.path.join(DATA_DIR, 'frame_timelines'))
+
+# Geotagged frames written by the geotagger endpoints
+DRONE_FRAMES_DIR = os.path.join(DATA_DIR, 'drone_frames')
+
+# Where the frames are stored: drone_frames, or s3://bucket/prefix (uploaded in the
+# background; GEOTAGGER_S3_ENDPOINT_URL points at MinIO or another S3 compatible service)
+FRAME_STORAGE = create_frame_storage(
+    os.environ.get('GEOTAGGER_FRAME_STORAGE', DRONE_FRAMES_DIR),
+    endpoint_url=os.environ.get('GEOTAGGER_S3_ENDPOINT_URL'),
+    region_name=os.environ.get('GEOTAGGER_S3_REGION')
+)
+
+# Position, time and source video of every stored frame, for spatial queries
+FRAME_INDEX = FrameIndexHelper(
+    db_path=os.path.join(DATA_DIR, 'frame_index', 'frames.sqlite3'),
+    frames_dir=DRONE_FRAMES_DIR,
+    storage=FRAME_STORAGE
+)
+FRAME_SEARCH_LIMIT = 1000
+FRAME_SEARCH_MAX_LIMIT = 10000
+
+# Resized drone frames for the galleries, keyed by source content hash
+THUMBNAILS = ThumbnailHelper(FrameCacheHelper(
+    cache_dir=os.path.join(DATA_DIR, 'thumbnail_cache'),
+    memory_budget=process_share(64 * 1024 * 1024),
+    disk_budget=1024 * 1024 * 1024,
+    processes=PROCESSES
+))
+
+# Manifests of finished geotagging jobs; the frames stay in the frame storage
+RESULT_CACHE = ResultCacheHelper(
+    cache_dir=os.path.join(DATA_DIR, 'result_cache'),
+    max_entries=256,
+    frames_exist=FRAME_STORAGE.exists_all
+)
+
+# Admission control for heavy endpoints: concurrency slots per endpoint, one shared
+# memory budget for the estimated peak of every running job, and a bounded wait queue.
+# Split between the server processes; every process keeps at least one slot per endpoint
+ADMISSION = AdmissionHelper(memory_budget=process_share(2 * 1024 * 1024 * 1024),
+                            max_queue=process_share(16), queue_timeout=30)
+ADMISSION.register('split-video', slots=process_share(4))
+ADMISSION.register('interpolate-path', slots=process_share(4))
+ADMISSION.register('geotagger-video', slots=process_share(2))
+ADMISSION.register('geotagger-photos', slots=process_share(2))
+ADMISSION.register('geotagger-mission', slots=process_share(1))
+
+# Encoder processes per geotagging job, fed through a shared-memory frame ring;
+# 0 encodes in the request thread
+ENCODE_WORKERS = int(os.environ.get('GEOTAGGER_ENCODE_WORKERS', 0))
+
+# Worker pool for batch EXIF reading and writing (mostly file I/O, so more threads than cores)
+METADATA_POOL = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4), thread_name_prefix='exif-reader')
+METADATA_EXTENSIONS = ('.jpg', '.jpeg', '.tif', '.tiff')
+
+FRAME_MODES = ('url', 'inline')
+
+def get_frame_mode():
+    """Read the frame_mode form field: 'url' (default) or 'inline' base64."""
+    frame_mode = request.form.get('frame_mode', 'url')
+    if frame_mode not in FRAME_MODES:
+        raise ValueError(f"frame_mode must be one of: {', '.join(FRAME_MODES)}")
+    return frame_mode
+
+def get_encode_profile():
+    """Read the encode_profile form field, defaulting to the fast preview profile."""
+    encode_profile = request.form.get('encode_profile', 'preview')
+    if encode_profile not in ENCODE_PROFILES:
+        raise ValueError(f"encode_profile must be one of: {', '.join(ENCODE_PROFILES)}")
+    return encode_profile
+
+def get_time_range():
+    """
+    Read the start/end form fields: seconds into the video, or ISO 8601 UTC
+    times matched against the flight log. Raises ValueError.
+    """
+    bounds = []
+    for name in ('start', 'end'):
+        value = request.form.get(name, '').strip()
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            bounds.append(float(value))
+        except ValueError:
+            try:
+                bounds.append(datetime.fromisoformat(value.replace('Z', '+00:00')))
+            except ValueError:
+                raise ValueError(f"{name} must be seconds into the video or an ISO 8601 time")
+    return tuple(bounds)
+
+def get_frame_interval():
+    """
+    Read the frame_interval form field: seconds between saved frames,
+    1 by default. Raises ValueError.
+    """
+    try:
+        frame_interval = float(request.form.get('frame_interval', 1))
+    except ValueError:
+        raise ValueError("frame_interval must be a number")
+    if not math.isfinite(frame_interval) or frame_interval <= 0:
+        raise ValueError("frame_interval must be a positive number of seconds")
+    return frame_interval
+
+def get_frame_writer():
+    """
+    Read the output_format (jpeg, webp, avif), quality and speed form fields
+    for geotagged frames. Raises ValueError.
+    """
+    quality = request.form.get('quality')
+    try:
+        quality = int(quality) if quality else None
+    except ValueError:
+        raise ValueError("quality must be an integer")
+    return FrameWriterHelper(request.form.get('output_format', 'jpeg'), quality, request.form.get('speed') or None)
+
+def frame_url(video_id, frame_number, encode_profile):
+    """Build the absolute URL of a lazily encoded frame."""
+    return url_for('get_video_frame', video_id=video_id, encode_profile=encode_profile,
+                   frame_number=frame_number, _external=True)
+
+def resolve_upload(field):
+    """
+    Path and SHA-256 of the file sent as <field>, or of a finished resumable
+    upload referenced by the <field>_hash form field.
+    
+    Returns (None, None) when neither is present; raises ValueError for an unknown hash.
+    """
+    if field in request.files:
+        upload_helper = UploadHelper()
+        file = request.files[field]
+        return upload_helper.get_path(file), upload_helper.get_hash(file)
+    
+    content_hash = request.form.get(f'{field}_hash')
+    if not content_hash:
+        return None, None
+    
+    path = RESUMABLE_UPLOADS.get_blob_path(content_hash)
+    if path is None:
+        raise ValueError(f"Unknown {field}_hash: {content_hash}")
+    return path, content_hash
+
+def admit_job(endpoint, memory=0):
+    """Hold an admission slot for endpoint until the response body is closed; raises AdmissionRejected."""
+    ticket = ADMISSION.admit(endpoint, memory)
+    g.setdefault('admission_tickets', []).append(ticket)
+
+def admission_rejected_response(error):
+    """429 with a Retry-After estimate."""
+    response = jsonify({'error': str(error)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.after_request
+def hold_admission(response):
+    # A streamed body is produced after the view returns (and after teardown_request), so the
+    # slots are released when the server closes the body, once it is sent or the client is gone
+    tickets = g.pop('admission_tickets', [])
+    if tickets:
+        response.call_on_close(lambda: [ticket.release() for ticket in tickets])
+    return response
+
+@app.teardown_request
+def release_admission(exception=None):
+    # Requests that failed before a response was made; tickets handed to a response are gone from g
+    for ticket in g.pop('admission_tickets', []):
+        ticket.release()
+
 # Configure CORS headers
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Upload-Length,Upload-Offset,Upload-Sha256,Upload-Filename')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,HEAD,PUT,PATCH,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Expose-Headers', 'Location,Upload-Offset,Upload-Length,Upload-Sha256')
     return response
 
+def upload_status_response(status, code=200):
+    """JSON upload status with the tus-style offset headers."""
+    response = jsonify(status)
+    response.status_code = code
+    response.headers['Upload-Offset'] = str(status['offset'])
+    response.headers['Upload-Length'] = str(status['length'])
+    if status['hash']:
+        response.headers['Upload-Sha256'] = status['hash']
+    return response
+
+@app.route('/uploads', methods=['POST', 'OPTIONS'])
+def create_upload():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+        
+    try:
+        length = int(request.headers.get('Upload-Length', ''))
+    except ValueError:
+        return jsonify({'error': 'Upload-Length header must be a number'}), 400
+        
+    try:
+        status = RESUMABLE_UPLOADS.create(
+            length,
+            filename=request.headers.get('Upload-Filename'),
+            content_hash=request.headers.get('Upload-Sha256')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    response = upload_status_response(status, 201)
+    response.headers['Location'] = url_for('upload_status', upload_id=status['upload_id'], _external=True)
+    return response
+
+@app.route('/uploads/<upload_id>', methods=['GET', 'PATCH', 'DELETE', 'OPTIONS'])
+def upload_status(upload_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+        
+    if request.method == 'DELETE':
+        if not RESUMABLE_UPLOADS.delete(upload_id):
+            return jsonify({'error': 'Upload not found'}), 404
+        return jsonify({'status': 'deleted'}), 200
+        
+    if request.method == 'PATCH':
+        if request.mimetype != 'application/offset+octet-stream':
+            return jsonify({'error': 'Content-Type must be application/offset+octet-stream'}), 415
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return jsonify({'error': 'Upload-Offset header must be a number'}), 400
+            
+        try:
+            status = RESUMABLE_UPLOADS.append(upload_id, offset, request.stream)
+        except OffsetMismatchError as e:
+            response = jsonify({'error': str(e), 'offset': e.offset})
+            response.status_code = 409
+            response.headers['Upload-Offset'] = str(e.offset)
+            return response
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        # GET (and HEAD) report the offset to resume from
+        status = RESUMABLE_UPLOADS.status(upload_id)
+        
+    if status is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return upload_status_response(status)
+
 @app.route('/read-metadata', methods=['POST', 'OPTIONS'])
 def upload_image():
     if request.method == 'OPTIONS':
@@ -36,15 +330,18 @@ def upload_image():
     image_file = request.files['image']
     
     try:
-        # Open image from blob (in-memory file object)
-        image_bytes = image_file.read()
+        # The upload is already spooled to disk; only its headers are read
+        image_path = UploadHelper().get_path(image_file)
         
         # Extract EXIF metadata
         exif = ExifHelper()
-        exif_data = exif.get_exif_data(image_bytes)
+        exif_data = exif.get_exif_data(image_path)
         
         if not exif_data:
             return jsonify({'message': 'No EXIF metadata found'}), 200
+        
+        # Report the upload name, never the server path
+        exif_data['name'] = image_file.filename
 
         return jsonify({'exif_data': exif_data}), 200
 
@@ -52,6 +349,80 @@ def upload_image():
         return jsonify({'error': str(e)}), 500
     
 
+def spool_uploads(files, spool_dir):
+    """Move spooled uploads into spool_dir and return their paths, in order."""
+    upload_helper = UploadHelper()
+    return [
+        upload_helper.move_to(file, os.path.join(spool_dir, f"{index:06d}"))
+        for index, file in enumerate(files)
+    ]
+
+def read_metadata_entry(exif, name, path):
+    """Parse one image for the batch endpoint; errors are reported per file."""
+    try:
+        exif_data = exif.get_exif_data(path)
+        
+        if not exif_data:
+            return {'name': name, 'status': 'no_exif', 'message': 'No EXIF metadata found'}
+        
+        # Report the upload name or relative path, never the server path
+        exif_data['name'] = name
+        return {'name': name, 'status': 'ok', 'exif_data': exif_data}
+        
+    except Exception as e:
+        return {'name': name, 'status': 'error', 'error': str(e)}
+
+@app.route('/read-metadata-batch', methods=['POST', 'OPTIONS'])
+def read_metadata_batch():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+        
+    # Images come either as multipart uploads or from a directory under drone_frames
+    images = request.files.getlist('images')
+    directory = request.form.get('directory')
+    
+    if directory:
+        full_directory = safe_join(DRONE_FRAMES_DIR, directory)
+        if full_directory is None or not os.path.isdir(full_directory):
+            return jsonify({'error': 'Directory not found'}), 400
+            
+        sources = [
+            (os.path.join(directory, filename), os.path.join(full_directory, filename))
+            for filename in sorted(os.listdir(full_directory))
+            if filename.lower().endswith(METADATA_EXTENSIONS)
+        ]
+        spool_dir = None
+    elif images:
+        # Uploads are removed when the view returns, so take them over before streaming
+        spool_dir = tempfile.mkdtemp(prefix='metadata-batch-', dir=UPLOAD_SPOOL_DIR)
+        sources = [(image.filename, path) for image, path in zip(images, spool_uploads(images, spool_dir))]
+    else:
+        return jsonify({'error': 'No images or directory found in the request'}), 400
+    
+    exif = ExifHelper()
+    futures = [METADATA_POOL.submit(read_metadata_entry, exif, name, path) for name, path in sources]
+    
+    def generate():
+        try:
+            # One JSON object per line, in completion order
+            error_count = 0
+            for future in as_completed(futures):
+                entry = future.result()
+                if entry['status'] == 'error':
+                    error_count += 1
+                yield entry
+                
+            yield {'status': 'done', 'total': len(futures), 'errors': error_count}
+        finally:
+            if spool_dir:
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+                shutil.rmtree(spool_dir, ignore_errors=True)
+    
+    return ResponseHelper().ndjson_response(generate())
+    
+
 @app.route('/write-metadata', methods=['POST', 'OPTIONS'])
 def write_metadata():
     if request.method == 'OPTIONS':
@@ -63,16 +434,89 @@ def write_metadata():
     image_file = request.files['image']
     metadata = request.form.to_dict()
     
-    image_bytes = image_file.read()
+    try:
+        image_path = UploadHelper().get_path(image_file)
+        
+        # Write EXIF metadata in memory
+        exif = ExifHelper()
+        tagged_bytes, exif_data = exif.write_exif_data(image_path, metadata)
+        
+        return ResponseHelper().json_response({
+            'exif_data': exif_data,
+            'updated_image': image_data_uri(tagged_bytes, image_file.mimetype)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def image_data_uri(image_bytes, mime_type):
+    """Return image bytes as a base64 data URI."""
+    base64_data = base64.b64encode(image_bytes).decode('utf-8')
+    return f"data:{mime_type or 'image/jpeg'};base64,{base64_data}"
+
+def write_metadata_entry(exif, index, name, mime_type, path, gps_data):
+    """Tag one image for the batch endpoint; errors are reported per file."""
+    try:
+        tagged_bytes, exif_data = exif.apply_gps_data(path, gps_data)
+        return {
+            'index': index,
+            'name': name,
+            'status': 'ok',
+            'exif_data': exif_data,
+            'updated_image': image_data_uri(tagged_bytes, mime_type)
+        }
+        
+    except Exception as e:
+        return {'index': index, 'name': name, 'status': 'error', 'error': str(e)}
+
+@app.route('/write-metadata-batch', methods=['POST', 'OPTIONS'])
+def write_metadata_batch():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+        
+    images = request.files.getlist('images')
+    if not images:
+        return jsonify({'error': 'No image files found in the request'}), 400
+        
+    # One GPS object per image, in the same order as the uploaded files
+    try:
+        metadata = json.loads(request.form.get('metadata', ''))
+    except json.JSONDecodeError:
+        return jsonify({'error': 'Invalid JSON format in metadata'}), 400
+        
+    if not isinstance(metadata, list) or len(metadata) != len(images):
+        return jsonify({'error': 'metadata must be a list with one entry per image'}), 400
+    
+    # Uploads are removed when the view returns, so take them over before streaming
+    spool_dir = tempfile.mkdtemp(prefix='metadata-batch-', dir=UPLOAD_SPOOL_DIR)
+    paths = spool_uploads(images, spool_dir)
     
-    # Extract EXIF metadata
     exif = ExifHelper()
-    exif_data = exif.write_exif_data(image_bytes, metadata)
+    futures = [
+        METADATA_POOL.submit(write_metadata_entry, exif, index, image_file.filename,
+                             image_file.mimetype, path, gps_data)
+        for index, (image_file, path, gps_data) in enumerate(zip(images, paths, metadata))
+    ]
     
-    if not exif_data:
-        return jsonify({'message': 'No EXIF metadata found'}), 200
-
-    return jsonify({'exif_data': exif_data}), 200
+    def generate():
+        try:
+            # One JSON object per line, in completion order
+            error_count = 0
+            for future in as_completed(futures):
+                entry = future.result()
+                if entry['status'] == 'error':
+                    error_count += 1
+                yield entry
+                
+            yield {'status': 'done', 'total': len(futures), 'errors': error_count}
+        finally:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            shutil.rmtree(spool_dir, ignore_errors=True)
+    
+    return ResponseHelper().ndjson_response(generate())
 
 
 @app.route('/split-video', methods=['POST', 'OPTIONS'])
@@ -80,37 +524,57 @@ def split_video():
     if request.method == 'OPTIONS':
         return jsonify({}), 200
         
-    if 'video' not in request.files:
+    # Either an uploaded file or the hash of a finished resumable upload
+    try:
+        video_path, video_hash = resolve_upload('video')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    if video_path is None:
         return jsonify({'error': 'No video file found in the request'}), 400
     
-    video_file = request.files['video']
-    
     # Get optional parameters with defaults
     max_frames = int(request.form.get('max_frames', 30))
     frame_interval = int(request.form.get('frame_interval', 1))
     
     try:
-        # Read video file bytes
-        video_bytes = video_file.read()
-        
+        frame_mode = get_frame_mode()
+        encode_profile = get_encode_profile()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
         # Create VideoHelper instance
-        video_helper = VideoHelper()
+        video_helper = VideoHelper(VIDEO_STORE_DIR, FRAME_CACHE, encode_profile, frame_timelines=FRAME_TIMELINES)
         
         # Get video metadata
-        metadata = video_helper.get_video_metadata(video_bytes)
+        metadata = video_helper.get_video_metadata(video_path)
         
-        # Split video into frames
-        frames = video_helper.split_video_to_frames(video_bytes, max_frames, frame_interval)
+        # Wait for a slot and memory for the decode
+        output_frames = min(max_frames, metadata.get('frame_count', 0))
+        admit_job('split-video', video_helper.estimate_peak_memory(metadata, output_frames, frame_mode == 'inline'))
+        
+        if frame_mode == 'inline':
+            # Split video into frames
+            frames = video_helper.split_video_to_frames(video_path, max_frames, frame_interval, video_hash)
+        else:
+            # Only describe the frames; they are encoded on request
+            video_id = video_helper.store_video(video_path, video_hash)
+            frames = video_helper.describe_split_frames(video_id, max_frames, frame_interval)
+            for frame in frames:
+                frame['frame_url'] = frame_url(video_id, frame['frame_number'], encode_profile)
         
         if not frames:
             return jsonify({'error': 'Failed to extract frames from video'}), 400
             
-        return jsonify({
+        return ResponseHelper().json_response({
             'metadata': metadata,
             'frames': frames,
             'frame_count': len(frames)
-        }), 200
+        })
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -121,11 +585,14 @@ def interpolate_path():
         return jsonify({}), 200
         
     try:
-        # Validate video file
-        if 'video' not in request.files:
-            return jsonify({'error': 'No video file found in the request'}), 400
+        # Validate video file (an upload or the hash of a finished resumable upload)
+        try:
+            video_path, video_hash = resolve_upload('video')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
             
-        video_file = request.files['video']
+        if video_path is None:
+            return jsonify({'error': 'No video file found in the request'}), 400
         
         # Get and validate frames_interval
         frames_interval = request.form.get('frames_interval', '1')
@@ -136,6 +603,12 @@ def interpolate_path():
         except ValueError:
             return jsonify({'error': 'frames_interval must be a number'}), 400
             
+        try:
+            frame_mode = get_frame_mode()
+            encode_profile = get_encode_profile()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+            
         # Get and validate markers data
         markers_data = request.form.get('markers')
         if not markers_data:
@@ -149,13 +622,21 @@ def interpolate_path():
             # Convert markers to points format
             points = []
             for marker in markers:
-                if not all(k in marker for k in ('timestamp', 'lat', 'lng')):
+                if not isinstance(marker, dict) or not all(k in marker for k in ('timestamp', 'lat', 'lng')):
                     return jsonify({'error': 'Invalid marker format. Each marker must have timestamp, lat, and lng'}), 400
-                points.append({
-                    'timestamp': float(marker['timestamp']),
-                    'lat': float(marker['lat']),
-                    'lon': float(marker['lng'])  # Note: convert lng to lon
-                })
+                try:
+                    point = {
+                        'timestamp': float(marker['timestamp']),
+                        'lat': float(marker['lat']),
+                        'lon': float(marker['lng'])  # Note: convert lng to lon
+                    }
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'Marker timestamp, lat and lng must be numbers'}), 400
+                # Checked here: the response is streamed, so a bad marker can not become a 400 later
+                if not all(math.isfinite(value) for value in point.values()) or point['timestamp'] < 0 \
+                        or abs(point['lat']) > 90 or abs(point['lon']) > 180:
+                    return jsonify({'error': 'Marker timestamp must be a non-negative number and lat/lng valid coordinates'}), 400
+                points.append(point)
                     
             # Sort points by timestamp
             points.sort(key=lambda x: x['timestamp'])
@@ -164,55 +645,99 @@ def interpolate_path():
             return jsonify({'error': 'Invalid JSON format in markers data'}), 400
             
         # Create helpers
-        video_helper = VideoHelper()
+        video_helper = VideoHelper(VIDEO_STORE_DIR, FRAME_CACHE, encode_profile, frame_timelines=FRAME_TIMELINES)
         location_helper = LocationHelper()
         
         # Get video metadata
-        video_bytes = video_file.read()
-        metadata = video_helper.get_video_metadata(video_bytes)
+        metadata = video_helper.get_video_metadata(video_path)
         
         if not metadata:
             return jsonify({'error': 'Failed to read video metadata'}), 400
-            
-        # Check video duration (2 min limit)
-        if metadata.get('duration', 0) > 120:  # 120 seconds = 2 minutes
-            return jsonify({'error': 'Video duration exceeds 2 minutes limit'}), 400
-            
-        # Interpolate locations
-        try:
-            interpolated_points = location_helper.interpolate_locations(
-                points=points,
-                interval_seconds=frames_interval
+        
+        # Wait for a slot and memory for the decode; frames are sent as they are encoded, so
+        # the memory needed does not depend on the duration or the number of points
+        admit_job('interpolate-path', video_helper.estimate_peak_memory(metadata))
+        
+        # Interpolated points are produced, matched to frames and sent one at a time, in time order,
+        # by a single reader decoding forward through the video
+        interpolated_points, points_for_frames = itertools.tee(
+            location_helper.iter_interpolated_locations(points, frames_interval))
+        timestamps = (point['timestamp'] for point in points_for_frames)
+        
+        spool_dir = None
+        if frame_mode == 'inline':
+            if 'video' in request.files:
+                # Uploads are removed when the view returns, so take it over before streaming
+                spool_dir = tempfile.mkdtemp(prefix='interpolate-path-', dir=UPLOAD_SPOOL_DIR)
+                video_path = spool_uploads([request.files['video']], spool_dir)[0]
+            frames = video_helper.iter_frames_at_timestamps(video_path, timestamps, video_hash)
+        else:
+            video_id = video_helper.store_video(video_path, video_hash)
+            frames = (
+                frame_url(video_id, descriptor['frame_number'], encode_profile) if descriptor else None
+                for descriptor in video_helper.iter_describe_frames_at_timestamps(video_id, timestamps)
             )
-        except Exception as e:
-            return jsonify({'error': f'Error interpolating locations: {str(e)}'}), 400
+        frame_key = 'frame' if frame_mode == 'inline' else 'frame_url'
         
-        # Calculate path statistics
-        path_stats = location_helper.calculate_path_stats(interpolated_points)
+        # Path statistics cover every interpolated point, with or without a frame
+        path_stats = PathStatsAccumulator()
         
-        # Get frames at interpolated timestamps
-        frames = video_helper.extract_frames_at_timestamps(
-            video_bytes=video_bytes,
-            timestamps=[point['timestamp'] for point in interpolated_points]
-        )
+        def iter_points():
+            try:
+                for point in interpolated_points:
+                    path_stats.add(point)
+                    frame = next(frames, None)
+                    if frame:  # Only include if frame was successfully extracted
+                        yield {
+                            'timestamp': point['timestamp'],
+                            'lat': point['lat'],
+                            'lng': point['lon'],  # Convert back to lng for frontend
+                            frame_key: frame
+                        }
+            finally:
+                # Release the reader before its file goes
+                frames.close()
+                if spool_dir:
+                    shutil.rmtree(spool_dir, ignore_errors=True)
         
-        # Combine frames with location data
-        result = []
-        for point, frame in zip(interpolated_points, frames):
-            if frame:  # Only include if frame was successfully extracted
-                result.append({
-                    'timestamp': point['timestamp'],
-                    'lat': point['lat'],
-                    'lng': point['lon'],  # Convert back to lng for frontend
-                    'frame': frame
-                })
-        
-        return jsonify({
+        response_helper = ResponseHelper()
+        if response_helper.wants_ndjson():
+            def iter_lines():
+                # Metadata first, one line per point, then the path statistics
+                yield {'metadata': metadata}
+                count = 0
+                try:
+                    for point in iter_points():
+                        count += 1
+                        yield point
+                except Exception as e:
+                    yield {'status': 'error', 'error': str(e), 'total': count}
+                    return
+                yield {'status': 'done', 'total': count, 'path_stats': path_stats.result()}
+            
+            return response_helper.ndjson_response(iter_lines())
+        
+        failure = []
+        
+        def iter_sent_points():
+            # The 200 is sent before the points; a failure closes the array and is reported in 'error'
+            try:
+                yield from iter_points()
+            except Exception as e:
+                print(f"Error streaming interpolated path: {str(e)}")
+                failure.append(str(e))
+        
+        # Same document as before, written while the points are produced; path_stats is only known
+        # after the last point, so it comes last, followed by error (null unless the stream failed)
+        return response_helper.json_response({
             'metadata': metadata,
-            'path_stats': path_stats,
-            'points': result
-        }), 200
+            'points': iter_sent_points(),
+            'path_stats': path_stats.result,
+            'error': lambda: failure[0] if failure else None
+        })
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -224,11 +749,14 @@ def interpolate_path_v2():
         return jsonify({}), 200
         
     try:
-        # Validate video file
-        if 'video' not in request.files:
-            return jsonify({'error': 'No video file found in the request'}), 400
+        # Validate video file (an upload or the hash of a finished resumable upload)
+        try:
+            video_path, video_hash = resolve_upload('video')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
             
-        video_file = request.files['video']
+        if video_path is None:
+            return jsonify({'error': 'No video file found in the request'}), 400
         
         # Get and validate markers data
         markers_data = request.form.get('markers')
@@ -247,48 +775,113 @@ def interpolate_path_v2():
         except json.JSONDecodeError:
             return jsonify({'error': 'Invalid JSON format in markers data'}), 400
             
+        try:
+            frame_mode = get_frame_mode()
+            encode_profile = get_encode_profile()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+            
         # Create helpers
-        video_helper = VideoHelper()
+        video_helper = VideoHelper(VIDEO_STORE_DIR, FRAME_CACHE, encode_profile, frame_timelines=FRAME_TIMELINES)
         
         # Get video metadata and frames
-        video_bytes = video_file.read()
-        metadata = video_helper.get_video_metadata(video_bytes)
+        metadata = video_helper.get_video_metadata(video_path)
         
         if not metadata:
             return jsonify({'error': 'Failed to read video metadata'}), 400
             
-        # Extract frames at marker timestamps
-        frames = video_helper.extract_frames_at_timestamps(
-            video_bytes=video_bytes,
-            timestamps=[marker['timestamp'] for marker in markers]
-        )
+        timestamps = [marker['timestamp'] for marker in markers]
+        
+        # Wait for a slot and memory for the decode
+        admit_job('interpolate-path', video_helper.estimate_peak_memory(metadata, len(timestamps), frame_mode == 'inline'))
         
         # Combine frames with marker data
         result = []
-        for marker, frame in zip(markers, frames):
-            if frame:  # Only include if frame was successfully extracted
-                result.append({
-                    'timestamp': marker['timestamp'],
-                    'lat': marker['lat'],
-                    'lng': marker['lng'],
-                    'frame': frame
-                })
-        
-        return jsonify({
+        if frame_mode == 'inline':
+            # Extract frames at marker timestamps
+            frames = video_helper.extract_frames_at_timestamps(
+                video_path=video_path,
+                timestamps=timestamps,
+                video_hash=video_hash
+            )
+            
+            for marker, frame in zip(markers, frames):
+                if frame:  # Only include if frame was successfully extracted
+                    result.append({
+                        'timestamp': marker['timestamp'],
+                        'lat': marker['lat'],
+                        'lng': marker['lng'],
+                        'frame': frame
+                    })
+        else:
+            video_id = video_helper.store_video(video_path, video_hash)
+            descriptors = video_helper.describe_frames_at_timestamps(
+                video_id,
+                [float(timestamp) for timestamp in timestamps]
+            )
+            
+            for marker, descriptor in zip(markers, descriptors):
+                if descriptor:  # Only include timestamps inside the video
+                    result.append({
+                        'timestamp': marker['timestamp'],
+                        'lat': marker['lat'],
+                        'lng': marker['lng'],
+                        'frame_url': frame_url(video_id, descriptor['frame_number'], encode_profile)
+                    })
+        
+        return ResponseHelper().json_response({
             'metadata': metadata,
             'points': result
-        }), 200
+        })
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/video-frames/<video_id>/<encode_profile>/<int:frame_number>', methods=['GET'])
+def get_video_frame(video_id, encode_profile, frame_number):
+    # Video ids are SHA-256 hex digests; reject anything else before touching the disk
+    if not is_content_hash(video_id):
+        return jsonify({'error': 'Invalid video id'}), 400
+        
+    if encode_profile not in ENCODE_PROFILES:
+        return jsonify({'error': f"encode_profile must be one of: {', '.join(ENCODE_PROFILES)}"}), 400
+        
+    try:
+        video_helper = VideoHelper(VIDEO_STORE_DIR, FRAME_CACHE, encode_profile, frame_timelines=FRAME_TIMELINES)
+        encoded = video_helper.get_encoded_frame(video_id, frame_number)
+        
+        if encoded is None:
+            return jsonify({'error': 'Frame not found'}), 404
+            
+        response = send_file(io.BytesIO(encoded), mimetype=video_helper.get_mime_type())
+        # Frames are addressed by content hash, so they never change
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/frame-cache/stats', methods=['GET'])
+def frame_cache_stats():
+    return jsonify(FRAME_CACHE.stats()), 200
+
+@app.route('/result-cache/stats', methods=['GET'])
+def result_cache_stats():
+    return jsonify(RESULT_CACHE.stats()), 200
+
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    return jsonify(ADMISSION.stats()), 200
+
 @app.route('/geotagger-video-test', methods=['POST', 'OPTIONS'])
 def geotagger_video_test():
     # Open json result2.json
     try:
         with open('result-all.json', 'r') as file:
             data = json.load(file)
-        return jsonify(data), 200
+        return ResponseHelper().json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -300,40 +893,66 @@ def geotagger_video():
         return response
         
     try:
-        if 'video' not in request.files or 'csv' not in request.files:
-            return jsonify({'error': 'Missing video or CSV file'}), 400
+        # Each file is either uploaded or referenced by the hash of a finished resumable upload
+        try:
+            video_path, video_hash = resolve_upload('video')
+            csv_path, csv_hash = resolve_upload('csv')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
             
-        video_file = request.files['video']
-        csv_file = request.files['csv']
+        if video_path is None or csv_path is None:
+            return jsonify({'error': 'Missing video or CSV file'}), 400
+        
+        # Optional range to process, in video seconds or UTC, and the output format
+        try:
+            start, end = get_time_range()
+            frame_writer = get_frame_writer()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Get output directory from request or use default
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        output_dir = os.path.join(base_dir, 'drone_frames')
+        output_dir = DRONE_FRAMES_DIR
         # output_dir = request.form.get('output_dir', 'drone_frames')
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as video_tmp:
-            video_file.save(video_tmp.name)
-            video_path = video_tmp.name
-            
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as csv_tmp:
-            csv_file.save(csv_tmp.name)
-            csv_path = csv_tmp.name
+        # Identical video + log + parameters reuse the frames already written
+        params = {'output_dir': output_dir}
+        if start is not None or end is not None:
+            params.update(start=str(start), end=str(end))
+        if frame_writer.settings() != FrameWriterHelper().settings():
+            params['frame_format'] = frame_writer.settings()
+        cache_key = ResultCacheHelper.make_key(video_hash, csv_hash, GeotaggerHelper.__name__, params)
+        saved_frames = RESULT_CACHE.get(cache_key)
+        cached = saved_frames is not None
+        
+        if not cached:
+            # Wait for a slot and memory for the full resolution decode
+            video_helper = VideoHelper()
+            metadata = video_helper.get_video_metadata(video_path)
+            admit_job('geotagger-video', video_helper.estimate_peak_memory(metadata) +
+                      ring_size(metadata.get('width', 0), metadata.get('height', 0), ENCODE_WORKERS))
             
-        try:
-            helper = GeotaggerHelper(csv_path, video_path, output_dir)
-            helper.load_telemetry_data()
+            helper = GeotaggerHelper(csv_path, video_path, output_dir,
+                                     frame_index=FRAME_INDEX, video_hash=video_hash, start=start, end=end,
+                                     frame_writer=frame_writer, encode_workers=ENCODE_WORKERS,
+                                     storage=FRAME_STORAGE, frame_timelines=FRAME_TIMELINES)
+            try:
+                # Resolves start/end against the flight log
+                helper.load_telemetry_data()
+            except ValueError as e:
+                # Range outside the video or the flight log
+                return jsonify({'error': str(e)}), 400
             helper.load_video()
             saved_frames = helper.process_video_all()
+            RESULT_CACHE.put(cache_key, saved_frames)
+        
+        return ResponseHelper().json_response({
+            'status': 'success',
+            'cached': cached,
+            'saved_frames': saved_frames
+        })
             
-            return jsonify({
-                'status': 'success',
-                'saved_frames': saved_frames
-            })
-            
-        finally:
-            os.unlink(video_path)
-            os.unlink(csv_path)
-            
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -346,60 +965,314 @@ def geotagger_video_interval():
         return response
         
     try:
-        if 'video' not in request.files or 'csv' not in request.files:
-            return jsonify({'error': 'Missing video or CSV file'}), 400
+        # Each file is either uploaded or referenced by the hash of a finished resumable upload
+        try:
+            video_path, video_hash = resolve_upload('video')
+            csv_path, csv_hash = resolve_upload('csv')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
             
-        video_file = request.files['video']
-        csv_file = request.files['csv']
+        if video_path is None or csv_path is None:
+            return jsonify({'error': 'Missing video or CSV file'}), 400
         
-        # Get frame_interval from the request form
-        frame_interval = float(request.form.get('frame_interval', 1))
+        # Seconds between saved frames, the optional range to process (video seconds or UTC) and the output format
+        try:
+            frame_interval = get_frame_interval()
+            start, end = get_time_range()
+            frame_writer = get_frame_writer()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Get output directory from request or use default
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        output_dir = os.path.join(base_dir, 'drone_frames')
+        output_dir = DRONE_FRAMES_DIR
         # output_dir = request.form.get('output_dir', 'drone_frames')
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as video_tmp:
-            video_file.save(video_tmp.name)
-            video_path = video_tmp.name
-            
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as csv_tmp:
-            csv_file.save(csv_tmp.name)
-            csv_path = csv_tmp.name
+        # Identical video + log + parameters reuse the frames already written
+        params = {'output_dir': output_dir, 'frame_interval': frame_interval}
+        if start is not None or end is not None:
+            params.update(start=str(start), end=str(end))
+        if frame_writer.settings() != FrameWriterHelper().settings():
+            params['frame_format'] = frame_writer.settings()
+        cache_key = ResultCacheHelper.make_key(video_hash, csv_hash, GeotaggerHelperInterval.__name__, params)
+        saved_frames = RESULT_CACHE.get(cache_key)
+        cached = saved_frames is not None
+        
+        if not cached:
+            # Wait for a slot and memory for the full resolution decode
+            video_helper = VideoHelper()
+            metadata = video_helper.get_video_metadata(video_path)
+            admit_job('geotagger-video', video_helper.estimate_peak_memory(metadata) +
+                      ring_size(metadata.get('width', 0), metadata.get('height', 0), ENCODE_WORKERS))
             
-        try:
-            helper = GeotaggerHelperInterval(csv_path, video_path, output_dir, frame_interval)
-            helper.load_telemetry_data()
+            helper = GeotaggerHelperInterval(csv_path, video_path, output_dir, frame_interval,
+                                             frame_index=FRAME_INDEX, video_hash=video_hash, start=start, end=end,
+                                             frame_writer=frame_writer, encode_workers=ENCODE_WORKERS,
+                                             storage=FRAME_STORAGE, frame_timelines=FRAME_TIMELINES)
+            try:
+                # Resolves start/end against the flight log
+                helper.load_telemetry_data()
+            except ValueError as e:
+                # Range outside the video or the flight log
+                return jsonify({'error': str(e)}), 400
             helper.load_video()
             saved_frames = helper.process_video()
+            RESULT_CACHE.put(cache_key, saved_frames)
+        
+        return ResponseHelper().json_response({
+            'status': 'success',
+            'cached': cached,
+            'saved_frames': saved_frames
+        })
             
-            return jsonify({
-                'status': 'success',
-                'saved_frames': saved_frames
-            })
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+@app.route('/geotagger-mission', methods=['POST', 'OPTIONS'])
+def geotagger_mission():
+    if request.method == 'OPTIONS':
+        response = app.make_default_options_response()
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+        return response
+        
+    try:
+        # Clips are uploaded as videos and/or referenced by the hashes of finished resumable uploads
+        upload_helper = UploadHelper()
+        videos = [{'name': video.filename, 'path': upload_helper.get_path(video), 'video_hash': upload_helper.get_hash(video)}
+                  for video in request.files.getlist('videos')]
+        for content_hash in filter(None, request.form.get('video_hashes', '').split(',')):
+            path = RESUMABLE_UPLOADS.get_blob_path(content_hash.strip())
+            if path is None:
+                return jsonify({'error': f"Unknown video hash: {content_hash}"}), 400
+            videos.append({'name': content_hash.strip(), 'path': path, 'video_hash': content_hash.strip()})
+        try:
+            csv_path, _ = resolve_upload('csv')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
             
-        finally:
-            os.unlink(video_path)
-            os.unlink(csv_path)
+        if not videos or csv_path is None:
+            return jsonify({'error': 'Missing videos or CSV file'}), 400
+        
+        # Optional JSON list with seconds after the first log row per clip (null to align automatically)
+        try:
+            offsets = json.loads(request.form.get('offsets', 'null')) or [None] * len(videos)
+            if not isinstance(offsets, list) or len(offsets) != len(videos):
+                return jsonify({'error': 'offsets must be a list with one entry per video'}), 400
+            for video, offset in zip(videos, offsets):
+                video['offset'] = None if offset is None else float(offset)
+            frame_interval = float(request.form.get('frame_interval', 1))
+            clock_offset = float(request.form.get('clock_offset', 0))
+            max_time_diff = request.form.get('max_time_diff', '5')
+            max_time_diff = float(max_time_diff) if max_time_diff else None
+        except (ValueError, TypeError):
+            return jsonify({'error': 'offsets, frame_interval, clock_offset and max_time_diff must be numbers'}), 400
+        try:
+            frame_writer = get_frame_writer()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        helper = MissionGeotaggerHelper(csv_path, videos, DRONE_FRAMES_DIR, frame_interval,
+                                        clock_offset=clock_offset, max_time_diff=max_time_diff,
+                                        frame_index=FRAME_INDEX, frame_writer=frame_writer,
+                                        storage=FRAME_STORAGE, frame_timelines=FRAME_TIMELINES)
+        
+        # Each worker decodes one clip at full resolution
+        video_helper = VideoHelper()
+        largest_clip = max((video_helper.estimate_peak_memory(video_helper.get_video_metadata(video['path']))
+                            for video in videos), default=0)
+        admit_job('geotagger-mission', min(len(videos), helper.max_workers) * largest_clip)
+        
+        helper.load_telemetry_data()
+        mission = helper.process_mission()
+        
+        return ResponseHelper().json_response({
+            'status': 'success',
+            'clips': mission['clips'],
+            'saved_frames': mission['saved_frames']
+        })
             
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+@app.route('/geotagger-photos', methods=['POST', 'OPTIONS'])
+def geotagger_photos():
+    if request.method == 'OPTIONS':
+        response = app.make_default_options_response()
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+        return response
+        
+    try:
+        photos = request.files.getlist('photos')
+        try:
+            csv_path, _ = resolve_upload('csv')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+            
+        if not photos or csv_path is None:
+            return jsonify({'error': 'Missing photos or CSV file'}), 400
+        
+        # Seconds added to the camera clock to get log (UTC) time, e.g. -25200 for UTC+7
+        try:
+            clock_offset = float(request.form.get('clock_offset', 0))
+            max_time_diff = request.form.get('max_time_diff', '5')
+            max_time_diff = float(max_time_diff) if max_time_diff else None
+        except ValueError:
+            return jsonify({'error': 'clock_offset and max_time_diff must be numbers'}), 400
+        
+        # Uploads are already spooled to disk and removed when the request ends
+        upload_helper = UploadHelper()
+        helper = PhotoGeotaggerHelper(
+            csv_path,
+            [(photo.filename, upload_helper.get_path(photo)) for photo in photos],
+            DRONE_FRAMES_DIR,
+            clock_offset=clock_offset,
+            max_time_diff=max_time_diff,
+            frame_index=FRAME_INDEX,
+            storage=FRAME_STORAGE
+        )
+        
+        # Each worker holds one photo and its tagged copy
+        largest_photo = max(os.path.getsize(path) for _, path in helper.photos)
+        admit_job('geotagger-photos', min(len(photos), helper.max_workers) * largest_photo * 2)
+        
+        helper.load_telemetry_data()
+        results = helper.process_photos()
+        
+        return ResponseHelper().json_response({
+            'status': 'success',
+            'tagged': sum(1 for result in results if result['status'] == 'ok'),
+            'photos': results
+        })
+            
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
 # Route to serve images from drone_frames directory
 @app.route('/drone_frames/<path:filename>')
 def serve_drone_frames(filename):
-    # Get the absolute path to the drone_frames directory
-    drone_frames_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'drone_frames')
-    
-    # Extract the directory path from the filename
-    directory = os.path.dirname(filename)
-    base_filename = os.path.basename(filename)
+    # Optional resized variant: ?size=thumb|small|medium
+    size = request.args.get('size')
+    if size is not None and size not in THUMBNAIL_SIZES:
+        return jsonify({'error': f"size must be one of: {', '.join(THUMBNAIL_SIZES)}"}), 400
+        
+    # Frames in object storage are fetched from there directly
+    if not isinstance(FRAME_STORAGE, LocalFrameStorage):
+        if size is not None:
+            return jsonify({'error': 'Thumbnails are only available for locally stored frames'}), 400
+        try:
+            return redirect(FRAME_STORAGE.presigned_url(filename), code=302)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        
+    path = safe_join(DRONE_FRAMES_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'error': 'Frame not found'}), 404
+        
+    try:
+        content_hash = THUMBNAILS.content_hash(path)
+        last_modified = os.path.getmtime(path)
+        
+        if size is None:
+            response = send_file(path, etag=content_hash, last_modified=last_modified, conditional=True)
+        else:
+            encoded = THUMBNAILS.get_thumbnail(path, size, content_hash)
+            if encoded is None:
+                return jsonify({'error': 'Frame can not be decoded'}), 415
+            response = send_file(io.BytesIO(encoded), mimetype='image/jpeg', etag=f"{content_hash}-{size}",
+                                 last_modified=last_modified, conditional=True)
+        
+        # ?v=<content hash> addresses one exact version, which never changes
+        if request.args.get('v') == content_hash:
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
     
-    # Construct the full directory path
-    full_directory = os.path.join(drone_frames_dir, directory)
+def parse_floats(value, count, name):
+    """Split a comma separated query parameter into count floats."""
+    try:
+        values = [float(part) for part in value.split(',')]
+    except ValueError:
+        raise ValueError(f"{name} must be {count} comma separated numbers")
+    if len(values) != count:
+        raise ValueError(f"{name} must be {count} comma separated numbers")
+    return values
+
+@app.route('/frames/search', methods=['GET'])
+def search_frames():
+    """
+    Query the frame index. One of:
+        bbox=west,south,east,north
+        lat, lon and radius (meters)
+        lat, lon and nearest (number of frames)
+        only start and/or end
+    start/end (ISO 8601 or Unix seconds, UTC), video_hash and limit narrow any of them.
+    """
+    args = request.args
+    try:
+        start = to_epoch(args.get('start'))
+        end = to_epoch(args.get('end'))
+        video_hash = args.get('video_hash') or None
+        limit = min(int(args.get('limit', FRAME_SEARCH_LIMIT)), FRAME_SEARCH_MAX_LIMIT)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        
+        if 'bbox' in args:
+            west, south, east, north = parse_floats(args['bbox'], 4, 'bbox')
+            query = 'bbox'
+            frames = FRAME_INDEX.bbox(south, west, north, east, start, end, video_hash, limit)
+        elif 'lat' in args or 'lon' in args:
+            lat = float(args['lat'])
+            lon = float(args['lon'])
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError('lat/lon out of range')
+            if 'nearest' in args:
+                query = 'nearest'
+                frames = FRAME_INDEX.nearest(lat, lon, min(int(args['nearest']), limit), start, end, video_hash)
+            elif 'radius' in args:
+                query = 'radius'
+                frames = FRAME_INDEX.radius(lat, lon, float(args['radius']), start, end, video_hash, limit)
+            else:
+                raise ValueError('lat/lon need radius or nearest')
+        elif start is not None or end is not None or video_hash is not None:
+            query = 'time_range'
+            frames = FRAME_INDEX.time_range(start, end, video_hash, limit)
+        else:
+            raise ValueError('Pass bbox, lat/lon with radius or nearest, or start/end')
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f"Invalid query: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
     
-    return send_from_directory(full_directory, base_filename)
+    for frame in frames:
+        frame['url'] = url_for('serve_drone_frames', filename=frame['path'], _external=True)
     
+    return ResponseHelper().json_response({
+        'query': query,
+        'count': len(frames),
+        'truncated': query != 'nearest' and len(frames) >= limit,
+        'frames': frames
+    })
+
+@app.route('/frames/index/stats', methods=['GET'])
+def frame_index_stats():
+    return jsonify(FRAME_INDEX.stats()), 200
+
+@app.cli.command('rebuild-frame-index')
+def rebuild_frame_index():
+    """Backfill the frame index from the GPS EXIF of the files in drone_frames."""
+    if not isinstance(FRAME_STORAGE, LocalFrameStorage):
+        print("The frame index can only be rebuilt from locally stored frames")
+        return
+    FRAME_INDEX.rebuild()
+
 if __name__ == '__main__':
     app.run(debug=True, host='localhost', port=5000)
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Benchmark VideoHelper encode profiles
+Input:
+    - Optional video file (defaults to a synthetic 4K frame)
+Output:
+    - Markdown table with encode time and bytes per profile
+
+Usage (from the server directory):
+    python -m benchmarks.bench_encode_profiles [video_path] [--runs N]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from helpers.VideoHelper import VideoHelper, ENCODE_PROFILES
+
+
+def synthetic_frame(width: int = 3840, height: int = 2160) -> np.ndarray:
+    """Gradient plus noise, roughly as hard to compress as aerial footage"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = (x[None, :] * 0.5 + y * 0.5).astype(np.uint8)
+    noise = np.random.default_rng(0).integers(0, 48, (height, width, 3), dtype=np.uint8)
+    return cv2.add(np.dstack([base, base[:, ::-1], base[::-1, :]]), noise)
+
+
+def load_frame(video_path: str) -> np.ndarray:
+    video = cv2.VideoCapture(video_path)
+    success, frame = video.read()
+    video.release()
+    if not success:
+        raise Exception(f"Failed to read a frame from {video_path}")
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video_path', nargs='?')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    frame = load_frame(args.video_path) if args.video_path else synthetic_frame()
+    # Endpoints encode the 1280 px preview, not the source frame
+    preview = VideoHelper()._resize_for_preview(frame)
+    height, width = preview.shape[:2]
+
+    print(f"Preview size: {width}x{height}, {args.runs} runs per profile")
+    print()
+    print("| Profile | Encode ms (median) | Bytes | Base64 bytes |")
+    print("|---|---:|---:|---:|")
+    for profile in ENCODE_PROFILES:
+        helper = VideoHelper(encode_profile=profile)
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            encoded = helper._encode_frame(preview)
+            timings.append((time.perf_counter() - start) * 1000)
+        data_uri = helper._to_data_uri(encoded)
+        print(f"| {profile} | {np.median(timings):.2f} | {len(encoded)} | {len(data_uri)} |")
+
+
+if __name__ == '__main__':
+    main()
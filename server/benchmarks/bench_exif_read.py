@@ -0,0 +1,108 @@
+"""
+Benchmark EXIF reading (PIL + exif library vs header-only reader)
+Input:
+    - Optional JPEG file (defaults to a synthetic 20 MP drone still)
+Output:
+    - Markdown table with time per image for each path
+
+Usage (from the server directory):
+    python -m benchmarks.bench_exif_read [image_path] [--runs N]
+"""
+
+import argparse
+import io
+import mimetypes
+import os
+import tempfile
+import time
+
+import numpy as np
+import piexif
+from exif import Image as ExifImage
+from PIL import Image as PILImage
+
+from helpers.ExifHelper import ExifHelper
+
+
+def write_synthetic_still(path: str, width: int = 5472, height: int = 3648) -> None:
+    """20 MP JPEG with DJI-like EXIF, GPS and a large maker note"""
+    pixels = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    exif_dict = {
+        '0th': {piexif.ImageIFD.Make: b'DJI', piexif.ImageIFD.Model: b'FC6310'},
+        'Exif': {
+            piexif.ExifIFD.DateTimeOriginal: b'2024:11:25 10:31:08',
+            piexif.ExifIFD.PixelXDimension: width,
+            piexif.ExifIFD.PixelYDimension: height,
+            piexif.ExifIFD.FocalLength: (88, 10),
+            piexif.ExifIFD.FNumber: (28, 10),
+            piexif.ExifIFD.ExposureTime: (1, 500),
+            piexif.ExifIFD.ISOSpeedRatings: 100,
+            piexif.ExifIFD.MakerNote: b'\x00' * 30000,
+        },
+        'GPS': {
+            piexif.GPSIFD.GPSLatitudeRef: b'S',
+            piexif.GPSIFD.GPSLatitude: ((7, 1), (16, 1), (5045, 100)),
+            piexif.GPSIFD.GPSLongitudeRef: b'E',
+            piexif.GPSIFD.GPSLongitude: ((112, 1), (47, 1), (3100, 100)),
+            piexif.GPSIFD.GPSAltitude: (1234, 100),
+        },
+    }
+    PILImage.fromarray(pixels).save(path, 'jpeg', exif=piexif.dump(exif_dict), quality=90)
+
+
+def legacy_get_exif_data(helper: ExifHelper, image_bytes: bytes) -> dict:
+    """The previous ExifHelper.get_exif_data: PIL open, full exif parse, serialize every tag"""
+    img = PILImage.open(io.BytesIO(image_bytes))
+    image = ExifImage(image_bytes)
+    file_type = img.format
+    mime_type = mimetypes.types_map.get(f".{file_type.lower()}", "image/jpeg")
+    exif_data = {}
+    for tag in image.list_all():
+        if tag not in ('gps_latitude_ref', 'gps_longitude_ref'):
+            exif_data[tag] = helper.make_serializable(image.get(tag))
+    return helper.format_return_exif(exif_data, "Image from Bytes", file_type, mime_type)
+
+
+def time_it(func, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_path', nargs='?')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    image_path = args.image_path
+    temp_dir = None
+    if image_path is None:
+        temp_dir = tempfile.mkdtemp()
+        image_path = os.path.join(temp_dir, 'synthetic_20mp.jpg')
+        write_synthetic_still(image_path)
+
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+
+    helper = ExifHelper()
+    assert legacy_get_exif_data(helper, image_bytes) == helper.get_exif_data(image_bytes)
+
+    print(f"Image: {os.path.basename(image_path)}, {len(image_bytes)} bytes, median of {args.runs} runs")
+    print()
+    print("| Path | ms per image |")
+    print("|---|---:|")
+    print(f"| PIL + exif library (previous) | {time_it(lambda: legacy_get_exif_data(helper, image_bytes), args.runs):.3f} |")
+    print(f"| Header-only reader, bytes | {time_it(lambda: helper.get_exif_data(image_bytes), args.runs):.3f} |")
+    print(f"| Header-only reader, file path (mmap) | {time_it(lambda: helper.get_exif_data(image_path), args.runs):.3f} |")
+
+    if temp_dir:
+        os.unlink(image_path)
+        os.rmdir(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark output formats for geotagged frames
+Input:
+    - Optional video file; frames are taken from it and resized to each
+      resolution (defaults to a synthetic aerial frame, see benchmarks.synthetic)
+Output:
+    - Markdown table per resolution (1080p and 4K by default) with encode
+      time, bytes per frame, decode time and PSNR for every format, speed
+      preset and quality, plus the archive size per 1000 frames
+
+Usage (from the server directory):
+    python -m benchmarks.bench_frame_formats [video_path] [--sizes 1920x1080,3840x2160]
+        [--formats jpeg,webp,avif] [--speeds fast,balanced,small] [--qualities default] [--runs N]
+"""
+
+import argparse
+import io
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmarks.synthetic import iter_frames
+from helpers.FrameWriterHelper import FrameWriterHelper, FRAME_FORMATS, SPEED_PRESETS
+from helpers.GeotaggerHelper import GeotaggerHelper
+
+
+def load_frame(video_path: str) -> np.ndarray:
+    video = cv2.VideoCapture(video_path)
+    # A frame from the middle is more typical than the first one
+    video.set(cv2.CAP_PROP_POS_FRAMES, int(video.get(cv2.CAP_PROP_FRAME_COUNT)) // 2)
+    success, frame = video.read()
+    video.release()
+    if not success:
+        raise Exception(f"Failed to read a frame from {video_path}")
+    return frame
+
+
+def median_ms(func, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def decode(encoded: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(encoded)) as image:
+        return np.asarray(image.convert('RGB'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video_path', nargs='?')
+    parser.add_argument('--sizes', default='1920x1080,3840x2160')
+    parser.add_argument('--formats', default=','.join(FRAME_FORMATS))
+    parser.add_argument('--speeds', default=','.join(SPEED_PRESETS))
+    parser.add_argument('--qualities', default='default',
+                        help='Comma separated qualities, "default" for each format default')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    source = load_frame(args.video_path) if args.video_path else None
+    telemetry = {'latitude': -7.28, 'longitude': 112.79, 'altitude': 200.0}
+    exif_bytes = GeotaggerHelper(None, None, None).create_exif_bytes(telemetry)
+
+    for size in args.sizes.split(','):
+        width, height = (int(value) for value in size.split('x'))
+        if source is not None:
+            frame = cv2.resize(source, (width, height), interpolation=cv2.INTER_AREA)
+        else:
+            frame = next(iter_frames(width, height, 1))
+        reference = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        print(f"{width}x{height}, {args.runs} runs per setting")
+        print()
+        print("| Format | Speed | Quality | Encode ms | Bytes | GB / 1000 frames | Decode ms | PSNR dB |")
+        print("|---|---|---:|---:|---:|---:|---:|---:|")
+        for output_format in args.formats.split(','):
+            for speed in args.speeds.split(','):
+                for quality in args.qualities.split(','):
+                    try:
+                        writer = FrameWriterHelper(output_format, None if quality == 'default' else int(quality), speed)
+                    except ValueError as e:
+                        print(f"| {output_format} | {speed} | {quality} | {str(e)} | | | | |")
+                        continue
+                    encoded = writer.encode(frame, exif_bytes)
+                    encode_ms = median_ms(lambda: writer.encode(frame, exif_bytes), args.runs)
+                    decode_ms = median_ms(lambda: decode(encoded), args.runs)
+                    psnr = cv2.PSNR(reference, decode(encoded))
+                    print(f"| {output_format} | {speed} | {writer.quality} | {encode_ms:.1f} | {len(encoded)} | "
+                          f"{len(encoded) * 1000 / 1e9:.2f} | {decode_ms:.1f} | {psnr:.2f} |")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark frame index queries on a synthetic flight archive
+Input:
+    - Number of synthetic frames (default one million), spread over a
+      city sized area and a few months
+Output:
+    - Markdown table with the median time per query type
+
+Usage (from the server directory):
+    python -m benchmarks.bench_frame_index [--frames N] [--runs N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from helpers.FrameIndexHelper import FrameIndexHelper
+
+CENTER_LAT = -7.28
+CENTER_LON = 112.79
+SPREAD_DEG = 0.2
+START_EPOCH = 1732500000.0
+SPAN_SECONDS = 90 * 24 * 3600
+
+
+def fill(index: FrameIndexHelper, count: int) -> None:
+    """Insert count frames along random flight lines"""
+    rng = random.Random(0)
+    rows = []
+    for number in range(count):
+        # Frames come in flights of 600, one per second along a straight line
+        if number % 600 == 0:
+            lat = CENTER_LAT + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+            lon = CENTER_LON + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+            step_lat, step_lon = rng.uniform(-1e-4, 1e-4), rng.uniform(-1e-4, 1e-4)
+            timestamp = START_EPOCH + rng.uniform(0, SPAN_SECONDS)
+            video_hash = f"{number:064x}"
+        lat += step_lat
+        lon += step_lon
+        timestamp += 1
+        rows.append((f"synthetic/frame_{number}.jpg", timestamp, lat, lon, 30.0, video_hash))
+
+    connection = index._connect()
+    with connection:
+        index._insert_rows(connection, rows)
+
+
+def time_it(func, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FrameIndexHelper(os.path.join(tmp, 'frames.sqlite3'), tmp)
+
+        start = time.perf_counter()
+        fill(index, args.frames)
+        print(f"Indexed {args.frames} frames in {time.perf_counter() - start:.1f} s, median of {args.runs} runs")
+        print()
+        print("| Query | ms | frames |")
+        print("|---|---:|---:|")
+
+        queries = [
+            ('bbox 200 m', lambda: index.bbox(CENTER_LAT - 0.001, CENTER_LON - 0.001,
+                                              CENTER_LAT + 0.001, CENTER_LON + 0.001, limit=1000)),
+            ('bbox 2 km, limit 1000', lambda: index.bbox(CENTER_LAT - 0.01, CENTER_LON - 0.01,
+                                                         CENTER_LAT + 0.01, CENTER_LON + 0.01, limit=1000)),
+            ('radius 50 m', lambda: index.radius(CENTER_LAT, CENTER_LON, 50)),
+            ('radius 500 m', lambda: index.radius(CENTER_LAT, CENTER_LON, 500)),
+            ('nearest 10', lambda: index.nearest(CENTER_LAT, CENTER_LON, 10)),
+            ('nearest 100', lambda: index.nearest(CENTER_LAT, CENTER_LON, 100)),
+            ('time range 1 hour', lambda: index.time_range(START_EPOCH, START_EPOCH + 3600, limit=1000)),
+            ('radius 500 m + 1 week', lambda: index.radius(CENTER_LAT, CENTER_LON, 500,
+                                                           START_EPOCH, START_EPOCH + 7 * 24 * 3600)),
+        ]
+        for name, query in queries:
+            ms, frames = time_it(query, args.runs)
+            print(f"| {name} | {ms:.2f} | {len(frames)} |")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark handing decoded frames to encoder processes
+Input:
+    - None; synthetic aerial frames (see benchmarks.synthetic), 4K by default
+Output:
+    - Markdown table per task with throughput and parent CPU time per frame
+      for frames pickled into a process pool against slot indexes into the
+      shared-memory frame ring (FrameRingHelper). The 'touch' task only
+      reads the frame, so it measures the transfer alone; 'jpeg' encodes it.
+      In-flight frames are bounded to the ring size in both cases.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_frame_ring [--size 3840x2160] [--frames 120] [--workers 2] [--tasks touch,jpeg]
+"""
+
+import argparse
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import iter_frames
+from helpers.FrameRingHelper import FrameRingHelper, SLOTS_PER_WORKER
+from helpers.FrameWriterHelper import FrameWriterHelper
+
+
+def touch(frame: np.ndarray) -> int:
+    """Read a sparse grid of pixels: the cost of getting the frame, not of using it"""
+    return int(frame[::64, ::64].sum())
+
+
+def encode_jpeg(frame: np.ndarray) -> int:
+    return len(FrameWriterHelper().encode(frame))
+
+
+TASKS = {'touch': touch, 'jpeg': encode_jpeg}
+
+
+def run_pickled(sources, frame_count: int, workers: int, task) -> tuple:
+    """Each frame is a new array (as cv2 returns them) pickled through the pool's call queue"""
+    in_flight = threading.BoundedSemaphore(workers * SLOTS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        # Start the workers before timing
+        for future in [pool.submit(touch, sources[0][:8, :8]) for _ in range(workers)]:
+            future.result()
+
+        def timed():
+            futures = []
+            for index in range(frame_count):
+                frame = sources[index % len(sources)].copy()
+                in_flight.acquire()
+                future = pool.submit(task, frame)
+                future.add_done_callback(lambda _: in_flight.release())
+                futures.append(future)
+            for future in futures:
+                future.result()
+        return measure(timed)
+
+
+def run_ring(sources, frame_count: int, workers: int, task) -> tuple:
+    """Each frame is copied into a free slot (as cv2 decodes into it) and only the index is sent"""
+    with FrameRingHelper(sources[0].shape, workers) as ring:
+        for slot in range(workers):
+            ring.submit(ring.acquire(), touch)
+        ring.wait()
+
+        def timed():
+            for index in range(frame_count):
+                slot = ring.acquire()
+                np.copyto(ring.frames[slot], sources[index % len(sources)])
+                ring.submit(slot, task)
+            ring.wait()
+        return measure(timed)
+
+
+def measure(func) -> tuple:
+    """Wall and parent CPU seconds of func"""
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    func()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='3840x2160')
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--tasks', default='touch,jpeg')
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.split('x'))
+    sources = list(iter_frames(width, height, 4))
+    frame_mb = width * height * 3 / 1e6
+
+    print(f"{width}x{height} ({frame_mb:.1f} MB per frame), {args.frames} frames, {args.workers} workers, "
+          f"{args.workers * SLOTS_PER_WORKER} frames in flight")
+    print()
+    print("| Task | Transport | Wall s | Frames / s | Parent CPU ms / frame | Frame MB / s |")
+    print("|---|---|---:|---:|---:|---:|")
+    for task_name in args.tasks.split(','):
+        task = TASKS[task_name]
+        for transport, run in (('pickle', run_pickled), ('shared ring', run_ring)):
+            wall, cpu = run(sources, args.frames, args.workers, task)
+            print(f"| {task_name} | {transport} | {wall:.2f} | {args.frames / wall:.1f} | "
+                  f"{cpu * 1000 / args.frames:.2f} | {args.frames * frame_mb / wall:.0f} |")
+
+
+if __name__ == '__main__':
+    main()
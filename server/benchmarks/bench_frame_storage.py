@@ -0,0 +1,110 @@
+"""
+Benchmark storing frames in S3 compatible object storage
+Input:
+    - An S3 compatible endpoint (MinIO, ...) or, by default, a local moto
+      server (pip install moto); the bucket is created if missing
+    - Synthetic frame-sized objects; latency is added to every PUT, and one
+      PUT is made much slower, to stand in for a remote bucket
+Output:
+    - Markdown table comparing one PUT after another (what a job waiting on
+      each frame would do) with S3FrameStorage: total time, and the longest
+      time the producing job was blocked in a single put
+
+Usage (from the server directory):
+    python -m benchmarks.bench_frame_storage [--endpoint-url http://127.0.0.1:9000] [--bucket frames]
+        [--objects 200] [--size 300000] [--latency-ms 50] [--slow-ms 2000]
+"""
+
+import argparse
+import os
+import time
+
+from helpers.FrameStorageHelper import S3FrameStorage, boto3
+
+
+def add_latency(client, latency_ms: float, slow_ms: float) -> None:
+    """Sleep before every PutObject; the first one sleeps slow_ms instead"""
+    calls = {'count': 0}
+
+    def delay(**_):
+        calls['count'] += 1
+        time.sleep((slow_ms if calls['count'] == 1 else latency_ms) / 1000)
+
+    client.meta.events.register('before-send.s3.PutObject', delay)
+
+
+def run_sequential(client, bucket: str, payloads, args) -> tuple:
+    add_latency(client, args.latency_ms, args.slow_ms)
+    longest = 0.0
+    start = time.perf_counter()
+    for index, data in enumerate(payloads):
+        put_start = time.perf_counter()
+        client.put_object(Bucket=bucket, Key=f"sequential/frame_{index:06d}.jpg", Body=data)
+        longest = max(longest, time.perf_counter() - put_start)
+    return time.perf_counter() - start, longest
+
+
+def run_storage(storage: S3FrameStorage, payloads, args) -> tuple:
+    add_latency(storage.client, args.latency_ms, args.slow_ms)
+    futures = []
+    longest = 0.0
+    start = time.perf_counter()
+    for index, data in enumerate(payloads):
+        put_start = time.perf_counter()
+        futures.append(storage.put(f"frame_{index:06d}.jpg", data))
+        longest = max(longest, time.perf_counter() - put_start)
+    storage.wait(futures)
+    return time.perf_counter() - start, longest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint-url')
+    parser.add_argument('--bucket', default='frames')
+    parser.add_argument('--objects', type=int, default=200)
+    parser.add_argument('--size', type=int, default=300000, help='Bytes per object (a 1080p JPEG is about 300 KB)')
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--slow-ms', type=float, default=2000)
+    args = parser.parse_args()
+
+    if boto3 is None:
+        raise SystemExit("boto3 is not installed")
+
+    server = None
+    endpoint_url = args.endpoint_url
+    if endpoint_url is None:
+        from moto.server import ThreadedMotoServer
+        for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+            os.environ.setdefault(name, 'bench')
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+        server = ThreadedMotoServer(port=0, verbose=False)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint_url = f"http://{host}:{port}"
+
+    try:
+        client = boto3.client('s3', endpoint_url=endpoint_url)
+        try:
+            client.create_bucket(Bucket=args.bucket)
+        except client.exceptions.BucketAlreadyOwnedByYou:
+            pass
+        payloads = [os.urandom(args.size) for _ in range(args.objects)]
+
+        print(f"{args.objects} objects of {args.size} bytes, {args.latency_ms:.0f} ms per PUT, "
+              f"one PUT of {args.slow_ms:.0f} ms, endpoint {endpoint_url}")
+        print()
+        print("| Upload | Total s | Objects / s | Longest producer stall ms |")
+        print("|---|---:|---:|---:|")
+        total, longest = run_sequential(client, args.bucket, payloads, args)
+        print(f"| sequential put_object | {total:.2f} | {args.objects / total:.1f} | {longest * 1000:.0f} |")
+        storage = S3FrameStorage(args.bucket, 'bench', endpoint_url=endpoint_url)
+        total, longest = run_storage(storage, payloads, args)
+        print(f"| S3FrameStorage ({storage.max_workers} workers) | {total:.2f} | {args.objects / total:.1f} | "
+              f"{longest * 1000:.0f} |")
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark the per-video frame timeline (FrameTimelineHelper)
+Input:
+    - Optional video file (defaults to a synthetic 1280x720 clip, 60 s, 2 s GOP)
+Output:
+    - Markdown table with the cost of indexing (packets only) against a full
+      decode, the index file size and the time to load it back
+    - Markdown table with random-access reads of frames a few seconds apart
+      (the interval geotagger's pattern) per reader, without a timeline
+      (every read seeks or uses the frame rate heuristic) and with one (seeks
+      only when a keyframe lies between the decoder and the frame)
+
+Usage (from the server directory):
+    python -m benchmarks.bench_frame_timeline [video_path] [--step-seconds 2.5] [--runs 3]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.synthetic import write_video
+from helpers.FrameReaderHelper import Cv2FrameReader, PyAVFrameReader, av
+from helpers.FrameTimelineHelper import FrameTimelineHelper
+
+
+def full_decode(video_path: str) -> int:
+    """Decode every frame with cv2, the cost an index built from frames would pay"""
+    video = cv2.VideoCapture(video_path)
+    count = 0
+    while video.grab():
+        count += 1
+    video.release()
+    return count
+
+
+def read_frames(open_reader, frame_numbers) -> int:
+    reader = open_reader()
+    read = sum(reader.read(int(frame_number)) is not None for frame_number in frame_numbers)
+    reader.release()
+    return read
+
+
+def best_of(runs: int, func) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video_path', nargs='?')
+    parser.add_argument('--step-seconds', type=float, default=2.5)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        video_path = args.video_path
+        if video_path is None:
+            video_path = os.path.join(temp_dir, 'synthetic.mp4')
+            print("Writing synthetic clip...")
+            write_video(video_path, 1280, 720, 30, 60, 60)
+
+        index_dir = os.path.join(temp_dir, 'timelines')
+        start = time.perf_counter()
+        timeline = FrameTimelineHelper(index_dir).get(video_path, 'bench')
+        index_time = time.perf_counter() - start
+        index_size = os.path.getsize(os.path.join(index_dir, 'bench.npz')) if timeline.keyframes is not None else 0
+        load_time = best_of(args.runs, lambda: FrameTimelineHelper(index_dir).get(video_path, 'bench'))
+        decode_time = best_of(1, lambda: full_decode(video_path))
+
+        keyframes = int(timeline.keyframes.sum()) if timeline.keyframes is not None else 'unknown'
+        print(f"{timeline.frame_count} frames, {keyframes} keyframes, {timeline.duration:.1f} s")
+        print()
+        print("| Step | Time s | Note |")
+        print("|---|---:|---|")
+        print(f"| index (packets only) | {index_time:.3f} | {index_size} bytes on disk |")
+        print(f"| load index | {load_time:.4f} | new helper, from disk |")
+        print(f"| full decode (cv2 grab) | {decode_time:.3f} | for comparison |")
+        print()
+
+        frame_numbers = sorted(set(timeline.frames_at(
+            [index * args.step_seconds for index in range(int(timeline.duration / args.step_seconds) + 1)])))
+        readers = [
+            ('cv2', lambda tl: (lambda: Cv2FrameReader(cv2.VideoCapture(video_path), tl))),
+        ]
+        if av is not None:
+            readers.append(('pyav', lambda tl: (lambda: PyAVFrameReader(video_path, None, tl))))
+
+        print(f"Reading {len(frame_numbers)} frames {args.step_seconds} s apart, best of {args.runs} runs")
+        print()
+        print("| Reader | Without timeline s | With timeline s |")
+        print("|---|---:|---:|")
+        for name, make in readers:
+            without = best_of(args.runs, lambda: read_frames(make(None), frame_numbers))
+            with_timeline = best_of(args.runs, lambda: read_frames(make(timeline), frame_numbers))
+            print(f"| {name} | {without:.2f} | {with_timeline:.2f} |")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
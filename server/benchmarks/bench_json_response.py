@@ -0,0 +1,100 @@
+"""
+Benchmark JSON serialization and compression of a saved_frames manifest
+Input:
+    - Optional JSON manifest (defaults to result-all.json)
+Output:
+    - Markdown table with serialization time and bytes on the wire per path
+
+Usage (from the server directory):
+    python -m benchmarks.bench_json_response [manifest_path] [--runs N]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+from flask import Flask
+
+from helpers.ResponseHelper import ResponseHelper, brotli, orjson, GZIP_LEVEL, BROTLI_QUALITY
+
+
+def with_numpy_floats(manifest: dict) -> dict:
+    """Telemetry values as NumPy floats, as they come out of pandas"""
+    frames = []
+    for frame in manifest['saved_frames']:
+        frame = dict(frame)
+        frame['telemetry'] = {key: np.float64(value) for key, value in frame['telemetry'].items()}
+        frames.append(frame)
+    return {'saved_frames': frames}
+
+
+def time_it(func, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest_path', nargs='?', default='result-all.json')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.manifest_path, 'r') as f:
+        manifest = with_numpy_floats(json.load(f))
+
+    app = Flask(__name__)
+    helper = ResponseHelper()
+
+    def streamed(encoding):
+        return b''.join(helper.iter_chunks(helper.iter_json(manifest), encoding))
+
+    print(f"Manifest: {os.path.basename(args.manifest_path)}, {len(manifest['saved_frames'])} frames, "
+          f"median of {args.runs} runs")
+    if orjson is None:
+        print("orjson is not installed; the streamed rows use the json module")
+    print()
+    print("| Path | ms | bytes on the wire |")
+    print("|---|---:|---:|")
+
+    with app.app_context():
+        # jsonify: sorted keys, json module, NumPy floats go through float.__repr__
+        ms, body = time_it(lambda: app.json.dumps(manifest).encode(), args.runs)
+        print(f"| jsonify (previous) | {ms:.1f} | {len(body)} |")
+        ms, body = time_it(lambda: gzip.compress(app.json.dumps(manifest).encode()), args.runs)
+        print(f"| jsonify + gzip level 9 | {ms:.1f} | {len(body)} |")
+
+    ms, body = time_it(lambda: streamed(None), args.runs)
+    print(f"| streamed, identity | {ms:.1f} | {len(body)} |")
+    assert json.loads(body) == json.loads(json.dumps(manifest, default=float))
+
+    for level in (1, GZIP_LEVEL, 9):
+        ms, body = time_it(lambda: zlib.compress(streamed(None), level), args.runs)
+        print(f"| streamed, gzip level {level} | {ms:.1f} | {len(body) + 18} |")
+
+    ms, body = time_it(lambda: streamed('gzip'), args.runs)
+    print(f"| streamed, gzip (response default) | {ms:.1f} | {len(body)} |")
+    assert json.loads(gzip.decompress(body)) == json.loads(json.dumps(manifest, default=float))
+
+    if brotli is not None:
+        for quality in (1, BROTLI_QUALITY, 5, 11):
+            ms, body = time_it(lambda: brotli.compress(streamed(None), quality=quality), args.runs)
+            print(f"| streamed, brotli quality {quality} | {ms:.1f} | {len(body)} |")
+
+        ms, body = time_it(lambda: streamed('br'), args.runs)
+        print(f"| streamed, brotli (response default) | {ms:.1f} | {len(body)} |")
+    else:
+        print()
+        print("Brotli is not installed; brotli rows skipped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark preview decode paths (cv2 full decode + resize vs PyAV scaled decode)
+Input:
+    - Optional video file (defaults to a synthetic 4K clip)
+Output:
+    - Markdown table with extraction time per decoder
+
+Usage (from the server directory):
+    python -m benchmarks.bench_preview_decode [video_path] [--frames N] [--runs N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from helpers.VideoHelper import VideoHelper
+from helpers.FrameReaderHelper import av
+
+
+def write_synthetic_clip(path: str, width: int = 3840, height: int = 2160, fps: int = 30, seconds: int = 10) -> None:
+    """Noisy moving gradient so the encoder can not skip work"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 48, (height, width, 3), dtype=np.uint8)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    for i in range(fps * seconds):
+        row = ((x + i * 4) % 256).astype(np.uint8)
+        frame = cv2.add(np.broadcast_to(row[None, :, None], (height, width, 3)).copy(), noise)
+        writer.write(frame)
+    writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video_path', nargs='?')
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    video_path = args.video_path
+    temp_path = None
+    if video_path is None:
+        temp_path = os.path.join(tempfile.mkdtemp(), 'synthetic_4k.mp4')
+        print("Writing synthetic 4K clip...")
+        write_synthetic_clip(temp_path)
+        video_path = temp_path
+
+    decoders = ['cv2'] + (['pyav'] if av is not None else [])
+    if av is None:
+        print("PyAV is not installed; only the cv2 path is measured")
+
+    metadata = VideoHelper().get_video_metadata(video_path)
+    print(f"Source: {metadata.get('width')}x{metadata.get('height')}, {metadata.get('frame_count')} frames, "
+          f"extracting {args.frames} previews, best of {args.runs} runs")
+    print()
+    print("| Decoder | split_video_to_frames s | extract_frames_at_timestamps s |")
+    print("|---|---:|---:|")
+
+    duration = metadata.get('duration', 0)
+    timestamps = [duration * i / args.frames for i in range(args.frames)]
+    for decoder in decoders:
+        helper = VideoHelper(preview_decoder=decoder)
+        split_times, extract_times = [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            helper.split_video_to_frames(video_path, args.frames)
+            split_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            helper.extract_frames_at_timestamps(video_path, timestamps)
+            extract_times.append(time.perf_counter() - start)
+        print(f"| {decoder} | {min(split_times):.2f} | {min(extract_times):.2f} |")
+
+    if temp_path:
+        os.unlink(temp_path)
+        os.rmdir(os.path.dirname(temp_path))
+
+
+if __name__ == '__main__':
+    main()
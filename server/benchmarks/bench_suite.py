@@ -0,0 +1,537 @@
+"""
+Benchmark suite for the helpers and endpoints on synthetic fixtures
+Input:
+    - Fixture parameters (resolution, fps, GOP length, duration), see
+      benchmarks/synthetic.py; fixtures are cached between runs
+Output:
+    - JSON with wall and CPU time, peak RSS and a result summary per case,
+      plus the environment it ran in; compare two files with
+      python -m benchmarks.compare
+
+Every case runs in a fresh process: setup, one untimed warm-up run (lazy
+imports, first-touch allocations), then the timed runs. Peak RSS is the
+high-water mark of each timed run (reset between runs on Linux), so a
+case's number does not include memory left behind by another case.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_suite [--preset quick|default|4k] [--width W] [--height H] [--fps F]
+        [--gop G] [--duration S] [--runs N] [--only PATTERN] [--output results.json]
+"""
+
+import argparse
+import fnmatch
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from benchmarks.synthetic import make_fixtures
+
+PRESETS = {
+    'quick': {'width': 640, 'height': 360, 'fps': 30, 'gop': 30, 'duration': 10.0},
+    'default': {'width': 1280, 'height': 720, 'fps': 30, 'gop': 30, 'duration': 20.0},
+    '4k': {'width': 3840, 'height': 2160, 'fps': 30, 'gop': 60, 'duration': 10.0},
+}
+
+# Fast cases repeat their body so one run is long enough to time reliably
+EXIF_ITERATIONS = 200
+LOCATION_ITERATIONS = 20
+PREVIEW_FRAMES = 30
+
+SCHEMA_VERSION = 1
+
+
+class Case(NamedTuple):
+    run: Callable[[], Dict]
+    reset: Optional[Callable[[], None]] = None
+
+
+CASES = {}
+
+
+def case(name: str, group: str):
+    """Register a case; the function does the setup and returns a Case"""
+    def register(func):
+        CASES[name] = (group, func)
+        return func
+    return register
+
+
+def clear_dir(path: str) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def log_markers(log_path: str, step: int = 10) -> List[Dict]:
+    """Every step-th flight log row as an /interpolate-path marker, seconds from the start"""
+    import pandas as pd
+    df = pd.read_csv(log_path, sep=';')
+    times = pd.to_datetime(df['datetime(utc)'])
+    seconds = (times - times.iloc[0]).dt.total_seconds()
+    return [
+        {'timestamp': float(seconds.iloc[i]), 'lat': float(df['latitude'].iloc[i]), 'lng': float(df['longitude'].iloc[i])}
+        for i in range(0, len(df), step)
+    ]
+
+
+# VideoHelper
+
+@case('video.get_video_metadata', 'VideoHelper')
+def video_metadata(fixtures: Dict, workdir: str) -> Case:
+    from helpers.VideoHelper import VideoHelper
+    helper = VideoHelper()
+    return Case(lambda: {'frame_count': helper.get_video_metadata(fixtures['video']['path'])['frame_count']})
+
+
+@case('video.split_video_to_frames', 'VideoHelper')
+def video_split(fixtures: Dict, workdir: str) -> Case:
+    from helpers.VideoHelper import VideoHelper
+    helper = VideoHelper()
+    return Case(lambda: {'frames': len(helper.split_video_to_frames(fixtures['video']['path'], PREVIEW_FRAMES))})
+
+
+@case('video.extract_frames_at_timestamps', 'VideoHelper')
+def video_extract(fixtures: Dict, workdir: str) -> Case:
+    from helpers.VideoHelper import VideoHelper
+    helper = VideoHelper()
+    duration = fixtures['config']['duration']
+    timestamps = [duration * i / PREVIEW_FRAMES for i in range(PREVIEW_FRAMES)]
+
+    def run():
+        frames = helper.extract_frames_at_timestamps(fixtures['video']['path'], timestamps)
+        return {'frames': sum(1 for frame in frames if frame)}
+    return Case(run)
+
+
+@case('video.url_mode_encode', 'VideoHelper')
+def video_url_mode(fixtures: Dict, workdir: str) -> Case:
+    """Store the video, describe preview frames and encode each one, cold frame cache"""
+    from helpers.FrameCacheHelper import FrameCacheHelper
+    from helpers.VideoHelper import VideoHelper
+    cache_dir = os.path.join(workdir, 'frame_cache')
+    store_dir = os.path.join(workdir, 'video_store')
+
+    def run():
+        helper = VideoHelper(store_dir=store_dir,
+                             frame_cache=FrameCacheHelper(cache_dir, 64 * 1024 * 1024, 256 * 1024 * 1024))
+        video_id = helper.store_video(fixtures['video']['path'])
+        frames = helper.describe_split_frames(video_id, PREVIEW_FRAMES)
+        encoded = [helper.get_encoded_frame(video_id, frame['frame_number']) for frame in frames]
+        return {'frames': sum(1 for frame in encoded if frame)}
+
+    def reset():
+        clear_dir(cache_dir)
+        clear_dir(store_dir)
+    return Case(run, reset)
+
+
+# Geotaggers
+
+@case('geotagger.process_video_all', 'GeotaggerHelper')
+def geotagger_all(fixtures: Dict, workdir: str) -> Case:
+    from helpers.GeotaggerHelper import GeotaggerHelper
+    output_dir = os.path.join(workdir, 'drone_frames')
+
+    def run():
+        helper = GeotaggerHelper(fixtures['log']['path'], fixtures['video']['path'], output_dir)
+        helper.load_telemetry_data()
+        helper.load_video()
+        return {'frames': len(helper.process_video_all())}
+    return Case(run, lambda: clear_dir(output_dir))
+
+
+@case('geotagger_interval.process_video', 'GeotaggerHelperInterval')
+def geotagger_interval(fixtures: Dict, workdir: str) -> Case:
+    from helpers.GeotaggerHelperInterval import GeotaggerHelperInterval
+    output_dir = os.path.join(workdir, 'drone_frames')
+
+    def run():
+        helper = GeotaggerHelperInterval(fixtures['log']['path'], fixtures['video']['path'], output_dir, 1)
+        helper.load_telemetry_data()
+        helper.load_video()
+        return {'frames': len(helper.process_video())}
+    return Case(run, lambda: clear_dir(output_dir))
+
+
+# LocationHelper
+
+@case('location.interpolate_locations', 'LocationHelper')
+def location_interpolate(fixtures: Dict, workdir: str) -> Case:
+    from helpers.LocationHelper import LocationHelper
+    helper = LocationHelper()
+    points = [{'timestamp': m['timestamp'], 'lat': m['lat'], 'lon': m['lng']}
+              for m in log_markers(fixtures['log']['path'], step=1)]
+
+    def run():
+        for _ in range(LOCATION_ITERATIONS):
+            result = helper.interpolate_locations([dict(point) for point in points], 1)
+        return {'points': len(points), 'interpolated': len(result), 'iterations': LOCATION_ITERATIONS}
+    return Case(run)
+
+
+@case('location.calculate_path_stats', 'LocationHelper')
+def location_path_stats(fixtures: Dict, workdir: str) -> Case:
+    from helpers.LocationHelper import LocationHelper
+    helper = LocationHelper()
+    points = [{'timestamp': m['timestamp'], 'lat': m['lat'], 'lon': m['lng']}
+              for m in log_markers(fixtures['log']['path'], step=1)]
+
+    def run():
+        for _ in range(LOCATION_ITERATIONS):
+            stats = helper.calculate_path_stats(points)
+        return {'points': len(points), 'total_distance': round(stats['total_distance'], 3),
+                'iterations': LOCATION_ITERATIONS}
+    return Case(run)
+
+
+# ExifHelper
+
+@case('exif.get_exif_data', 'ExifHelper')
+def exif_read(fixtures: Dict, workdir: str) -> Case:
+    from helpers.ExifHelper import ExifHelper
+    helper = ExifHelper()
+    path = fixtures['still']['path']
+
+    def run():
+        for _ in range(EXIF_ITERATIONS):
+            data = helper.get_exif_data(path)
+        return {'latitude': data['latitude'], 'iterations': EXIF_ITERATIONS}
+    return Case(run)
+
+
+@case('exif.apply_gps_data', 'ExifHelper')
+def exif_write(fixtures: Dict, workdir: str) -> Case:
+    from helpers.ExifHelper import ExifHelper
+    helper = ExifHelper()
+    path = fixtures['still']['path']
+    gps_data = {'gps_latitude': [7, 16, 48.0], 'gps_latitude_ref': 'S',
+                'gps_longitude': [112, 47, 24.0], 'gps_longitude_ref': 'E',
+                'gps_altitude': 61.0, 'gps_altitude_ref': 'ABOVE_SEA_LEVEL'}
+    iterations = EXIF_ITERATIONS // 10
+
+    def run():
+        for _ in range(iterations):
+            image_bytes, _ = helper.apply_gps_data(path, gps_data)
+        return {'bytes': len(image_bytes), 'iterations': iterations}
+    return Case(run)
+
+
+# End to end through the Flask test client
+
+def test_client(workdir: str):
+    """Flask test client with all server state under workdir"""
+    os.environ['GEOTAGGER_DATA_DIR'] = os.path.join(workdir, 'data')
+    import app
+    return app, app.app.test_client()
+
+
+def post(client, url: str, data: Dict, files: Dict[str, str], admission_endpoint: Optional[str] = None) -> Dict:
+    """
+    POST a multipart form, read the whole (possibly streamed) body, return status and size
+
+    With admission_endpoint, also check that the job still holds its admission slot once the first
+    chunk of the body is out, i.e. that a streamed body is produced inside the slot
+    """
+    handles = {field: open(path, 'rb') for field, path in files.items()}
+    try:
+        form = dict(data)
+        form.update({field: (handle, os.path.basename(path))
+                     for (field, path), handle in zip(files.items(), handles.values())})
+        response = client.post(url, data=form, headers={'Accept-Encoding': 'gzip'})
+        chunks = []
+        for chunk in response.response:
+            if not chunks and admission_endpoint is not None and response.status_code == 200:
+                import app
+                if app.ADMISSION.stats()['endpoints'][admission_endpoint]['active'] < 1:
+                    raise Exception(f"{url} released its admission slot before its body was sent")
+            chunks.append(chunk)
+        body = b''.join(chunks)
+        response.close()
+    finally:
+        for handle in handles.values():
+            handle.close()
+    if response.status_code != 200:
+        raise Exception(f"{url} returned {response.status_code}: {body[:200]!r}")
+    return {'status': response.status_code, 'response_bytes': len(body)}
+
+
+@case('e2e.read_metadata', 'Flask')
+def e2e_read_metadata(fixtures: Dict, workdir: str) -> Case:
+    _, client = test_client(workdir)
+    return Case(lambda: post(client, '/read-metadata', {}, {'image': fixtures['still']['path']}))
+
+
+@case('e2e.write_metadata', 'Flask')
+def e2e_write_metadata(fixtures: Dict, workdir: str) -> Case:
+    _, client = test_client(workdir)
+    metadata = json.dumps({'gps_latitude': [7, 16, 48.0], 'gps_latitude_ref': 'S',
+                           'gps_longitude': [112, 47, 24.0], 'gps_longitude_ref': 'E'})
+    return Case(lambda: post(client, '/write-metadata', {'metadata': metadata},
+                             {'image': fixtures['still']['path']}))
+
+
+def cold_frame_cache(app, workdir: str) -> Callable[[], None]:
+    """Reset that swaps in an empty frame cache, so every run decodes and encodes"""
+    from helpers.FrameCacheHelper import FrameCacheHelper
+    cache_dir = os.path.join(workdir, 'cold_frame_cache')
+
+    def reset():
+        clear_dir(cache_dir)
+        app.FRAME_CACHE = FrameCacheHelper(cache_dir)
+    return reset
+
+
+@case('e2e.split_video', 'Flask')
+def e2e_split_video(fixtures: Dict, workdir: str) -> Case:
+    app, client = test_client(workdir)
+    form = {'max_frames': str(PREVIEW_FRAMES), 'frame_mode': 'inline'}
+    return Case(lambda: post(client, '/split-video', form, {'video': fixtures['video']['path']}),
+                cold_frame_cache(app, workdir))
+
+
+@case('e2e.interpolate_path', 'Flask')
+def e2e_interpolate_path(fixtures: Dict, workdir: str) -> Case:
+    app, client = test_client(workdir)
+    markers = log_markers(fixtures['log']['path'], step=fixtures['config']['fps'])
+    form = {'markers': json.dumps(markers), 'frame_mode': 'inline'}
+    return Case(lambda: post(client, '/interpolate-path', form, {'video': fixtures['video']['path']},
+                             admission_endpoint='interpolate-path'),
+                cold_frame_cache(app, workdir))
+
+
+@case('e2e.geotagger_video_interval', 'Flask')
+def e2e_geotagger_interval(fixtures: Dict, workdir: str) -> Case:
+    app, client = test_client(workdir)
+    files = {'video': fixtures['video']['path'], 'csv': fixtures['log']['path']}
+
+    def reset():
+        # Every run does the work instead of hitting the result cache
+        clear_dir(app.RESULT_CACHE.cache_dir)
+        clear_dir(app.DRONE_FRAMES_DIR)
+    return Case(lambda: post(client, '/geotagger-video-interval', {'frame_interval': '1'}, files), reset)
+
+
+@case('e2e.geotagger_video_interval_cached', 'Flask')
+def e2e_geotagger_interval_cached(fixtures: Dict, workdir: str) -> Case:
+    app, client = test_client(workdir)
+    files = {'video': fixtures['video']['path'], 'csv': fixtures['log']['path']}
+    # The warm-up run fills the result cache; timed runs measure hashing and the cache hit
+    return Case(lambda: post(client, '/geotagger-video-interval', {'frame_interval': '1'}, files))
+
+
+@case('e2e.geotagger_video', 'Flask')
+def e2e_geotagger_video(fixtures: Dict, workdir: str) -> Case:
+    app, client = test_client(workdir)
+    files = {'video': fixtures['video']['path'], 'csv': fixtures['log']['path']}
+
+    def reset():
+        clear_dir(app.RESULT_CACHE.cache_dir)
+        clear_dir(app.DRONE_FRAMES_DIR)
+    return Case(lambda: post(client, '/geotagger-video', {}, files), reset)
+
+
+# Runner
+
+def read_status_kb(field: str) -> Optional[int]:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset VmHWM to the current RSS (Linux 4.0+)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kb() -> int:
+    peak = read_status_kb('VmHWM')
+    if peak is not None:
+        return peak
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+
+def summarize(samples: List[float]) -> Dict:
+    return {
+        'median': round(statistics.median(samples), 3),
+        'mean': round(statistics.fmean(samples), 3),
+        'min': round(min(samples), 3),
+        'max': round(max(samples), 3),
+        'stdev': round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        'samples': [round(sample, 3) for sample in samples]
+    }
+
+
+def run_case(name: str, fixtures: Dict, runs: int, queue) -> None:
+    """Child process body: set up one case, warm up, time it, report through queue"""
+    group, setup = CASES[name]
+    workdir = tempfile.mkdtemp(prefix='geotagger-bench-')
+    result = {'name': name, 'group': group, 'runs': runs}
+    try:
+        # Helpers print progress; keep the report readable
+        sys.stdout = open(os.devnull, 'w')
+        bench_case = setup(fixtures, workdir)
+
+        if bench_case.reset:
+            bench_case.reset()
+        start = time.perf_counter()
+        bench_case.run()
+        result['first_run_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        result['baseline_rss_mb'] = round((read_status_kb('VmRSS') or 0) / 1024, 1)
+
+        wall, cpu, peaks = [], [], []
+        per_run_peak = reset_peak_rss()
+        for _ in range(runs):
+            if bench_case.reset:
+                bench_case.reset()
+            reset_peak_rss()
+            cpu_start = time.process_time()
+            start = time.perf_counter()
+            summary = bench_case.run()
+            wall.append((time.perf_counter() - start) * 1000)
+            cpu.append((time.process_time() - cpu_start) * 1000)
+            peaks.append(peak_rss_kb() / 1024)
+
+        result.update({
+            'wall_ms': summarize(wall),
+            'cpu_ms': summarize(cpu),
+            'peak_rss_mb': round(max(peaks), 1),
+            'peak_rss_per_run': per_run_peak,
+            'summary': summary
+        })
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {str(e)}"
+        result['traceback'] = traceback.format_exc()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    queue.put(result)
+
+
+def run_isolated(name: str, fixtures: Dict, runs: int) -> Dict:
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=run_case, args=(name, fixtures, runs, queue))
+    process.start()
+    try:
+        result = queue.get()
+    except KeyboardInterrupt:
+        process.terminate()
+        raise
+    process.join()
+    return result
+
+
+def package_versions() -> Dict:
+    versions = {}
+    for name in ('opencv-python', 'opencv-python-headless', 'numpy', 'pandas', 'av', 'Flask', 'orjson',
+                 'Pillow', 'exif', 'piexif', 'geopy'):
+        try:
+            versions[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def git_revision() -> Dict:
+    def git(*args):
+        return subprocess.run(['git'] + list(args), capture_output=True, text=True, timeout=10).stdout.strip()
+    try:
+        return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except (OSError, subprocess.SubprocessError):
+        return {'commit': None, 'dirty': None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--preset', choices=PRESETS, default='default')
+    parser.add_argument('--width', type=int)
+    parser.add_argument('--height', type=int)
+    parser.add_argument('--fps', type=int)
+    parser.add_argument('--gop', type=int)
+    parser.add_argument('--duration', type=float)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--only', action='append', help='Glob over case names, e.g. "video.*"; repeatable')
+    parser.add_argument('--fixtures-dir', default=os.path.join(tempfile.gettempdir(), 'geotagger-bench-fixtures'))
+    parser.add_argument('--output', help='Result file (default: benchmark-<time>.json)')
+    parser.add_argument('--list', action='store_true', help='List the cases and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (group, _) in CASES.items():
+            print(f"{group:24} {name}")
+        return
+
+    config = dict(PRESETS[args.preset])
+    for key in ('width', 'height', 'fps', 'gop', 'duration'):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+
+    names = [name for name in CASES
+             if not args.only or any(fnmatch.fnmatch(name, pattern) for pattern in args.only)]
+    if not names:
+        parser.error('No case matches --only')
+
+    print(f"Fixtures: {config['width']}x{config['height']} {config['fps']} fps, GOP {config['gop']}, "
+          f"{config['duration']:g} s")
+    fixtures = make_fixtures(args.fixtures_dir, **config)
+
+    results = []
+    print()
+    print("| Case | median ms | min ms | CPU ms | peak RSS MB | summary |")
+    print("|---|---:|---:|---:|---:|---|")
+    for name in names:
+        result = run_isolated(name, fixtures, args.runs)
+        results.append(result)
+        if 'error' in result:
+            print(f"| {name} | error | | | | {result['error']} |")
+        else:
+            print(f"| {name} | {result['wall_ms']['median']:.1f} | {result['wall_ms']['min']:.1f} | "
+                  f"{result['cpu_ms']['median']:.1f} | {result['peak_rss_mb']:.1f} | "
+                  f"{json.dumps(result['summary'])} |")
+
+    report = {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'git': git_revision(),
+            'packages': package_versions()
+        },
+        'config': dict(config, preset=args.preset, runs=args.runs),
+        'fixtures': fixtures,
+        'results': results
+    }
+    output = args.output or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print()
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
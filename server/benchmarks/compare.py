@@ -0,0 +1,84 @@
+"""
+Compare two bench_suite result files
+Input:
+    - Baseline and candidate JSON written by benchmarks.bench_suite
+Output:
+    - Markdown table of median wall time and peak RSS per case with the
+      candidate/baseline ratio; cases beyond the threshold are flagged.
+      Exits with status 1 when any case regressed, so it can gate CI
+
+Usage (from the server directory):
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10]
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Optional, Tuple
+
+
+def load(path: str) -> Tuple[Dict, Dict]:
+    with open(path, 'r') as f:
+        report = json.load(f)
+    return {result['name']: result for result in report['results']}, report
+
+
+def ratio(baseline: Optional[float], candidate: Optional[float]) -> Optional[float]:
+    if not baseline or candidate is None:
+        return None
+    return candidate / baseline
+
+
+def format_ratio(value: Optional[float], threshold: float) -> str:
+    if value is None:
+        return 'n/a'
+    flag = ''
+    if value > 1 + threshold:
+        flag = ' slower'
+    elif value < 1 - threshold:
+        flag = ' faster'
+    return f"{value:.2f}x{flag}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative change reported as a regression or improvement (default 0.10)')
+    args = parser.parse_args()
+
+    baseline, baseline_report = load(args.baseline)
+    candidate, candidate_report = load(args.candidate)
+
+    if baseline_report.get('config') != candidate_report.get('config'):
+        print("Warning: the runs used different fixture configs, ratios may not be meaningful")
+        print()
+
+    print("| Case | baseline ms | candidate ms | time | baseline MB | candidate MB | memory |")
+    print("|---|---:|---:|---|---:|---:|---|")
+    regressions = []
+    for name in list(baseline) + [name for name in candidate if name not in baseline]:
+        before, after = baseline.get(name), candidate.get(name)
+        if not before or not after or 'error' in before or 'error' in after:
+            state = 'missing' if not before or not after else 'error'
+            print(f"| {name} | | | {state} | | | |")
+            continue
+
+        time_ratio = ratio(before['wall_ms']['median'], after['wall_ms']['median'])
+        memory_ratio = ratio(before['peak_rss_mb'], after['peak_rss_mb'])
+        if any(value is not None and value > 1 + args.threshold for value in (time_ratio, memory_ratio)):
+            regressions.append(name)
+        print(f"| {name} | {before['wall_ms']['median']:.1f} | {after['wall_ms']['median']:.1f} | "
+              f"{format_ratio(time_ratio, args.threshold)} | {before['peak_rss_mb']:.1f} | "
+              f"{after['peak_rss_mb']:.1f} | {format_ratio(memory_ratio, args.threshold)} |")
+
+    print()
+    if regressions:
+        print(f"Regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"No case regressed beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Synthetic fixtures for the benchmarks
+Output:
+    - A drone-like test video: a textured ground plane panning under the
+      camera, with the frame number burnt in. Resolution, fps, GOP length
+      and duration are configurable; H.264 through PyAV when available,
+      otherwise MPEG-4 Part 2 through cv2 (encoder default GOP)
+    - A matching DJI-style flight log: semicolon separated, 10 Hz, flying
+      a straight survey leg at constant speed, starting with the video
+    - A geotagged still with GPS EXIF, written like GeotaggerHelper frames
+Fixtures are deterministic (fixed seeds), so repeated runs measure the same work.
+
+Usage (from the server directory):
+    python -m benchmarks.synthetic output_dir [--width W] [--height H] [--fps F] [--gop G] [--duration S]
+"""
+
+import argparse
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from helpers.FrameReaderHelper import av
+from helpers.GeotaggerHelper import GeotaggerHelper
+
+LOG_RATE_HZ = 10
+START_TIME = datetime(2024, 11, 25, 3, 31, 0)
+START_LAT = -7.28
+START_LON = 112.79
+ALTITUDE_FEET = 200.0
+SPEED_MPS = 8.0
+HEADING_DEGREES = 30.0
+MPH_PER_MPS = 2.23694
+
+LOG_COLUMNS = [
+    'datetime(utc)', 'latitude', 'longitude', 'altitude(feet)', 'height_above_takeoff(feet)',
+    'speed(mph)', 'compass_heading(degrees)', 'pitch(degrees)', 'roll(degrees)', 'battery_percent',
+    'voltage(v)', 'satellites', 'gpslevel', 'gimbal_heading(degrees)', 'gimbal_pitch(degrees)',
+    'gimbal_roll(degrees)'
+]
+
+
+def ground_texture(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Fields, roads and noise: low frequency blobs plus fine grain"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(40, 200, (max(2, height // 64), max(2, width // 64), 3), dtype=np.uint8)
+    texture = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    for _ in range(max(4, width // 200)):
+        x1, y1, x2, y2 = (int(v) for v in rng.integers(0, max(width, height), 4))
+        cv2.line(texture, (x1, y1), (x2, y2), (90, 90, 90), max(2, width // 300))
+    grain = rng.integers(0, 24, (height, width, 3), dtype=np.uint8)
+    return cv2.add(texture, grain)
+
+
+def iter_frames(width: int, height: int, frame_count: int):
+    """Frames panning diagonally across a ground texture twice the frame size"""
+    texture = ground_texture(width * 2, height * 2)
+    font_scale = max(0.5, height / 360)
+    for number in range(frame_count):
+        progress = number / max(1, frame_count - 1)
+        x = int(progress * width)
+        y = int(progress * height * 0.5)
+        frame = np.ascontiguousarray(texture[y:y + height, x:x + width])
+        cv2.putText(frame, f"{number:06d}", (int(20 * font_scale), int(40 * font_scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), max(1, int(2 * font_scale)))
+        yield frame
+
+
+def write_video(path: str, width: int, height: int, fps: int, duration: float, gop: int) -> Dict:
+    """
+    Write the synthetic video
+
+    Returns:
+        Dict: Codec, frame count and whether the GOP length was applied
+    """
+    frame_count = int(round(fps * duration))
+    if av is not None:
+        container = av.open(path, mode='w')
+        codec = 'libx264' if 'libx264' in av.codecs_available else 'mpeg4'
+        stream = container.add_stream(codec, rate=fps)
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = 'yuv420p'
+        stream.gop_size = gop
+        if codec == 'libx264':
+            # Fixed GOP: no scene-cut keyframes, keyint_min = gop
+            stream.options = {'preset': 'veryfast', 'crf': '23', 'sc_threshold': '0',
+                              'x264-params': f"keyint={gop}:min-keyint={gop}:scenecut=0"}
+        for frame in iter_frames(width, height, frame_count):
+            for packet in stream.encode(av.VideoFrame.from_ndarray(frame, format='bgr24')):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+        container.close()
+        return {'codec': codec, 'frame_count': frame_count, 'gop_applied': True}
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for frame in iter_frames(width, height, frame_count):
+        writer.write(frame)
+    writer.release()
+    return {'codec': 'mp4v', 'frame_count': frame_count, 'gop_applied': False}
+
+
+def write_flight_log(path: str, duration: float, rate_hz: int = LOG_RATE_HZ) -> Dict:
+    """
+    Write a DJI-style semicolon separated flight log covering duration seconds
+
+    Returns:
+        Dict: Row count and the first/last timestamps
+    """
+    rows = int(math.ceil(duration * rate_hz)) + 1
+    heading = math.radians(HEADING_DEGREES)
+    meters_per_degree_lat = 111320.0
+    meters_per_degree_lon = 111320.0 * math.cos(math.radians(START_LAT))
+
+    with open(path, 'w') as f:
+        f.write(';'.join(LOG_COLUMNS) + '\n')
+        for row in range(rows):
+            seconds = row / rate_hz
+            distance = SPEED_MPS * seconds
+            latitude = START_LAT + distance * math.cos(heading) / meters_per_degree_lat
+            longitude = START_LON + distance * math.sin(heading) / meters_per_degree_lon
+            timestamp = START_TIME + timedelta(seconds=seconds)
+            f.write(';'.join(str(value) for value in [
+                timestamp.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                f"{latitude:.7f}", f"{longitude:.7f}",
+                ALTITUDE_FEET, ALTITUDE_FEET,
+                round(SPEED_MPS * MPH_PER_MPS, 2), HEADING_DEGREES, -2.1, 0.4,
+                max(20, 95 - int(seconds / 30)), 15.6, 18, 5,
+                HEADING_DEGREES, -90.0, 0.0
+            ]) + '\n')
+
+    end = START_TIME + timedelta(seconds=(rows - 1) / rate_hz)
+    return {'rows': rows, 'start': START_TIME.isoformat(), 'end': end.isoformat()}
+
+
+def write_still(path: str, width: int, height: int) -> Dict:
+    """A geotagged JPEG, written the way GeotaggerHelper saves frames"""
+    frame = next(iter_frames(width, height, 1))
+    telemetry = {'latitude': START_LAT, 'longitude': START_LON, 'altitude': ALTITUDE_FEET}
+    exif_bytes = GeotaggerHelper(None, None, None).create_exif_bytes(telemetry)
+    Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).save(path, 'jpeg', exif=exif_bytes, quality=90)
+    return {'bytes': os.path.getsize(path)}
+
+
+def make_fixtures(output_dir: str, width: int = 1280, height: int = 720, fps: int = 30, gop: int = 30,
+                  duration: float = 20.0, still_width: Optional[int] = None) -> Dict:
+    """
+    Write the video, flight log and still into output_dir, reusing them when
+    they already exist for the same parameters
+
+    Returns:
+        Dict: Paths and a description of each fixture
+    """
+    config = {'width': width, 'height': height, 'fps': fps, 'gop': gop, 'duration': duration,
+              'still_width': still_width or width}
+    key = '{width}x{height}_{fps}fps_gop{gop}_{duration:g}s'.format(**config)
+    fixture_dir = os.path.join(output_dir, key)
+    manifest_path = os.path.join(fixture_dir, 'fixtures.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('config') == config and all(os.path.exists(manifest[name]['path'])
+                                                    for name in ('video', 'log', 'still')):
+            return manifest
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    video_path = os.path.join(fixture_dir, 'video.mp4')
+    log_path = os.path.join(fixture_dir, 'flight_log.csv')
+    still_path = os.path.join(fixture_dir, 'still.jpg')
+    still_width = config['still_width']
+
+    manifest = {
+        'config': config,
+        'video': dict(path=video_path, **write_video(video_path, width, height, fps, duration, gop)),
+        'log': dict(path=log_path, **write_flight_log(log_path, duration)),
+        'still': dict(path=still_path, **write_still(still_path, still_width, still_width * height // width)),
+    }
+    manifest['video']['bytes'] = os.path.getsize(video_path)
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output_dir')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--gop', type=int, default=30)
+    parser.add_argument('--duration', type=float, default=20.0)
+    args = parser.parse_args()
+
+    manifest = make_fixtures(args.output_dir, args.width, args.height, args.fps, args.gop, args.duration)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import os
+
+from helpers.LazyImportHelper import warm_imports
+
+"""
+Production server (Linux/macOS)
+Usage (from the server directory):
+    gunicorn
+
+The app is imported once in the master and workers are forked from it.
+OpenCV, pandas, PyAV and the image libraries are imported in the master
+too, so their code and data pages are shared copy-on-write by all workers
+instead of being loaded again in each one.
+
+Every worker is a separate process with its own copy of the app's module
+globals, so the limits in app.py are split between them: the worker count
+is passed on as GEOTAGGER_PROCESSES, and each worker gets 1/workers of the
+admission memory budget, job slots and queue, and of the memory tiers of
+the frame and thumbnail caches (at least one slot per endpoint each, so
+with many workers the slot totals can exceed the configured ones). The
+disk tiers are shared: each worker re-reads the cache directory's usage
+now and then, and together they keep it under the one disk budget.
+
+Environment overrides:
+    GEOTAGGER_BIND, GEOTAGGER_WORKERS, GEOTAGGER_THREADS, GEOTAGGER_TIMEOUT
+"""
+
+CPU_COUNT = os.cpu_count() or 1
+
+wsgi_app = 'app:app'
+bind = os.environ.get('GEOTAGGER_BIND', '0.0.0.0:5000')
+preload_app = True
+
+# Video decoding and encoding is CPU bound and already spreads over cv2/FFmpeg
+# threads, so one process per core; threads cover the uploads, metadata and
+# frame requests that mostly wait on I/O
+worker_class = 'gthread'
+workers = int(os.environ.get('GEOTAGGER_WORKERS', max(2, min(CPU_COUNT, 8))))
+threads = int(os.environ.get('GEOTAGGER_THREADS', 4))
+
+# Read by app.py, which is imported after this file, to split its budgets between the workers
+os.environ['GEOTAGGER_PROCESSES'] = str(workers)
+
+# Geotagging a long video holds the request open for minutes
+timeout = int(os.environ.get('GEOTAGGER_TIMEOUT', 600))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to return memory fragmented by large frames
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = '-'
+
+
+def on_starting(server):
+    """Runs in the master before any worker is forked"""
+    timings = warm_imports()
+    server.log.info("Preloaded %s", ', '.join(f"{name} ({ms:g} ms)" for name, ms in timings.items()))
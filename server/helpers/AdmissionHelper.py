@@ -0,0 +1,179 @@
+import math
+import threading
+import time
+from typing import Dict
+
+"""
+Admission control for heavy endpoints
+    - Concurrency slots per endpoint
+    - One memory budget shared by all endpoints; each job reserves its
+      estimated peak memory while it runs
+    - A bounded wait queue; requests that find it full, or that wait
+      longer than the timeout, are rejected with a Retry-After estimate
+"""
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    def __init__(self, helper: 'AdmissionHelper', endpoint: str, memory: int):
+        self.helper = helper
+        self.endpoint = endpoint
+        self.memory = memory
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        """Give the slot and the memory reservation back; safe to call twice"""
+        if not self.released:
+            self.released = True
+            self.helper._release(self)
+
+    def __enter__(self) -> 'AdmissionTicket':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class AdmissionHelper:
+    def __init__(self, memory_budget: int, max_queue: int = 16, queue_timeout: float = 30.0):
+        """
+        Initialize the AdmissionHelper
+
+        Args:
+            memory_budget: Bytes that admitted jobs may reserve in total
+            max_queue: Requests allowed to wait at once, across all endpoints
+            queue_timeout: Seconds a request waits for admission before it is rejected
+        """
+        self.memory_budget = memory_budget
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._condition = threading.Condition()
+        self._endpoints = {}
+        self._memory_in_use = 0
+        self._waiting = 0
+
+    def register(self, endpoint: str, slots: int) -> None:
+        """Allow at most slots concurrent jobs for endpoint"""
+        with self._condition:
+            self._endpoints[endpoint] = {
+                'slots': slots,
+                'active': 0,
+                'waiting': 0,
+                'admitted': 0,
+                'rejected': 0,
+                'timed_out': 0,
+                'total_wait': 0.0,
+                'max_wait': 0.0,
+                # Exponential moving average of job duration, for Retry-After
+                'avg_duration': None
+            }
+
+    def admit(self, endpoint: str, memory: int = 0) -> AdmissionTicket:
+        """
+        Wait for a slot and memory for one job
+
+        Args:
+            endpoint: Name passed to register
+            memory: Estimated peak bytes of the job
+
+        Returns:
+            AdmissionTicket: Release it (or use it as a context manager) when the job ends
+
+        Raises:
+            AdmissionRejected: The queue is full or the wait timed out
+        """
+        # A job larger than the whole budget still runs, but only on its own
+        memory = min(memory, self.memory_budget)
+
+        with self._condition:
+            stats = self._endpoints[endpoint]
+
+            if not self._can_run(stats, memory):
+                if self._waiting >= self.max_queue:
+                    stats['rejected'] += 1
+                    raise AdmissionRejected("Server is busy, too many queued requests",
+                                            self._retry_after(stats))
+
+                self._waiting += 1
+                stats['waiting'] += 1
+                enqueued = time.monotonic()
+                try:
+                    admitted = self._condition.wait_for(lambda: self._can_run(stats, memory), self.queue_timeout)
+                finally:
+                    self._waiting -= 1
+                    stats['waiting'] -= 1
+                waited = time.monotonic() - enqueued
+                self._record_wait(stats, waited)
+
+                if not admitted:
+                    stats['timed_out'] += 1
+                    raise AdmissionRejected(f"Server is busy, no capacity after {self.queue_timeout:g} seconds",
+                                            self._retry_after(stats))
+            else:
+                self._record_wait(stats, 0.0)
+
+            stats['active'] += 1
+            stats['admitted'] += 1
+            self._memory_in_use += memory
+
+        return AdmissionTicket(self, endpoint, memory)
+
+    def _can_run(self, stats: Dict, memory: int) -> bool:
+        """Caller holds the lock"""
+        return stats['active'] < stats['slots'] and self._memory_in_use + memory <= self.memory_budget
+
+    def _record_wait(self, stats: Dict, waited: float) -> None:
+        """Caller holds the lock"""
+        stats['total_wait'] += waited
+        stats['max_wait'] = max(stats['max_wait'], waited)
+
+    def _retry_after(self, stats: Dict) -> int:
+        """Seconds until a slot is likely free; caller holds the lock"""
+        duration = stats['avg_duration'] or 5.0
+        queued_rounds = (stats['waiting'] + 1) / max(1, stats['slots'])
+        return max(1, math.ceil(duration * queued_rounds))
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        duration = time.monotonic() - ticket.started
+        with self._condition:
+            stats = self._endpoints[ticket.endpoint]
+            stats['active'] -= 1
+            self._memory_in_use -= ticket.memory
+            if stats['avg_duration'] is None:
+                stats['avg_duration'] = duration
+            else:
+                stats['avg_duration'] = 0.8 * stats['avg_duration'] + 0.2 * duration
+            self._condition.notify_all()
+
+    def stats(self) -> Dict:
+        """Return queue depth, wait times and memory usage"""
+        with self._condition:
+            endpoints = {}
+            for name, stats in self._endpoints.items():
+                waits = stats['admitted'] + stats['timed_out']
+                endpoints[name] = {
+                    'slots': stats['slots'],
+                    'active': stats['active'],
+                    'queue_depth': stats['waiting'],
+                    'admitted': stats['admitted'],
+                    'rejected': stats['rejected'],
+                    'timed_out': stats['timed_out'],
+                    'avg_wait': round(stats['total_wait'] / waits, 4) if waits else 0,
+                    'max_wait': round(stats['max_wait'], 4),
+                    'avg_duration': round(stats['avg_duration'], 4) if stats['avg_duration'] is not None else None
+                }
+
+            return {
+                'memory_in_use': self._memory_in_use,
+                'memory_budget': self.memory_budget,
+                'queue_depth': self._waiting,
+                'max_queue': self.max_queue,
+                'queue_timeout': self.queue_timeout,
+                'endpoints': endpoints
+            }
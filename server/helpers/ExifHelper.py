@@ -1,10 +1,13 @@
-import io
+import mmap
 import mimetypes
 import json
-from exif import Flash, Image as ExifImage
-from PIL import Image as PILImage
 from fractions import Fraction
-from typing import Union, Dict, Any, Optional, List
+from typing import Union, Dict, Any, Optional, List, Tuple
+
+from helpers.ExifReaderHelper import ExifReaderHelper
+from helpers.LazyImportHelper import lazy_import
+
+exif = lazy_import('exif')
 
 class ExifHelper:
     def __init__(self):
@@ -22,7 +25,7 @@ class ExifHelper:
             return {str(k): self.make_serializable(v) for k, v in value.items()}
         elif hasattr(value, 'numerator') and hasattr(value, 'denominator'):
             return float(value.numerator) / float(value.denominator)
-        elif isinstance(value, Flash):
+        elif isinstance(value, exif.Flash):
             return {
                 'flash_fired': value.flash_fired,
                 'flash_return': value.flash_return.name,
@@ -71,31 +74,22 @@ class ExifHelper:
             }
         }
 
-    def get_exif_data(self, image_input: Union[bytes, str]) -> Optional[Dict[str, Any]]:
-        """Extract EXIF data from an image file or bytes."""
+    def get_exif_data(self, image_input: Union[bytes, str, mmap.mmap]) -> Optional[Dict[str, Any]]:
+        """Extract EXIF data from an image file, bytes or memory-mapped file."""
         try:
-            # Handle both file paths and bytes
-            if isinstance(image_input, bytes):
-                img = PILImage.open(io.BytesIO(image_input))
-                file_name = "Image from Bytes"
-                image = ExifImage(image_input)
+            # Single pass over the headers; pixel data is never decoded
+            file_type, exif_data = ExifReaderHelper().read(image_input)
+            
+            if isinstance(image_input, str):
+                file_name = image_input
             else:
-                img = PILImage.open(image_input)
-                file_name = img.filename
-                with open(image_input, 'rb') as f:
-                    image = ExifImage(f)
+                file_name = "Image from Bytes"
 
-            if not image.has_exif:
+            if not exif_data:
                 return None
 
-            file_type = img.format
             mime_type = mimetypes.types_map.get(f".{file_type.lower()}", "image/jpeg")
             
-            exif_data = {}
-            for tag in image.list_all():
-                if tag not in ('gps_latitude_ref', 'gps_longitude_ref'):
-                    exif_data[tag] = self.make_serializable(image.get(tag))
-            
             return self.format_return_exif(exif_data, file_name, file_type, mime_type)
             
         except Exception as e:
@@ -120,13 +114,47 @@ class ExifHelper:
         except Exception as e:
             raise ValueError(f"Error converting {number} to rational: {str(e)}")
 
-    def write_exif_data(self, image_path: str, metadata: Dict[str, str]) -> Dict[str, Any]:
+    def write_exif_data(self, image_input: Union[bytes, str], metadata: Dict[str, str]) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Write GPS metadata from a /write-metadata form into an image.
+        
+        Args:
+            image_input: JPEG file in bytes or its path
+            metadata: Form fields; 'metadata' holds the GPS values as a JSON string
+            
+        Returns:
+            Tuple of (tagged JPEG bytes, GPS values written)
+        """
         try:
             # Parse the JSON string from metadata
             gps_data = json.loads(metadata['metadata'])
+        except Exception as e:
+            raise Exception(f"Error writing EXIF data: {str(e)}")
+        
+        return self.apply_gps_data(image_input, gps_data)
 
+    def apply_gps_data(self, image_input: Union[bytes, str], gps_data: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Write GPS tags into the EXIF segment entirely in memory.
+        
+        Only the APP1 segment is rewritten; the compressed pixel data is copied
+        as-is, so there is no re-encode and no temporary file.
+        
+        Args:
+            image_input: JPEG file in bytes or its path
+            gps_data: gps_latitude/gps_longitude as [deg, min, sec] with their refs,
+                gps_altitude and gps_altitude_ref
+            
+        Returns:
+            Tuple of (tagged JPEG bytes, GPS values written)
+        """
+        try:
             # Open image in binary mode
-            exif_image = ExifImage(image_path)
+            if isinstance(image_input, str):
+                with open(image_input, 'rb') as f:
+                    exif_image = exif.Image(f)
+            else:
+                exif_image = exif.Image(image_input)
 
             # Set latitude
             if 'gps_latitude' in gps_data:
@@ -154,20 +182,18 @@ class ExifHelper:
                 altitude_ref = 0 if gps_data.get('gps_altitude_ref', '').upper() == 'ABOVE_SEA_LEVEL' else 1
                 exif_image.gps_altitude_ref = altitude_ref
 
-            # Write the modified image
-            output_path = "output_with_exif.jpg"
-            with open(output_path, 'wb') as new_image_file:
-                new_image_file.write(exif_image.get_file())
+            # Serialize the modified image in memory
+            tagged_bytes = exif_image.get_file()
 
             # Return the processed GPS data for verification
-            return {
-                'gps_latitude': exif_image.gps_latitude,
-                'gps_latitude_ref': exif_image.gps_latitude_ref,
-                'gps_longitude': exif_image.gps_longitude,
-                'gps_longitude_ref': exif_image.gps_longitude_ref,
-                'gps_altitude': exif_image.gps_altitude,
-                'gps_altitude_ref': exif_image.gps_altitude_ref
+            return tagged_bytes, {
+                'gps_latitude': exif_image.get('gps_latitude'),
+                'gps_latitude_ref': exif_image.get('gps_latitude_ref'),
+                'gps_longitude': exif_image.get('gps_longitude'),
+                'gps_longitude_ref': exif_image.get('gps_longitude_ref'),
+                'gps_altitude': exif_image.get('gps_altitude'),
+                'gps_altitude_ref': exif_image.get('gps_altitude_ref')
             }
 
         except Exception as e:
-            raise Exception(f"Error writing EXIF data: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error writing EXIF data: {str(e)}")
@@ -0,0 +1,420 @@
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional, Tuple, Union
+
+"""
+Header-only EXIF reader
+Input:
+    - Image bytes, file path or memory-mapped file
+Output:
+    - Image format detected from magic bytes
+    - The EXIF tags used by ExifHelper.format_return_exif
+
+Only the JPEG marker segments up to APP1 (the chunk headers of a WebP,
+the meta box of an AVIF) and the TIFF IFDs are touched; pixel data is
+never read or decoded.
+"""
+
+# Magic bytes -> format name (same names as PIL's Image.format)
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'II*\x00', 'TIFF'),
+    (b'MM\x00*', 'TIFF'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+    (b'BM', 'BMP'),
+]
+
+# ISOBMFF major brands of AVIF still images and sequences
+AVIF_BRANDS = (b'avif', b'avis')
+
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+
+# (IFD, tag id) -> name, using the names of the exif library
+EXIF_TAGS = {
+    ('0th', 0x010F): 'make',
+    ('0th', 0x0110): 'model',
+    ('1st', 0x0202): 'jpeg_interchange_format_length',
+    ('exif', 0x829A): 'exposure_time',
+    ('exif', 0x829D): 'f_number',
+    ('exif', 0x8827): 'photographic_sensitivity',
+    ('exif', 0x9003): 'datetime_original',
+    ('exif', 0x9209): 'flash',
+    ('exif', 0x920A): 'focal_length',
+    ('exif', 0xA001): 'color_space',
+    ('exif', 0xA002): 'pixel_x_dimension',
+    ('exif', 0xA003): 'pixel_y_dimension',
+    ('exif', 0xA434): 'lens_model',
+    ('gps', 0x0001): 'gps_latitude_ref',
+    ('gps', 0x0002): 'gps_latitude',
+    ('gps', 0x0003): 'gps_longitude_ref',
+    ('gps', 0x0004): 'gps_longitude',
+    ('gps', 0x0005): 'gps_altitude_ref',
+    ('gps', 0x0006): 'gps_altitude',
+}
+
+# TIFF field type -> (struct format, size in bytes)
+TIFF_TYPES = {
+    1: ('B', 1),   # BYTE
+    2: ('s', 1),   # ASCII
+    3: ('H', 2),   # SHORT
+    4: ('L', 4),   # LONG
+    5: ('LL', 8),  # RATIONAL
+    7: ('s', 1),   # UNDEFINED
+    9: ('l', 4),   # SLONG
+    10: ('ll', 8), # SRATIONAL
+}
+
+FLASH_RETURN_NAMES = (
+    'NO_STROBE_RETURN_DETECTION_FUNCTION',
+    'RESERVED',
+    'STROBE_RETURN_LIGHT_DETECTED',
+    'STROBE_RETURN_LIGHT_NOT_DETECTED',
+)
+FLASH_MODE_NAMES = (
+    'UNKNOWN',
+    'COMPULSORY_FLASH_FIRING',
+    'COMPULSORY_FLASH_SUPPRESSION',
+    'AUTO_MODE',
+)
+
+
+class ExifReaderHelper:
+    def detect_format(self, data: Union[bytes, memoryview, mmap.mmap]) -> Optional[str]:
+        """Detect the image format from its magic bytes"""
+        header = bytes(data[:12])
+        for signature, image_format in IMAGE_SIGNATURES:
+            if header.startswith(signature):
+                return image_format
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return 'WEBP'
+        if header[4:8] == b'ftyp' and header[8:12] in AVIF_BRANDS:
+            return 'AVIF'
+        return None
+
+    def read(self, image_input: Union[bytes, str, mmap.mmap]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Read the image format and EXIF tags without decoding pixels
+
+        Args:
+            image_input: Image bytes, file path or memory-mapped file
+
+        Returns:
+            Tuple of (format, tags); tags is None when the image has no EXIF
+        """
+        if isinstance(image_input, str):
+            with open(image_input, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None, None
+                # Only the pages holding the headers are ever faulted in
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    return self.read(data)
+
+        image_format = self.detect_format(image_input)
+        if image_format == 'JPEG':
+            tiff = self._find_jpeg_exif(image_input)
+        elif image_format == 'TIFF':
+            tiff = memoryview(image_input)
+        elif image_format in ('WEBP', 'AVIF'):
+            try:
+                if image_format == 'WEBP':
+                    tiff = self._find_webp_exif(image_input)
+                else:
+                    tiff = self._find_avif_exif(image_input)
+            except (struct.error, IndexError):  # Truncated container
+                tiff = None
+        else:
+            tiff = None
+
+        if tiff is None:
+            return image_format, None
+
+        try:
+            return image_format, self._parse_tiff(tiff)
+        finally:
+            if isinstance(tiff, memoryview):
+                tiff.release()
+
+    def read_size(self, image_input: Union[bytes, str, mmap.mmap]) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+        """
+        Read the image format and, for JPEG, the pixel size from the frame header
+
+        Args:
+            image_input: Image bytes, file path or memory-mapped file
+
+        Returns:
+            Tuple of (format, (width, height)); the size is None for other formats or a broken header
+        """
+        if isinstance(image_input, str):
+            with open(image_input, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None, None
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    return self.read_size(data)
+
+        image_format = self.detect_format(image_input)
+        if image_format != 'JPEG':
+            return image_format, None
+        try:
+            return image_format, self._find_jpeg_size(image_input)
+        except struct.error:  # Truncated header
+            return image_format, None
+
+    def _find_jpeg_size(self, data) -> Optional[Tuple[int, int]]:
+        """Walk JPEG markers until the start of frame segment; stop at start of scan"""
+        size = len(data)
+        pos = 2
+        while pos + 4 <= size:
+            if data[pos] != 0xFF:
+                return None
+            marker = data[pos + 1]
+            if marker == 0xFF:  # Fill byte
+                pos += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # Markers without a length
+                pos += 2
+                continue
+            if marker in (0xDA, 0xD9):  # Start of scan / end of image
+                return None
+
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+                return width, height
+            pos += 2 + length
+        return None
+
+    def _find_jpeg_exif(self, data) -> Optional[memoryview]:
+        """Walk JPEG markers until the Exif APP1 segment; stop at start of scan"""
+        size = len(data)
+        pos = 2
+        while pos + 4 <= size:
+            if data[pos] != 0xFF:
+                return None
+            marker = data[pos + 1]
+            if marker == 0xFF:  # Fill byte
+                pos += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # Markers without a length
+                pos += 2
+                continue
+            if marker in (0xDA, 0xD9):  # Start of scan / end of image
+                return None
+
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            segment_start = pos + 4
+            segment_end = pos + 2 + length
+            if marker == 0xE1 and bytes(data[segment_start:segment_start + 6]) == b'Exif\x00\x00':
+                return memoryview(data)[segment_start + 6:segment_end]
+            pos = segment_end
+        return None
+
+    def _find_webp_exif(self, data) -> Optional[memoryview]:
+        """Walk the RIFF chunks until the EXIF chunk"""
+        size = min(len(data), 8 + struct.unpack('<L', data[4:8])[0])
+        pos = 12
+        while pos + 8 <= size:
+            chunk_type = bytes(data[pos:pos + 4])
+            chunk_size = struct.unpack('<L', data[pos + 4:pos + 8])[0]
+            if chunk_type == b'EXIF':
+                start = pos + 8
+                # Some writers keep the JPEG APP1 prefix
+                if bytes(data[start:start + 6]) == b'Exif\x00\x00':
+                    start += 6
+                return memoryview(data)[start:pos + 8 + chunk_size]
+            pos += 8 + chunk_size + (chunk_size & 1)
+        return None
+
+    def _iter_boxes(self, data, start: int, end: int):
+        """Yield (type, payload start, box end) of the ISOBMFF boxes in data[start:end]"""
+        pos = start
+        while pos + 8 <= end:
+            box_size, box_type = struct.unpack('>L4s', data[pos:pos + 8])
+            header = 8
+            if box_size == 1:
+                box_size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+                header = 16
+            elif box_size == 0:
+                box_size = end - pos
+            if box_size < header:
+                return
+            yield box_type, pos + header, min(pos + box_size, end)
+            pos += box_size
+
+    def _find_avif_exif(self, data) -> Optional[memoryview]:
+        """Locate the Exif item through the meta box (iinf for its id, iloc for its bytes)"""
+        meta = next(((start, end) for box_type, start, end in self._iter_boxes(data, 0, len(data))
+                     if box_type == b'meta'), None)
+        if meta is None:
+            return None
+
+        exif_item = None
+        locations = {}
+        # meta is a full box: skip version and flags
+        for box_type, start, end in self._iter_boxes(data, meta[0] + 4, meta[1]):
+            if box_type == b'iinf':
+                exif_item = self._parse_iinf(data, start, end)
+            elif box_type == b'iloc':
+                locations = self._parse_iloc(data, start)
+        if exif_item is None or exif_item not in locations:
+            return None
+
+        offset, length = locations[exif_item]
+        if offset + length > len(data) or length < 4:
+            return None
+        # The item starts with the offset of the TIFF header past this field
+        tiff_start = offset + 4 + struct.unpack('>L', data[offset:offset + 4])[0]
+        return memoryview(data)[tiff_start:offset + length]
+
+    def _parse_iinf(self, data, start: int, end: int) -> Optional[int]:
+        """Item id of the Exif item"""
+        version = data[start]
+        entries_start = start + 4 + (2 if version == 0 else 4)
+        for box_type, entry_start, _ in self._iter_boxes(data, entries_start, end):
+            if box_type != b'infe' or data[entry_start] < 2:
+                continue
+            if data[entry_start] == 2:
+                item_id, _, item_type = struct.unpack('>HH4s', data[entry_start + 4:entry_start + 12])
+            else:
+                item_id, _, item_type = struct.unpack('>LH4s', data[entry_start + 4:entry_start + 14])
+            if item_type == b'Exif':
+                return item_id
+        return None
+
+    def _parse_iloc(self, data, start: int) -> Dict[int, Tuple[int, int]]:
+        """(file offset, length) of every single-extent item stored in the file itself"""
+        version = data[start]
+        offset_size, length_size = data[start + 4] >> 4, data[start + 4] & 0x0F
+        base_offset_size = data[start + 5] >> 4
+        index_size = data[start + 5] & 0x0F if version in (1, 2) else 0
+        pos = start + 6
+
+        def read(size):
+            nonlocal pos
+            value = int.from_bytes(bytes(data[pos:pos + size]), 'big') if size else 0
+            pos += size
+            return value
+
+        locations = {}
+        item_count = read(2 if version < 2 else 4)
+        for _ in range(item_count):
+            item_id = read(2 if version < 2 else 4)
+            construction_method = read(2) & 0x0F if version in (1, 2) else 0
+            read(2)  # data_reference_index
+            base_offset = read(base_offset_size)
+            extents = [(read(index_size), read(offset_size), read(length_size)) for _ in range(read(2))]
+            if construction_method == 0 and len(extents) == 1:
+                locations[item_id] = (base_offset + extents[0][1], extents[0][2])
+        return locations
+
+    def _parse_tiff(self, tiff: memoryview) -> Optional[Dict[str, Any]]:
+        """Parse IFD0, IFD1, Exif and GPS IFDs, decoding only the wanted tags"""
+        if len(tiff) < 8:
+            return None
+
+        byte_order = bytes(tiff[:2])
+        if byte_order == b'II':
+            endian = '<'
+        elif byte_order == b'MM':
+            endian = '>'
+        else:
+            return None
+
+        ifd0_offset = struct.unpack(endian + 'L', tiff[4:8])[0]
+        tags = {}
+
+        pointers, next_ifd = self._parse_ifd(tiff, endian, ifd0_offset, '0th', tags)
+        if next_ifd:
+            self._parse_ifd(tiff, endian, next_ifd, '1st', tags)
+        if EXIF_IFD_POINTER in pointers:
+            self._parse_ifd(tiff, endian, pointers[EXIF_IFD_POINTER], 'exif', tags)
+        if GPS_IFD_POINTER in pointers:
+            self._parse_ifd(tiff, endian, pointers[GPS_IFD_POINTER], 'gps', tags)
+
+        return tags
+
+    def _parse_ifd(self, tiff: memoryview, endian: str, offset: int, ifd_name: str,
+                   tags: Dict[str, Any]) -> Tuple[Dict[int, int], int]:
+        """
+        Parse one IFD into tags
+
+        Returns:
+            Tuple of (sub-IFD pointers, offset of the next IFD)
+        """
+        pointers = {}
+        if offset <= 0 or offset + 2 > len(tiff):
+            return pointers, 0
+
+        count = struct.unpack(endian + 'H', tiff[offset:offset + 2])[0]
+        for index in range(count):
+            entry = offset + 2 + index * 12
+            if entry + 12 > len(tiff):
+                break
+            tag, field_type, value_count = struct.unpack(endian + 'HHL', tiff[entry:entry + 8])
+
+            if ifd_name == '0th' and tag in (EXIF_IFD_POINTER, GPS_IFD_POINTER):
+                pointers[tag] = struct.unpack(endian + 'L', tiff[entry + 8:entry + 12])[0]
+                continue
+
+            name = EXIF_TAGS.get((ifd_name, tag))
+            if name is None or field_type not in TIFF_TYPES:
+                continue
+
+            try:
+                tags[name] = self._read_value(tiff, endian, entry, field_type, value_count, name)
+            except (struct.error, ValueError):
+                continue
+
+        next_entry = offset + 2 + count * 12
+        next_ifd = 0
+        if next_entry + 4 <= len(tiff):
+            next_ifd = struct.unpack(endian + 'L', tiff[next_entry:next_entry + 4])[0]
+        return pointers, next_ifd
+
+    def _read_value(self, tiff: memoryview, endian: str, entry: int, field_type: int,
+                    value_count: int, name: str) -> Any:
+        """Decode one tag value to the same JSON-friendly form ExifHelper produces"""
+        fmt, size = TIFF_TYPES[field_type]
+        total = size * value_count
+        if total <= 4:
+            start = entry + 8
+        else:
+            start = struct.unpack(endian + 'L', tiff[entry + 8:entry + 12])[0]
+        raw = tiff[start:start + total]
+        if len(raw) < total:
+            raise ValueError(f"Truncated value for {name}")
+
+        if field_type in (2, 7):
+            value = bytes(raw)
+            if field_type == 2:
+                return value.split(b'\x00', 1)[0].decode(errors='ignore').strip()
+            return value.decode(errors='ignore')
+
+        values = struct.unpack(endian + fmt * value_count, raw)
+        if field_type in (5, 10):
+            # Rationals become floats, like ExifHelper.make_serializable
+            values = [
+                float(values[i]) / float(values[i + 1]) if values[i + 1] else 0.0
+                for i in range(0, len(values), 2)
+            ]
+
+        if name == 'flash':
+            return self._decode_flash(values[0])
+        if value_count == 1:
+            return values[0]
+        return list(values)
+
+    def _decode_flash(self, value: int) -> Dict[str, Any]:
+        """Decode the Flash bit fields"""
+        return {
+            'flash_fired': bool(value & 0x01),
+            'flash_return': FLASH_RETURN_NAMES[(value >> 1) & 0x03],
+            'flash_mode': FLASH_MODE_NAMES[(value >> 3) & 0x03],
+            'flash_function_not_present': bool(value & 0x20),
+            'red_eye_reduction_supported': bool(value & 0x40),
+            'reserved': (value >> 7) & 0x01
+        }
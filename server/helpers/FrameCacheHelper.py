@@ -0,0 +1,222 @@
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+"""
+Content-addressed cache for encoded frames
+Key:
+    - Video content hash
+    - Frame number
+    - Output size
+    - Encode profile
+Tiers:
+    - Memory (LRU, byte budget)
+    - Disk (LRU, byte budget); several processes may share the directory,
+      each re-reading its usage from disk now and then so that together
+      they stay under the budget
+"""
+
+class FrameCacheHelper:
+    def __init__(self, cache_dir: Optional[str] = None, memory_budget: int = 256 * 1024 * 1024,
+                 disk_budget: int = 2 * 1024 * 1024 * 1024, processes: int = 1):
+        """
+        Initialize the FrameCacheHelper
+
+        Args:
+            cache_dir: Directory for the disk tier, None to keep frames in memory only
+            memory_budget: Maximum bytes kept in memory
+            disk_budget: Maximum bytes kept on disk, by all processes together
+            processes: Processes sharing cache_dir (e.g. server workers); with more than one, the disk
+                usage is re-read from the directory after every disk_budget / (10 * processes) bytes
+                this process writes, so files written by the others count towards the budget
+        """
+        self.cache_dir = cache_dir
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._rescan_bytes = disk_budget // (10 * processes) if processes > 1 else None
+        self._written_since_scan = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(video_hash: str, frame_number: int, output_size: Tuple[int, int], profile: str) -> str:
+        """Build the cache key for an encoded frame"""
+        width, height = output_size
+        return f"{video_hash}_{frame_number}_{width}x{height}_{profile}"
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Content hash used as the video part of the key"""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+        """Same content hash as hash_bytes, read from a file in chunks"""
+        file_hash = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _load_disk_index(self) -> None:
+        """Rebuild the disk LRU order from file modification times"""
+        entries = self._scan_disk()
+        with self._lock:
+            self._disk = OrderedDict((key, size) for _, key, size in entries)
+            self._disk_bytes = sum(size for _, _, size in entries)
+            self._written_since_scan = 0
+            self._evict_disk()
+
+    def _scan_disk(self) -> list:
+        """(mtime, key, size) of every cached file, oldest first"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.part'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name, stat.st_size))
+        return sorted(entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached bytes for key, or None on a miss"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            # Another process sharing the directory may have written it
+            on_disk = key in self._disk or self._rescan_bytes is not None
+
+        if on_disk:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                # Touch so the LRU order survives restarts
+                os.utime(path)
+            except OSError:
+                data = None
+
+            with self._lock:
+                if data is None:
+                    size = self._disk.pop(key, None)
+                    if size is not None:
+                        self._disk_bytes -= size
+                else:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    else:
+                        self._disk[key] = len(data)
+                        self._disk_bytes += len(data)
+                    self.disk_hits += 1
+                    self._put_memory(key, data)
+                    return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store bytes for key in both tiers"""
+        with self._lock:
+            self._put_memory(key, data)
+            on_disk = key in self._disk
+
+        if not self.cache_dir or on_disk or len(data) > self.disk_budget:
+            return
+
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary name first so readers never see a partial file
+            with tempfile.NamedTemporaryFile(delete=False, dir=os.path.dirname(path), suffix='.part') as temp_file:
+                temp_file.write(data)
+                temp_path = temp_file.name
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing frame cache entry: {str(e)}")
+            return
+
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+            self._written_since_scan += len(data)
+            rescan = self._rescan_bytes is not None and self._written_since_scan >= self._rescan_bytes
+            if not rescan:
+                self._evict_disk()
+
+        if rescan:
+            # Other processes write to the same directory; count their files too
+            self._load_disk_index()
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        """Insert into the memory tier; caller holds the lock"""
+        if len(data) > self.memory_budget:
+            return
+
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _evict_disk(self) -> None:
+        """Drop least recently used files until under budget; caller holds the lock"""
+        while self._disk_bytes > self.disk_budget and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._disk_path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and tier usage"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'memory_budget': self.memory_budget,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+                'disk_budget': self.disk_budget
+            }
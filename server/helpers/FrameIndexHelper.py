@@ -0,0 +1,350 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from helpers.ExifReaderHelper import ExifReaderHelper
+from helpers.FrameStorageHelper import FrameStorage
+
+"""
+Spatial index of geotagged frames
+    - One row per saved frame (path, timestamp, latitude, longitude,
+      altitude, source video hash) in an embedded SQLite database
+    - An R-tree over latitude/longitude answers bounding box, radius and
+      nearest queries without reading any JPEG
+    - rebuild() backfills the index from the GPS EXIF of existing files
+Paths are stored as storage keys, i.e. relative to the frames directory.
+"""
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+# nearest() starts with this radius and doubles it until it has k frames
+NEAREST_START_RADIUS_M = 50.0
+INDEXED_EXTENSIONS = ('.jpg', '.jpeg', '.tif', '.tiff', '.webp', '.avif')
+# frame_YYYYmmdd_HHMMSS_ffffff.jpg, as written by GeotaggerHelper.save_frame_with_exif
+FRAME_NAME_PATTERN = re.compile(r'frame_(\d{8}_\d{6}_\d{6})\.')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    timestamp REAL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    altitude REAL,
+    video_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS frames_timestamp ON frames (timestamp);
+CREATE INDEX IF NOT EXISTS frames_video_hash ON frames (video_hash);
+CREATE VIRTUAL TABLE IF NOT EXISTS frames_rtree USING rtree (
+    id, min_lat, max_lat, min_lon, max_lon
+);
+"""
+
+
+def to_epoch(value: Any) -> Optional[float]:
+    """Unix seconds from a number, an ISO 8601 string or a datetime; naive times are UTC"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            value = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if hasattr(value, 'to_pydatetime'):  # pandas Timestamp
+        value = value.to_pydatetime()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great circle distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class FrameIndexHelper:
+    def __init__(self, db_path: str, frames_dir: str, storage: Optional[FrameStorage] = None):
+        """
+        Initialize the FrameIndexHelper
+
+        Args:
+            db_path: SQLite database file, created on first use
+            frames_dir: Directory the indexed frames live under, read by rebuild()
+            storage: Frame storage whose manifest paths are recorded, files under frames_dir by default
+        """
+        self.db_path = db_path
+        self.frames_dir = os.path.abspath(frames_dir)
+        self.storage = storage
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Not kept open: a connection must not be inherited by forked workers
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread and process; WAL lets readers run while a job writes"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _relative_path(self, path: str) -> str:
+        key = self.storage.key_of(path) if self.storage is not None else None
+        if key is not None:
+            return key
+        return os.path.relpath(os.path.abspath(path), self.frames_dir).replace(os.sep, '/')
+
+    def record_frames(self, frames: Iterable[Dict], video_hash: Optional[str] = None) -> int:
+        """
+        Add or update frames in one transaction
+
+        Args:
+            frames: saved_frames entries (path, timestamp and telemetry latitude, longitude, altitude)
+            video_hash: Content hash of the source video, None for photos
+
+        Returns:
+            int: Frames recorded
+        """
+        rows = []
+        for frame in frames:
+            telemetry = frame['telemetry']
+            altitude = telemetry.get('altitude')
+            rows.append((
+                self._relative_path(frame['path']),
+                to_epoch(frame.get('timestamp')),
+                float(telemetry['latitude']),
+                float(telemetry['longitude']),
+                float(altitude) if altitude is not None else None,
+                frame.get('video_hash', video_hash)
+            ))
+        connection = self._connect()
+        with connection:
+            self._insert_rows(connection, rows)
+        return len(rows)
+
+    def _insert_rows(self, connection: sqlite3.Connection, rows: List[Tuple]) -> None:
+        """Upsert rows into frames and the R-tree; caller holds the transaction"""
+        for row in rows:
+            connection.execute(
+                "INSERT INTO frames (path, timestamp, latitude, longitude, altitude, video_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET timestamp = excluded.timestamp, "
+                "latitude = excluded.latitude, longitude = excluded.longitude, "
+                "altitude = excluded.altitude, video_hash = COALESCE(excluded.video_hash, frames.video_hash)",
+                row
+            )
+            frame_id = connection.execute("SELECT id FROM frames WHERE path = ?", (row[0],)).fetchone()[0]
+            connection.execute(
+                "INSERT OR REPLACE INTO frames_rtree (id, min_lat, max_lat, min_lon, max_lon) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (frame_id, row[2], row[2], row[3], row[3])
+            )
+
+    def _query(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+               start: Optional[float], end: Optional[float], video_hash: Optional[str],
+               limit: Optional[int]) -> List[Dict]:
+        """Frames inside a bounding box, optionally within a time range and from one video"""
+        sql = ("SELECT f.path, f.timestamp, f.latitude, f.longitude, f.altitude, f.video_hash "
+               "FROM frames_rtree r JOIN frames f ON f.id = r.id "
+               "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?")
+        params = [min_lat, max_lat, min_lon, max_lon]
+        # Unary + keeps SQLite on the R-tree instead of walking the timestamp index
+        sql, params = self._add_filters(sql, params, start, end, video_hash, column_prefix='+f.')
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._row_to_frame(row) for row in self._connect().execute(sql, params)]
+
+    def _add_filters(self, sql: str, params: List, start: Optional[float], end: Optional[float],
+                     video_hash: Optional[str], column_prefix: str = 'f.') -> Tuple[str, List]:
+        if start is not None:
+            sql += f" AND {column_prefix}timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            sql += f" AND {column_prefix}timestamp <= ?"
+            params.append(end)
+        if video_hash is not None:
+            sql += f" AND {column_prefix}video_hash = ?"
+            params.append(video_hash)
+        return sql, params
+
+    def _row_to_frame(self, row: Tuple) -> Dict:
+        path, timestamp, latitude, longitude, altitude, video_hash = row
+        return {
+            'path': path,
+            'timestamp': (datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
+                          if timestamp is not None else None),
+            'latitude': latitude,
+            'longitude': longitude,
+            'altitude': altitude,
+            'video_hash': video_hash
+        }
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+             start: Optional[float] = None, end: Optional[float] = None,
+             video_hash: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Frames inside a latitude/longitude box"""
+        return self._query(min_lat, min_lon, max_lat, max_lon, start, end, video_hash, limit)
+
+    def radius(self, latitude: float, longitude: float, radius_m: float,
+               start: Optional[float] = None, end: Optional[float] = None,
+               video_hash: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Frames within radius_m meters of a point, nearest first
+
+        The R-tree narrows the search to the enclosing box; exact distances
+        are computed only for the frames inside it.
+        """
+        frames = self._within(latitude, longitude, radius_m, start, end, video_hash)
+        return frames[:limit] if limit is not None else frames
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                start: Optional[float] = None, end: Optional[float] = None,
+                video_hash: Optional[str] = None) -> List[Dict]:
+        """The k frames nearest to a point, searching an expanding box"""
+        radius_m = NEAREST_START_RADIUS_M
+        while True:
+            frames = self._within(latitude, longitude, radius_m, start, end, video_hash)
+            # Only frames inside the circle are guaranteed to beat everything outside it
+            if len(frames) >= k or radius_m >= math.pi * EARTH_RADIUS_M:
+                return frames[:k]
+            radius_m *= 2
+
+    def _within(self, latitude: float, longitude: float, radius_m: float, start: Optional[float],
+                end: Optional[float], video_hash: Optional[str]) -> List[Dict]:
+        dlat = radius_m / METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(latitude))
+        dlon = radius_m / (METERS_PER_DEGREE * cos_lat) if cos_lat > 1e-9 else 360.0
+        if dlon >= 180 or abs(latitude) + dlat >= 90:
+            min_lon, max_lon = -180.0, 180.0
+        else:
+            min_lon, max_lon = longitude - dlon, longitude + dlon
+
+        candidates = self._query(max(-90.0, latitude - dlat), min_lon, min(90.0, latitude + dlat), max_lon,
+                                 start, end, video_hash, None)
+        # Boxes crossing the antimeridian are queried in two parts
+        if min_lon < -180:
+            candidates += self._query(max(-90.0, latitude - dlat), min_lon + 360, min(90.0, latitude + dlat), 180.0,
+                                      start, end, video_hash, None)
+        elif max_lon > 180:
+            candidates += self._query(max(-90.0, latitude - dlat), -180.0, min(90.0, latitude + dlat), max_lon - 360,
+                                      start, end, video_hash, None)
+
+        frames = []
+        for frame in candidates:
+            distance = haversine_m(latitude, longitude, frame['latitude'], frame['longitude'])
+            if distance <= radius_m:
+                frame['distance'] = round(distance, 3)
+                frames.append(frame)
+        frames.sort(key=lambda frame: frame['distance'])
+        return frames
+
+    def time_range(self, start: Optional[float] = None, end: Optional[float] = None,
+                   video_hash: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Frames taken between start and end (Unix seconds), oldest first"""
+        sql = ("SELECT f.path, f.timestamp, f.latitude, f.longitude, f.altitude, f.video_hash "
+               "FROM frames f WHERE 1 = 1")
+        sql, params = self._add_filters(sql, [], start, end, video_hash)
+        sql += " ORDER BY f.timestamp"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._row_to_frame(row) for row in self._connect().execute(sql, params)]
+
+    def stats(self) -> Dict:
+        """Return the number of indexed frames and videos"""
+        frames, videos = self._connect().execute(
+            "SELECT COUNT(*), COUNT(DISTINCT video_hash) FROM frames"
+        ).fetchone()
+        return {'frames': frames, 'videos': videos, 'db_path': self.db_path}
+
+    def read_frame(self, path: str, reader: Optional[ExifReaderHelper] = None) -> Optional[Tuple]:
+        """Index row for one file from its GPS EXIF, None when it has no position"""
+        _, tags = (reader or ExifReaderHelper()).read(path)
+        if not tags or 'gps_latitude' not in tags or 'gps_longitude' not in tags:
+            return None
+
+        latitude = self._dms_to_decimal(tags['gps_latitude'], tags.get('gps_latitude_ref'))
+        longitude = self._dms_to_decimal(tags['gps_longitude'], tags.get('gps_longitude_ref'))
+        altitude = tags.get('gps_altitude')
+        if altitude is not None and tags.get('gps_altitude_ref') == 1:
+            altitude = -altitude
+
+        # Video frames carry their timestamp in the file name; photos in DateTimeOriginal
+        timestamp = None
+        match = FRAME_NAME_PATTERN.search(os.path.basename(path))
+        if match:
+            timestamp = to_epoch(datetime.strptime(match.group(1), '%Y%m%d_%H%M%S_%f'))
+        elif tags.get('datetime_original'):
+            try:
+                timestamp = to_epoch(datetime.strptime(tags['datetime_original'], '%Y:%m:%d %H:%M:%S'))
+            except ValueError:
+                timestamp = None
+
+        return (self._relative_path(path), timestamp, latitude, longitude, altitude, None)
+
+    def _dms_to_decimal(self, dms: Any, ref: Optional[str]) -> float:
+        if isinstance(dms, (list, tuple)):
+            degrees, minutes, seconds = (list(dms) + [0.0, 0.0])[:3]
+            value = degrees + minutes / 60 + seconds / 3600
+        else:
+            value = float(dms)
+        return -value if ref in ('S', 'W') else value
+
+    def rebuild(self) -> Dict:
+        """
+        Replace the index with the frames currently under frames_dir
+
+        Source video hashes can not be read back from EXIF; they are kept
+        for frames that were already indexed. Photos get their DateTimeOriginal,
+        which is camera time rather than log time.
+
+        Returns:
+            Dict: Counts of indexed, skipped (no GPS or unreadable) and removed frames
+        """
+        connection = self._connect()
+        video_hashes = dict(connection.execute("SELECT path, video_hash FROM frames"))
+
+        reader = ExifReaderHelper()
+        rows = []
+        skipped = 0
+        for root, _, files in os.walk(self.frames_dir):
+            for name in sorted(files):
+                if not name.lower().endswith(INDEXED_EXTENSIONS):
+                    continue
+                try:
+                    row = self.read_frame(os.path.join(root, name), reader)
+                except Exception as e:
+                    print(f"Skipping {name}: {str(e)}")
+                    row = None
+                if row is None:
+                    skipped += 1
+                    continue
+                rows.append(row[:5] + (video_hashes.get(row[0]),))
+
+        # One transaction, so queries never see a partly rebuilt index
+        with connection:
+            connection.execute("DELETE FROM frames")
+            connection.execute("DELETE FROM frames_rtree")
+            self._insert_rows(connection, rows)
+
+        indexed_paths = {row[0] for row in rows}
+        removed = sum(1 for path in video_hashes if path not in indexed_paths)
+        print(f"Frame index rebuilt: {len(rows)} indexed, {skipped} skipped, {removed} removed")
+        return {'indexed': len(rows), 'skipped': skipped, 'removed': removed}
@@ -0,0 +1,211 @@
+import io
+from typing import Optional, Tuple, Union
+
+from helpers.LazyImportHelper import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+# PyAV is optional; previews fall back to cv2
+av = lazy_import('av', optional=True)
+
+"""
+Random-access frame readers used by VideoHelper
+    - Cv2FrameReader: full resolution decode through cv2.VideoCapture
+    - PyAVFrameReader: FFmpeg decode with the downscale fused into the
+      colour conversion, so no full resolution BGR frame is produced
+Given the video's FrameTimeline (FrameTimelineHelper), both read frames by
+their exact presentation timestamp and only seek when a keyframe lies
+between the current position and the wanted frame.
+"""
+
+# Decode forward instead of seeking when the next frame is at most this far ahead
+SEEK_THRESHOLD_SECONDS = 2.0
+
+
+def seek_capture(video: 'cv2.VideoCapture', timeline: 'FrameTimeline', position: int, frame_number: int) -> int:
+    """
+    Move a cv2.VideoCapture so its next read() returns frame_number
+
+    Seeks only when that skips decoding (see FrameTimeline.should_seek), otherwise grabs through the
+    frames in between. cv2 turns frame numbers into times with the nominal frame rate, so at a variable
+    frame rate a seek lands near the frame rather than on it: where it landed is read back from the
+    timestamp of the last decoded frame, and the rest is grabbed.
+
+    Args:
+        video: Opened video capture
+        timeline: Frame timeline of the video
+        position: Frame the next read() returns, -1 when unknown
+        frame_number: Frame wanted next
+
+    Returns:
+        int: Frame the next read() returns; less than frame_number at the end of the video
+    """
+    if position < 0 or timeline.should_seek(position, frame_number):
+        requested = int(round(timeline.time_of(frame_number) * timeline.fps)) if timeline.fps > 0 else frame_number
+        # Past the last frame cv2 reports no timestamp at all
+        requested = min(requested, timeline.frame_count - 1)
+        while True:
+            video.set(cv2.CAP_PROP_POS_FRAMES, requested)
+            if requested <= 0:
+                position = 0
+                break
+            position = timeline.nearest_frame(video.get(cv2.CAP_PROP_POS_MSEC) / 1000) + 1
+            if position <= frame_number:
+                break
+            # Landed past the frame: ask for an earlier one
+            requested = max(0, requested - (position - frame_number))
+
+    while position < frame_number and video.grab():
+        position += 1
+    return position
+
+
+def scaled_size(width: int, height: int, max_width: Optional[int]) -> Tuple[int, int]:
+    """Output size for a frame limited to max_width, keeping the aspect ratio"""
+    if max_width and width > max_width:
+        scale = max_width / width
+        return int(width * scale), int(height * scale)
+    return width, height
+
+
+class Cv2FrameReader:
+    def __init__(self, video: 'cv2.VideoCapture', timeline: Optional['FrameTimeline'] = None):
+        """
+        Wrap an opened cv2.VideoCapture
+
+        Args:
+            video: Opened video capture
+            timeline: Frame timeline of the video, None to seek for every frame
+        """
+        self.video = video
+        self.timeline = timeline
+        self.fps = video.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        if timeline is not None:
+            self.frame_count = timeline.frame_count
+        self.width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # Frame the next read() returns without seeking
+        self._position = None
+
+    def read(self, frame_number: int) -> Optional['np.ndarray']:
+        """Read a full resolution BGR frame"""
+        if self.timeline is None:
+            # Set frame position
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            self._position = frame_number
+        else:
+            if frame_number < 0 or frame_number >= self.timeline.frame_count:
+                return None
+            position = -1 if self._position is None else self._position
+            self._position = seek_capture(self.video, self.timeline, position, frame_number)
+            if self._position != frame_number:
+                self._position = None
+                return None
+
+        # Read frame
+        success, frame = self.video.read()
+        if not success:
+            self._position = None
+            return None
+        self._position += 1
+        return frame
+
+    def release(self) -> None:
+        self.video.release()
+
+
+class PyAVFrameReader:
+    def __init__(self, source: Union[str, bytes], max_width: Optional[int] = None,
+                 timeline: Optional['FrameTimeline'] = None):
+        """
+        Open a video with PyAV
+
+        Args:
+            source: Video path or video bytes
+            max_width: Frames wider than this are scaled down while converting to BGR
+            timeline: Frame timeline of the video, None to derive frame timestamps from the frame rate
+        """
+        if av is None:
+            raise Exception("PyAV is not installed")
+
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+
+        self.container = av.open(source)
+        try:
+            self.stream = self.container.streams.video[0]
+            self.stream.thread_type = 'AUTO'
+
+            rate = self.stream.average_rate or self.stream.guessed_rate
+            self.fps = float(rate) if rate else 0.0
+            self.time_base = self.stream.time_base
+            self.start_pts = self.stream.start_time or 0
+
+            self.frame_count = self.stream.frames
+            if not self.frame_count and self.stream.duration and self.fps > 0:
+                self.frame_count = int(self.stream.duration * self.time_base * self.fps)
+            if timeline is not None:
+                self.frame_count = timeline.frame_count
+
+            self.width = self.stream.codec_context.width
+            self.height = self.stream.codec_context.height
+            self.output_size = scaled_size(self.width, self.height, max_width)
+        except Exception:
+            self.container.close()
+            raise
+
+        self.timeline = timeline
+        self._frames = None
+        self._last_pts = None
+        self._position = None
+
+    def _frame_pts(self, frame_number: int) -> int:
+        return self.start_pts + int(round(frame_number / self.fps / self.time_base))
+
+    def read(self, frame_number: int) -> Optional['np.ndarray']:
+        """Read a BGR frame at the output size"""
+        if self.timeline is not None:
+            if frame_number < 0 or frame_number >= self.timeline.frame_count:
+                return None
+            # Exact timestamp of the frame
+            target_pts = int(self.timeline.pts[frame_number])
+            tolerance = 0
+            needs_seek = (
+                self._frames is None or self._position is None or
+                self.timeline.should_seek(self._position, frame_number)
+            )
+        elif self.fps <= 0:
+            return None
+        else:
+            target_pts = self._frame_pts(frame_number)
+            # Accept the frame whose presentation time is closest to the target
+            tolerance = (self._frame_pts(frame_number + 1) - target_pts) // 2
+            seek_threshold = int(SEEK_THRESHOLD_SECONDS / self.time_base)
+
+            needs_seek = (
+                self._frames is None or self._last_pts is None or
+                target_pts <= self._last_pts or target_pts - self._last_pts > seek_threshold
+            )
+        if needs_seek:
+            # Seek to the keyframe at or before the target, then decode forward
+            self.container.seek(target_pts, stream=self.stream, backward=True, any_frame=False)
+            self._frames = self.container.decode(self.stream)
+            self._last_pts = None
+
+        for frame in self._frames:
+            if frame.pts is None:
+                continue
+            self._last_pts = frame.pts
+            if frame.pts >= target_pts - tolerance:
+                self._position = frame_number + 1
+                width, height = self.output_size
+                return frame.to_ndarray(width=width, height=height, format='bgr24', interpolation='AREA')
+
+        # End of stream
+        self._frames = None
+        self._position = None
+        return None
+
+    def release(self) -> None:
+        self.container.close()
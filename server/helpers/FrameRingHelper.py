@@ -0,0 +1,184 @@
+import multiprocessing
+import queue
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from helpers.FrameWriterHelper import FrameWriterHelper
+from helpers.LazyImportHelper import lazy_import
+
+np = lazy_import('numpy')
+
+"""
+Shared-memory frame ring for encoding in worker processes
+    - A fixed number of frame slots in one shared memory block; the
+      decoder writes each frame straight into a free slot
+    - Encoder processes get only the slot index and the task arguments
+      (output path, EXIF block), never the pixels, and the slot is
+      recycled once the task finishes
+    - The slot count bounds memory: the decoder waits for a free slot
+      when the encoders fall behind
+"""
+
+# Slots per encoder process: one being encoded, one being decoded into
+SLOTS_PER_WORKER = 2
+
+# Finished tasks are checked for errors once this many are pending
+PENDING_CHECK_INTERVAL = 64
+
+# Worker process state, set by _attach_ring
+_worker_memory = None
+_worker_frames = None
+_worker_writers = {}
+
+
+def ring_size(width: int, height: int, workers: int, slots: Optional[int] = None) -> int:
+    """Bytes of shared memory a ring for width x height BGR frames uses"""
+    return width * height * 3 * (slots or workers * SLOTS_PER_WORKER)
+
+
+def _attach_ring(name: str, shape: Tuple[int, ...]) -> None:
+    """Worker initializer: map the ring once per process"""
+    global _worker_memory, _worker_frames
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    _worker_frames = np.ndarray(shape, dtype=np.uint8, buffer=_worker_memory.buf)
+
+
+def _run_slot(func: Callable, slot: int, args: Tuple) -> Any:
+    """Worker side of submit: call func on the frame in slot"""
+    return func(_worker_frames[slot], *args)
+
+
+def _writer(writer_settings: Dict) -> FrameWriterHelper:
+    """FrameWriterHelper for FrameWriterHelper.settings(), one per process and settings"""
+    key = tuple(sorted(writer_settings.items()))
+    writer = _worker_writers.get(key)
+    if writer is None:
+        writer = _worker_writers[key] = FrameWriterHelper(writer_settings['format'], writer_settings['quality'],
+                                                          writer_settings['speed'])
+    return writer
+
+
+def write_frame(frame: 'np.ndarray', output_path: str, exif_bytes: bytes, writer_settings: Dict) -> str:
+    """Ring task: encode frame to output_path with the writer described by writer_settings"""
+    return _writer(writer_settings).write(frame, exif_bytes, output_path)
+
+
+def encode_frame(frame: 'np.ndarray', exif_bytes: bytes, writer_settings: Dict) -> bytes:
+    """Ring task: encode frame and return the bytes, for storage that is not a local file"""
+    return _writer(writer_settings).encode(frame, exif_bytes)
+
+
+class FrameRingHelper:
+    def __init__(self, frame_shape: Tuple[int, int, int], workers: int, slots: Optional[int] = None):
+        """
+        Allocate the ring and start the encoder processes
+
+        Args:
+            frame_shape: (height, width, 3) of the BGR frames
+            workers: Encoder processes
+            slots: Frame slots, workers * SLOTS_PER_WORKER by default
+        """
+        self.frame_shape = tuple(frame_shape)
+        self.slot_count = slots or workers * SLOTS_PER_WORKER
+        frame_bytes = int(np.prod(self.frame_shape))
+
+        self._memory = shared_memory.SharedMemory(create=True, size=frame_bytes * self.slot_count)
+        self.frames = np.ndarray((self.slot_count,) + self.frame_shape, dtype=np.uint8, buffer=self._memory.buf)
+
+        self._free = queue.Queue()
+        for slot in range(self.slot_count):
+            self._free.put(slot)
+        self._pending: List[Future] = []
+
+        # Spawned, not forked: the server process has threads (gthread workers, thread pools)
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_attach_ring,
+            initargs=(self._memory.name, self.frames.shape)
+        )
+        self._closed = False
+
+    def acquire(self) -> int:
+        """Index of a free slot, waiting for a task to finish if there is none"""
+        return self._free.get()
+
+    def release(self, slot: int) -> None:
+        """Return a slot that will not be submitted"""
+        self._free.put(slot)
+
+    def read_into(self, video_capture: 'cv2.VideoCapture', slot: int) -> Tuple[bool, Optional['np.ndarray']]:
+        """Decode the next frame of video_capture directly into slot"""
+        target = self.frames[slot]
+        ret, frame = video_capture.read(target)
+        if not ret:
+            return False, None
+        if not np.shares_memory(frame, target):
+            # cv2 allocated a new buffer (e.g. a frame size change); copy it in
+            target[...] = frame
+        return True, target
+
+    def submit(self, slot: int, func: Callable, *args) -> Future:
+        """
+        Run func(frame, *args) on the frame in slot in a worker process; the slot is released when it returns
+
+        Args:
+            slot: Slot holding the frame
+            func: Module-level function (it is pickled by name), e.g. write_frame
+            *args: Further arguments, e.g. output_path, exif_bytes and writer settings for write_frame
+
+        Returns:
+            Future: Resolves to the result of func
+        """
+        future = self._pool.submit(_run_slot, func, slot, args)
+        future.add_done_callback(lambda _: self.release(slot))
+        self._pending.append(future)
+        if len(self._pending) >= PENDING_CHECK_INTERVAL:
+            self._check_pending(wait=False)
+        return future
+
+    def _check_pending(self, wait: bool) -> None:
+        """Raise the first task error; drop finished futures"""
+        still_pending = []
+        for future in self._pending:
+            if not wait and not future.done():
+                still_pending.append(future)
+                continue
+            error = future.exception()
+            if error is not None:
+                raise Exception(f"Frame task failed: {str(error)}")
+        self._pending = still_pending
+
+    def wait(self) -> None:
+        """Wait for every submitted task; raises the first error"""
+        self._check_pending(wait=True)
+
+    def close(self, cancel: bool = False) -> None:
+        """
+        Wait for the workers, stop them and free the shared memory
+
+        Args:
+            cancel: Drop queued tasks and ignore task errors instead (cleanup after a failure)
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if not cancel:
+                self.wait()
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self.frames = None
+            try:
+                self._memory.close()
+            except BufferError:
+                # A caller still holds a frame view; the mapping goes away with it
+                pass
+            self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,291 @@
+import mimetypes
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Union
+
+from helpers.LazyImportHelper import lazy_import
+
+# boto3 is optional; only the S3 backend needs it
+boto3 = lazy_import('boto3', optional=True)
+botocore_config = lazy_import('botocore.config', optional=True)
+
+"""
+Where geotagged frames are stored
+    - LocalFrameStorage: files under a directory (drone_frames), written
+      synchronously; manifest paths stay file paths
+    - S3FrameStorage: objects in an S3 compatible bucket (AWS, MinIO, ...),
+      uploaded by a thread pool sharing one pooled client while the job
+      keeps decoding; manifest paths are s3://bucket/key URLs
+Both store frames under keys like 2024-11-25/frame_20241125_101500_000000.jpg
+and hand back a Future per put; wait() collects a job's puts at the end.
+create_frame_storage picks the backend from a directory or s3:// location.
+"""
+
+# S3 uploads running at once (and HTTP connections in the client pool)
+S3_UPLOAD_WORKERS = 16
+
+# Bytes accepted but not yet uploaded; put() waits above this
+S3_MAX_PENDING_BYTES = 256 * 1024 * 1024
+
+
+def _copy_outcome(source: Future, target: Future) -> None:
+    error = source.exception()
+    if error is not None:
+        target.set_exception(error)
+    else:
+        target.set_result(source.result())
+
+
+class FrameStorage(ABC):
+    """Common put/wait handling; subclasses implement _put_bytes and the key <-> URL mapping"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Manifest path of the object stored under key"""
+
+    @abstractmethod
+    def key_of(self, url: str) -> Optional[str]:
+        """Key of a manifest path, None if it is not in this storage"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """File to write key to directly (parent directories created), None for remote storage"""
+        return None
+
+    @abstractmethod
+    def exists_all(self, urls: Iterable[str]) -> bool:
+        """True if every manifest path still exists"""
+
+    @abstractmethod
+    def _put_bytes(self, key: str, data: bytes) -> Future:
+        """Start storing data under key; the Future is done once it is stored"""
+
+    def put(self, key: str, data: Union[bytes, Future]) -> Future:
+        """
+        Store data under key
+
+        Args:
+            key: Object key, '/' separated
+            data: Encoded frame, or a Future resolving to it (e.g. an encode in another process)
+
+        Returns:
+            Future: Done once the object is stored; raises its error
+        """
+        if not isinstance(data, Future):
+            return self._put_bytes(key, data)
+
+        stored = Future()
+
+        def chain(encoded: Future) -> None:
+            try:
+                inner = self._put_bytes(key, encoded.result())
+            except Exception as e:
+                stored.set_exception(e)
+                return
+            inner.add_done_callback(lambda done: _copy_outcome(done, stored))
+
+        data.add_done_callback(chain)
+        return stored
+
+    def wait(self, futures: Iterable[Future]) -> None:
+        """Wait for puts; raises the first error"""
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                raise Exception(f"Storing frame failed: {str(error)}")
+
+    def stats(self) -> Dict:
+        return {'backend': type(self).__name__}
+
+
+class LocalFrameStorage(FrameStorage):
+    def __init__(self, base_dir: str):
+        """
+        Initialize the LocalFrameStorage
+
+        Args:
+            base_dir: Directory the frames are written under
+        """
+        self.base_dir = base_dir
+
+    def url(self, key: str) -> str:
+        return os.path.join(self.base_dir, *key.split('/'))
+
+    def key_of(self, url: str) -> Optional[str]:
+        root = os.path.abspath(self.base_dir)
+        path = os.path.abspath(url)
+        if os.path.commonpath([path, root]) != root:
+            return None
+        return os.path.relpath(path, root).replace(os.sep, '/')
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self.url(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def exists_all(self, urls: Iterable[str]) -> bool:
+        return all(os.path.exists(url) for url in urls)
+
+    def _put_bytes(self, key: str, data: bytes) -> Future:
+        future = Future()
+        try:
+            with open(self.local_path(key), 'wb') as f:
+                f.write(data)
+            future.set_result(self.url(key))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def stats(self) -> Dict:
+        return {'backend': 'local', 'base_dir': self.base_dir}
+
+
+class S3FrameStorage(FrameStorage):
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 region_name: Optional[str] = None, max_workers: int = S3_UPLOAD_WORKERS,
+                 max_pending_bytes: int = S3_MAX_PENDING_BYTES):
+        """
+        Initialize the S3FrameStorage
+
+        Args:
+            bucket: Bucket name; it must exist
+            prefix: Key prefix inside the bucket, e.g. 'drone_frames'
+            endpoint_url: Endpoint of an S3 compatible service (MinIO, moto), None for AWS
+            region_name: Region, None for the boto3 default
+            max_workers: Concurrent uploads
+            max_pending_bytes: Bytes accepted but not yet uploaded before put() waits
+
+        Raises:
+            Exception: boto3 is not installed
+        """
+        if boto3 is None:
+            raise Exception("S3 frame storage needs boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.max_workers = max_workers
+        self.max_pending_bytes = max_pending_bytes
+
+        self._client = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending_changed = threading.Condition(self._lock)
+        self._pending_bytes = 0
+
+        self.uploaded = 0
+        self.uploaded_bytes = 0
+        self.failed = 0
+
+    @property
+    def client(self):
+        """One client for all threads; its connection pool matches the upload workers"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    config = botocore_config.Config(max_pool_connections=self.max_workers,
+                                                    retries={'max_attempts': 5, 'mode': 'standard'})
+                    self._client = boto3.session.Session().client('s3', endpoint_url=self.endpoint_url,
+                                                                  region_name=self.region_name, config=config)
+        return self._client
+
+    def _full_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def url(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._full_key(key)}"
+
+    def key_of(self, url: str) -> Optional[str]:
+        root = self.url('')
+        if not url.startswith(root):
+            return None
+        return url[len(root):]
+
+    def presigned_url(self, key: str, expires: int = 3600) -> str:
+        """Time-limited GET URL for clients"""
+        return self.client.generate_presigned_url('get_object', ExpiresIn=expires,
+                                                  Params={'Bucket': self.bucket, 'Key': self._full_key(key)})
+
+    def exists_all(self, urls: Iterable[str]) -> bool:
+        """One listing per directory instead of a HEAD per object"""
+        by_directory = {}
+        for url in urls:
+            key = self.key_of(url)
+            if key is None:
+                return False
+            full_key = self._full_key(key)
+            by_directory.setdefault(full_key[:full_key.rfind('/') + 1], set()).add(full_key)
+
+        paginator = self.client.get_paginator('list_objects_v2')
+        for directory, wanted in by_directory.items():
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=directory):
+                wanted.difference_update(item['Key'] for item in page.get('Contents', ()))
+                if not wanted:
+                    break
+            if wanted:
+                return False
+        return True
+
+    def _upload(self, key: str, data: bytes) -> str:
+        """Pool task: PUT one object"""
+        try:
+            content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+            self.client.put_object(Bucket=self.bucket, Key=self._full_key(key), Body=data,
+                                   ContentType=content_type)
+            with self._lock:
+                self.uploaded += 1
+                self.uploaded_bytes += len(data)
+            return self.url(key)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending_bytes -= len(data)
+                self._pending_changed.notify_all()
+
+    def _put_bytes(self, key: str, data: bytes) -> Future:
+        with self._lock:
+            # Bound memory: wait for uploads to drain rather than queueing without limit
+            while self._pending_bytes > 0 and self._pending_bytes + len(data) > self.max_pending_bytes:
+                self._pending_changed.wait()
+            self._pending_bytes += len(data)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='s3-upload')
+        # One task per object: S3 has no multi-object PUT, so a slow upload only holds up its own frame
+        return self._pool.submit(self._upload, key, data)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'backend': 's3',
+                'bucket': self.bucket,
+                'prefix': self.prefix,
+                'uploaded': self.uploaded,
+                'uploaded_bytes': self.uploaded_bytes,
+                'failed': self.failed,
+                'pending_bytes': self._pending_bytes,
+            }
+
+
+def create_frame_storage(location: str, endpoint_url: Optional[str] = None,
+                         region_name: Optional[str] = None) -> FrameStorage:
+    """
+    Storage for a location
+
+    Args:
+        location: Directory, or s3://bucket[/prefix]
+        endpoint_url: S3 compatible endpoint (MinIO, moto), None for AWS
+        region_name: S3 region
+
+    Returns:
+        FrameStorage: LocalFrameStorage or S3FrameStorage
+    """
+    if location.startswith('s3://'):
+        bucket, _, prefix = location[len('s3://'):].partition('/')
+        if not bucket:
+            raise ValueError(f"No bucket in {location}")
+        return S3FrameStorage(bucket, prefix, endpoint_url, region_name)
+    return LocalFrameStorage(location)
@@ -0,0 +1,288 @@
+import os
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Optional
+
+from helpers.FrameCacheHelper import FrameCacheHelper
+from helpers.FrameReaderHelper import SEEK_THRESHOLD_SECONDS, av
+from helpers.LazyImportHelper import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+"""
+Per-video frame timestamps and keyframes
+    - One pass over the container's packets (no pixel decode) records the
+      presentation timestamp and keyframe flag of every frame
+    - Stored per video content hash as a small compressed array file, and
+      kept in memory for recently used videos
+    - Time -> frame lookups are exact for variable frame rate footage, and
+      seeks are only issued when a keyframe lies between the decoder and
+      the target frame (a seek can not land anywhere else)
+    - The frame size is kept too, so cache keys of preview frames are
+      known without opening the video
+Without PyAV, or for a video it can not demux, a constant frame rate
+timeline from the container's fps is used instead.
+"""
+
+# Timelines kept in memory
+MAX_TIMELINES = 64
+
+
+class FrameTimeline:
+    def __init__(self, pts: 'np.ndarray', time_base: Fraction, keyframes: Optional['np.ndarray'] = None,
+                 fps: float = 0.0, width: int = 0, height: int = 0):
+        """
+        Initialize the FrameTimeline
+
+        Args:
+            pts: Presentation timestamp of every frame in presentation order, in time_base units
+            time_base: Seconds per pts unit, as a Fraction
+            keyframes: Keyframe flag per frame, None when unknown
+            fps: Nominal frame rate, for callers that need one
+            width: Frame width in pixels, 0 when unknown
+            height: Frame height in pixels, 0 when unknown
+        """
+        self.pts = pts
+        self.time_base = time_base
+        self.keyframes = keyframes
+        self.fps = fps
+        self.width = width
+        self.height = height
+        # Seconds from the first frame; one integer division each, so a constant frame rate gives
+        # exactly frame_number / fps
+        self.times = (pts - pts[0]) * time_base.numerator / time_base.denominator if len(pts) else \
+            np.zeros(0)
+        self._keyframe_numbers = np.flatnonzero(keyframes) if keyframes is not None else None
+
+    @classmethod
+    def constant_rate(cls, fps: float, frame_count: int, width: int = 0, height: int = 0) -> 'FrameTimeline':
+        """Timeline of frame_number / fps, with unknown keyframes"""
+        timeline = cls(np.arange(frame_count, dtype=np.int64), Fraction(1), None, fps, width, height)
+        timeline.times = np.arange(frame_count) / fps if fps > 0 else np.zeros(frame_count)
+        return timeline
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.pts)
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the first frame to the end of the last one"""
+        if self.frame_count == 0:
+            return 0.0
+        last = self.times[-1]
+        return float(last + (1 / self.fps if self.fps > 0 else 0))
+
+    def time_of(self, frame_number: int) -> float:
+        """Presentation time of a frame in seconds"""
+        return float(self.times[frame_number])
+
+    def frame_at(self, seconds: float) -> int:
+        """Frame on screen at seconds (the last one presented at or before it), -1 before the first"""
+        return int(self.frames_at(np.asarray([seconds]))[0])
+
+    def frames_at(self, seconds: 'np.ndarray') -> 'np.ndarray':
+        """frame_at for many times at once"""
+        # The tolerance absorbs float error in times given as frame_number / fps
+        return np.searchsorted(self.times, np.asarray(seconds, dtype=np.float64) + 1e-9, side='right') - 1
+
+    def nearest_frame(self, seconds: float) -> int:
+        """Frame whose presentation time is closest to seconds (e.g. a timestamp reported by a decoder)"""
+        index = int(np.searchsorted(self.times, seconds))
+        if index >= self.frame_count:
+            return self.frame_count - 1
+        if index > 0 and seconds - self.times[index - 1] <= self.times[index] - seconds:
+            return index - 1
+        return index
+
+    def keyframe_before(self, frame_number: int) -> int:
+        """Keyframe at or before frame_number, where a seek to it lands; -1 when unknown"""
+        if self._keyframe_numbers is None or len(self._keyframe_numbers) == 0:
+            return -1
+        index = int(np.searchsorted(self._keyframe_numbers, frame_number, side='right')) - 1
+        return int(self._keyframe_numbers[max(index, 0)])
+
+    def should_seek(self, position: int, target: int) -> bool:
+        """
+        Seek rather than decode forward from position (the next frame the decoder returns) to target
+
+        A seek restarts decoding at the keyframe before target, so it only saves work when that
+        keyframe is past position. Without keyframe flags, gaps over SEEK_THRESHOLD_SECONDS seek.
+        """
+        if target < position:
+            return True
+        if self._keyframe_numbers is None:
+            return target - position > SEEK_THRESHOLD_SECONDS * self.fps
+        return self.keyframe_before(target) > position
+
+
+class FrameTimelineHelper:
+    def __init__(self, index_dir: Optional[str] = None):
+        """
+        Initialize the FrameTimelineHelper
+
+        Args:
+            index_dir: Directory for the timeline files, None to keep timelines in memory only
+        """
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._timelines = OrderedDict()
+        self._building = {}
+
+        self.builds = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        if self.index_dir:
+            os.makedirs(self.index_dir, exist_ok=True)
+
+    def _index_path(self, video_hash: str) -> str:
+        return os.path.join(self.index_dir, f"{video_hash}.npz")
+
+    def get(self, video_path: str, video_hash: Optional[str] = None) -> FrameTimeline:
+        """
+        Timeline of a video, indexed on first use
+
+        Args:
+            video_path: Video file
+            video_hash: Content hash of the video, computed when missing
+
+        Returns:
+            FrameTimeline: Indexed timeline, or a constant frame rate one when the video can not be demuxed
+        """
+        video_hash = video_hash or FrameCacheHelper.hash_file(video_path)
+        with self._lock:
+            timeline = self._timelines.get(video_hash)
+            if timeline is not None:
+                self._timelines.move_to_end(video_hash)
+                self.memory_hits += 1
+                return timeline
+            # One build per video; concurrent requests for it wait for that build
+            building = self._building.get(video_hash)
+            if building is None:
+                building = self._building[video_hash] = threading.Event()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            building.wait()
+            with self._lock:
+                timeline = self._timelines.get(video_hash)
+            return timeline if timeline is not None else self.get(video_path, video_hash)
+
+        try:
+            timeline = self._load(video_hash)
+            if timeline is None:
+                timeline = self.build(video_path)
+                if timeline.keyframes is not None:
+                    self._save(video_hash, timeline)
+            with self._lock:
+                self._timelines[video_hash] = timeline
+                while len(self._timelines) > MAX_TIMELINES:
+                    self._timelines.popitem(last=False)
+            return timeline
+        finally:
+            with self._lock:
+                del self._building[video_hash]
+            building.set()
+
+    def build(self, video_path: str) -> FrameTimeline:
+        """Read every packet's pts and keyframe flag; falls back to a constant frame rate timeline,
+        raises if neither PyAV nor OpenCV can open the video"""
+        if av is not None:
+            try:
+                timeline = self._demux(video_path)
+                with self._lock:
+                    self.builds += 1
+                return timeline
+            except Exception as e:
+                print(f"Indexing {video_path} failed, assuming a constant frame rate: {str(e)}")
+
+        video = cv2.VideoCapture(video_path)
+        try:
+            if not video.isOpened():
+                raise Exception("Failed to open video file")
+            fps = video.get(cv2.CAP_PROP_FPS)
+            frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        finally:
+            video.release()
+        return FrameTimeline.constant_rate(fps, frame_count, width, height)
+
+    def _demux(self, video_path: str) -> FrameTimeline:
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            rate = stream.average_rate or stream.guessed_rate
+            pts = []
+            keyframes = []
+            # Packets only: nothing is decoded
+            for packet in container.demux(stream):
+                if packet.pts is None or packet.size == 0:
+                    continue
+                pts.append(packet.pts)
+                keyframes.append(packet.is_keyframe)
+            time_base = stream.time_base
+            width, height = stream.codec_context.width, stream.codec_context.height
+
+        if not pts:
+            raise Exception("No video packets")
+        pts = np.asarray(pts, dtype=np.int64)
+        # Packets come in decode order; frames are presented in pts order
+        order = np.argsort(pts, kind='stable')
+        pts = pts[order]
+        keyframes = np.asarray(keyframes, dtype=bool)[order]
+        return FrameTimeline(pts, time_base, keyframes, float(rate) if rate else 0.0, width, height)
+
+    def _load(self, video_hash: str) -> Optional[FrameTimeline]:
+        if not self.index_dir:
+            return None
+        try:
+            with np.load(self._index_path(video_hash)) as data:
+                frame_count = int(data['frame_count'])
+                keyframes = np.unpackbits(data['keyframes'], count=frame_count).astype(bool)
+                width, height = (int(value) for value in data['size'])
+                timeline = FrameTimeline(np.cumsum(data['pts_deltas']), Fraction(int(data['time_base'][0]),
+                                         int(data['time_base'][1])), keyframes, float(data['fps']), width, height)
+        except (OSError, KeyError, ValueError):
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return timeline
+
+    def _save(self, video_hash: str, timeline: FrameTimeline) -> None:
+        if not self.index_dir:
+            return
+        # Deltas of a steady frame rate are nearly all equal, so they compress to almost nothing;
+        # the first delta is the first pts
+        pts_deltas = np.diff(timeline.pts, prepend=0)
+        temp_path = f"{self._index_path(video_hash)}.{os.getpid()}.{threading.get_ident()}.part.npz"
+        try:
+            np.savez_compressed(
+                temp_path,
+                pts_deltas=pts_deltas,
+                keyframes=np.packbits(timeline.keyframes),
+                frame_count=timeline.frame_count,
+                time_base=np.asarray([timeline.time_base.numerator, timeline.time_base.denominator]),
+                fps=timeline.fps,
+                size=np.asarray([timeline.width, timeline.height])
+            )
+            os.replace(temp_path, self._index_path(video_hash))
+        except OSError as e:
+            print(f"Failed to save frame timeline: {str(e)}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'timelines_in_memory': len(self._timelines),
+                'builds': self.builds,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+            }
@@ -0,0 +1,132 @@
+import io
+from typing import Dict, Optional
+
+from helpers.LazyImportHelper import lazy_import
+
+cv2 = lazy_import('cv2')
+Image = lazy_import('PIL.Image')
+features = lazy_import('PIL.features')
+
+"""
+Encoders for geotagged frames
+    - JPEG, WebP or AVIF through Pillow, with the GPS EXIF block embedded
+      in each container (APP1, the EXIF chunk, the Exif item)
+    - Quality and a speed preset per job; 'fast' spends the least CPU,
+      'small' the most for the smallest files
+Run python -m benchmarks.bench_frame_formats to compare them.
+"""
+
+# Output format -> container details, default quality and Pillow options per speed preset
+FRAME_FORMATS = {
+    'jpeg': {
+        'extension': '.jpg',
+        'mime_type': 'image/jpeg',
+        'pil_format': 'JPEG',
+        'feature': None,
+        'quality': 75,
+        'default_speed': 'fast',
+        'speeds': {
+            'fast': {},
+            'balanced': {'optimize': True},
+            'small': {'optimize': True, 'progressive': True},
+        },
+    },
+    'webp': {
+        'extension': '.webp',
+        'mime_type': 'image/webp',
+        'pil_format': 'WEBP',
+        'feature': 'webp',
+        'quality': 80,
+        'default_speed': 'balanced',
+        'speeds': {
+            'fast': {'method': 0},
+            'balanced': {'method': 4},
+            'small': {'method': 6},
+        },
+    },
+    'avif': {
+        'extension': '.avif',
+        'mime_type': 'image/avif',
+        'pil_format': 'AVIF',
+        'feature': 'avif',
+        'quality': 60,
+        'default_speed': 'balanced',
+        'speeds': {
+            # libaom below speed 6 costs seconds to minutes per 1080p frame
+            'fast': {'speed': 10},
+            'balanced': {'speed': 8},
+            'small': {'speed': 6},
+        },
+    },
+}
+
+SPEED_PRESETS = ('fast', 'balanced', 'small')
+
+
+class FrameWriterHelper:
+    def __init__(self, output_format: str = 'jpeg', quality: Optional[int] = None, speed: Optional[str] = None):
+        """
+        Initialize the FrameWriterHelper
+
+        Args:
+            output_format: One of FRAME_FORMATS
+            quality: Encoder quality 1-100, None for the format default
+            speed: One of SPEED_PRESETS, None for the format default
+
+        Raises:
+            ValueError: Unknown format or preset, quality out of range, or a format
+                this Pillow build can not write
+        """
+        if output_format not in FRAME_FORMATS:
+            raise ValueError(f"output_format must be one of: {', '.join(FRAME_FORMATS)}")
+        if speed is not None and speed not in SPEED_PRESETS:
+            raise ValueError(f"speed must be one of: {', '.join(SPEED_PRESETS)}")
+        if quality is not None and not 1 <= quality <= 100:
+            raise ValueError("quality must be between 1 and 100")
+
+        self.format_info = FRAME_FORMATS[output_format]
+        if self.format_info['feature'] and not features.check(self.format_info['feature']):
+            raise ValueError(f"{output_format} output is not supported by the installed Pillow")
+
+        self.output_format = output_format
+        self.quality = quality if quality is not None else self.format_info['quality']
+        self.speed = speed or self.format_info['default_speed']
+
+    @property
+    def extension(self) -> str:
+        return self.format_info['extension']
+
+    @property
+    def mime_type(self) -> str:
+        return self.format_info['mime_type']
+
+    def settings(self) -> Dict:
+        """Format, quality and speed, e.g. for cache keys"""
+        return {'format': self.output_format, 'quality': self.quality, 'speed': self.speed}
+
+    def _save(self, frame: 'np.ndarray', exif_bytes: Optional[bytes], target) -> None:
+        image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        options = dict(self.format_info['speeds'][self.speed], quality=self.quality)
+        if exif_bytes:
+            options['exif'] = exif_bytes
+        image.save(target, self.format_info['pil_format'], **options)
+
+    def encode(self, frame: 'np.ndarray', exif_bytes: Optional[bytes] = None) -> bytes:
+        """
+        Encode a BGR frame
+
+        Args:
+            frame: BGR frame as decoded by cv2
+            exif_bytes: EXIF block (piexif.dump output) to embed
+
+        Returns:
+            bytes: Encoded image
+        """
+        output = io.BytesIO()
+        self._save(frame, exif_bytes, output)
+        return output.getvalue()
+
+    def write(self, frame: 'np.ndarray', exif_bytes: Optional[bytes], output_path: str) -> str:
+        """Encode a BGR frame straight to output_path and return the path"""
+        self._save(frame, exif_bytes, output_path)
+        return output_path
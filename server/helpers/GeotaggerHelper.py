@@ -1,18 +1,25 @@
-import cv2
-import numpy as np
 import io
-from typing import List, Optional, Dict, Tuple
+from typing import List, Optional, Dict, Tuple, Union
 import base64
 import os
-import pandas as pd
+from concurrent.futures import Future, wait
 from datetime import datetime
 from flask import request, jsonify
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
-import piexif
-import piexif.helper
 from pathlib import Path
 
+from helpers.FrameIndexHelper import FrameIndexHelper
+from helpers.FrameReaderHelper import seek_capture
+from helpers.FrameRingHelper import FrameRingHelper, encode_frame, write_frame
+from helpers.FrameStorageHelper import FrameStorage, LocalFrameStorage
+from helpers.FrameTimelineHelper import FrameTimeline, FrameTimelineHelper
+from helpers.FrameWriterHelper import FrameWriterHelper
+from helpers.LazyImportHelper import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+piexif = lazy_import('piexif')
+
 """
 Convert csv + video to frame
 Input:
@@ -23,8 +30,15 @@ Output:
         - EXIF data (latitude, longitude)
 """
 
+# Saved frames are written to the frame index in batches of this size
+FRAME_INDEX_BATCH_SIZE = 100
+
 class GeotaggerHelper:
-    def __init__(self, csv_path: str, video_path: str, output_dir: str, frame_interval: int = 1):
+    def __init__(self, csv_path: str, video_path: str, output_dir: str, frame_interval: int = 1,
+                 frame_index: Optional[FrameIndexHelper] = None, video_hash: Optional[str] = None,
+                 start: Optional[Union[float, datetime]] = None, end: Optional[Union[float, datetime]] = None,
+                 frame_writer: Optional[FrameWriterHelper] = None, encode_workers: int = 0,
+                 storage: Optional[FrameStorage] = None, frame_timelines: Optional[FrameTimelineHelper] = None):
         """
         Initialize the GeotaggerHelper with paths to CSV and video files
         
@@ -33,22 +47,52 @@ class GeotaggerHelper:
             video_path: Path to the video file
             output_dir: Base directory for saving frames
             frame_interval: Interval in seconds between frame captures
+            frame_index: Spatial index that saved frames are recorded in
+            video_hash: Content hash of the video, stored with each indexed frame
+            start: Start of the processed range, in video seconds or as a UTC datetime; None for the beginning
+            end: End of the processed range, in video seconds or as a UTC datetime; None for the end
+            frame_writer: Output format of saved frames, JPEG by default
+            encode_workers: Processes that encode saved frames from a shared-memory frame ring, 0 to encode
+                in the decoding thread
+            storage: Where saved frames go, files under output_dir by default
+            frame_timelines: Stored frame timelines, reused across jobs on the same video; None indexes the
+                video for this job only
         """
         self.csv_path = csv_path
         self.video_path = video_path
         self.output_dir = output_dir
         self.frame_interval = frame_interval
+        self.frame_index = frame_index
+        self.video_hash = video_hash
+        self.start = start
+        self.end = end
+        self.frame_writer = frame_writer or FrameWriterHelper()
+        self.encode_workers = encode_workers
+        self.storage = storage or LocalFrameStorage(output_dir)
+        self.frame_timelines = frame_timelines
+        self.timeline = None
+        self.video_start_time = None
         self.telemetry_data = None
         self.video_capture = None
+        self._unindexed_frames = []
+        self._telemetry_order = None
+        self._telemetry_ns = None
+        self._frame_ring = None
+        self._stored = []
+
+    def frame_key(self, timestamp: datetime, filename: str) -> str:
+        """Storage key of a saved frame: date-based directory and filename"""
+        return f"{timestamp.year}-{timestamp.month:02d}-{timestamp.day:02d}/{filename}"
+
+    def store_frame(self, key: str, data: Union[bytes, Future]) -> str:
+        """Hand encoded bytes (or a Future of them) to the storage and return the manifest path"""
+        self._stored.append(self.storage.put(key, data))
+        return self.storage.url(key)
 
-    def create_output_directory(self, timestamp: datetime) -> str:
-        """Create and return path to date-based output directory"""
-        date_dir = os.path.join(
-            self.output_dir,
-            f"{timestamp.year}-{timestamp.month:02d}-{timestamp.day:02d}"
-        )
-        os.makedirs(date_dir, exist_ok=True)
-        return date_dir
+    def wait_for_storage(self) -> None:
+        """Wait until every frame of this job is stored; raises the first storage error"""
+        stored, self._stored = self._stored, []
+        self.storage.wait(stored)
 
     def convert_to_degree_minutes_seconds(self, decimal_degrees: float, is_latitude: bool) -> tuple:
         """Convert decimal degrees to degrees, minutes, seconds format"""
@@ -59,28 +103,32 @@ class GeotaggerHelper:
         seconds = ((decimal_degrees - degrees) * 60 - minutes) * 60
         return ((degrees, 1), (minutes, 1), (int(seconds * 100), 100)), direction
 
+    def create_gps_ifd(self, telemetry: Dict) -> Dict:
+        """Create the piexif GPS IFD from telemetry data"""
+        # Convert latitude and longitude to EXIF format
+        lat_dms, lat_ref = self.convert_to_degree_minutes_seconds(float(telemetry['latitude']), True)
+        lon_dms, lon_ref = self.convert_to_degree_minutes_seconds(float(telemetry['longitude']), False)
+
+        # Set GPS Info
+        return {
+            piexif.GPSIFD.GPSLatitudeRef: lat_ref,
+            piexif.GPSIFD.GPSLatitude: lat_dms,
+            piexif.GPSIFD.GPSLongitudeRef: lon_ref,
+            piexif.GPSIFD.GPSLongitude: lon_dms,
+            piexif.GPSIFD.GPSAltitude: (int(float(telemetry['altitude']) * 100), 100)
+        }
+
     def create_exif_bytes(self, telemetry: Dict) -> bytes:
         """Create EXIF data bytes from telemetry data"""
         # Create EXIF dictionary
         exif_dict = {
             "0th": {},
             "Exif": {},
-            "GPS": {},
+            "GPS": self.create_gps_ifd(telemetry),
             "1st": {},
             "thumbnail": None
         }
 
-        # Convert latitude and longitude to EXIF format
-        lat_dms, lat_ref = self.convert_to_degree_minutes_seconds(float(telemetry['latitude']), True)
-        lon_dms, lon_ref = self.convert_to_degree_minutes_seconds(float(telemetry['longitude']), False)
-
-        # Set GPS Info
-        exif_dict["GPS"][piexif.GPSIFD.GPSLatitudeRef] = lat_ref
-        exif_dict["GPS"][piexif.GPSIFD.GPSLatitude] = lat_dms
-        exif_dict["GPS"][piexif.GPSIFD.GPSLongitudeRef] = lon_ref
-        exif_dict["GPS"][piexif.GPSIFD.GPSLongitude] = lon_dms
-        exif_dict["GPS"][piexif.GPSIFD.GPSAltitude] = (int(float(telemetry['altitude']) * 100), 100)
-
         # Add custom telemetry data to EXIF UserComment
         # user_comment = {
         #     'compass_heading': telemetry['compass_heading'],
@@ -97,50 +145,207 @@ class GeotaggerHelper:
 
         return piexif.dump(exif_dict)
 
-    def save_frame_with_exif(self, frame: np.ndarray, telemetry: Dict, timestamp: datetime) -> str:
-        """Save frame as JPEG with EXIF data"""
-        # Convert BGR to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Create PIL Image
-        image = Image.fromarray(frame_rgb)
-        
-        # Create output directory and filename
-        output_dir = self.create_output_directory(timestamp)
-        filename = f"frame_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}.jpg"
-        output_path = os.path.join(output_dir, filename)
+    def save_frame_with_exif(self, frame: 'np.ndarray', telemetry: Dict, timestamp: datetime,
+                             slot: Optional[int] = None) -> str:
+        """Save frame in the writer's format (JPEG by default) with EXIF data; a frame in a ring
+        slot (see read_frame) is encoded by an encoder process and the path returned right away"""
+        # Storage key (date directory and filename); local storage is written to directly
+        key = self.frame_key(timestamp, f"frame_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}{self.frame_writer.extension}")
+        output_path = self.storage.local_path(key)
         
         # Create EXIF data
         exif_bytes = self.create_exif_bytes(telemetry)
         
-        # Save image with EXIF data
-        image.save(output_path, "jpeg", exif=exif_bytes)
+        if slot is not None:
+            settings = self.frame_writer.settings()
+            if output_path is not None:
+                self._frame_ring.submit(slot, write_frame, output_path, exif_bytes, settings)
+                return output_path
+            return self.store_frame(key, self._frame_ring.submit(slot, encode_frame, exif_bytes, settings))
         
-        return output_path
+        # Save image with EXIF data
+        if output_path is not None:
+            return self.frame_writer.write(frame, exif_bytes, output_path)
+        return self.store_frame(key, self.frame_writer.encode(frame, exif_bytes))
+
+    def open_frame_ring(self) -> None:
+        """Start the encoder processes and their frame ring, if encode_workers is set"""
+        if self.encode_workers <= 0 or self._frame_ring is not None:
+            return
+        width = int(self.video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._frame_ring = FrameRingHelper((height, width, 3), self.encode_workers)
+
+    def close_frame_ring(self) -> None:
+        """Wait for queued encodes and free the frame ring; raises the first encode error"""
+        if self._frame_ring is None:
+            return
+        ring, self._frame_ring = self._frame_ring, None
+        ring.close()
+
+    def discard_frames(self) -> None:
+        """Clean up after a failed job: drop queued encodes, wait for running encodes and stores and
+        forget unindexed frames; their errors are not raised, the job's own error is"""
+        if self._frame_ring is not None:
+            ring, self._frame_ring = self._frame_ring, None
+            ring.close(cancel=True)
+        stored, self._stored = self._stored, []
+        wait(stored)
+        self._unindexed_frames = []
+
+    def read_frame(self) -> Tuple[bool, Optional['np.ndarray'], Optional[int]]:
+        """
+        Decode the next frame, into a free ring slot when the frame ring is open
+
+        Returns:
+            Tuple of (success, frame, ring slot or None); pass the slot on to save_frame_with_exif
+        """
+        if self._frame_ring is None:
+            ret, frame = self.video_capture.read()
+            return ret, frame, None
+        slot = self._frame_ring.acquire()
+        ret, frame = self._frame_ring.read_into(self.video_capture, slot)
+        if not ret:
+            self._frame_ring.release(slot)
+            return False, None, None
+        return True, frame, slot
+
+    def index_frame(self, frame_info: Dict) -> None:
+        """Queue a saved frame for the frame index, writing a batch when it is full"""
+        if self.frame_index is None:
+            return
+        self._unindexed_frames.append(frame_info)
+        if len(self._unindexed_frames) >= FRAME_INDEX_BATCH_SIZE:
+            self.flush_frame_index()
+
+    def flush_frame_index(self) -> None:
+        """Write queued frames to the frame index"""
+        if self.frame_index is None or not self._unindexed_frames:
+            return
+        self.frame_index.record_frames(self._unindexed_frames, self.video_hash)
+        self._unindexed_frames = []
 
     def load_telemetry_data(self) -> None:
-        """Load and process the CSV telemetry data"""
+        """Load and process the CSV telemetry data, keeping only the rows of the selected range"""
         try:
             df = pd.read_csv(self.csv_path, sep=';')
             
             df.columns = df.columns.str.strip()
             df['timestamp'] = pd.to_datetime(df['datetime(utc)'])
-            self.telemetry_data = df
         except Exception as e:
             raise Exception(f"Failed to load telemetry data: {str(e)}")
             
+        # The video is taken to start at the first log row
+        self.video_start_time = df['timestamp'].iloc[0]
+        
+        start_seconds, end_seconds = self.get_time_range()
+        if start_seconds is not None or end_seconds is not None:
+            df = self.slice_telemetry(df, start_seconds, end_seconds)
+        self.telemetry_data = df
+        
+    def to_video_seconds(self, value: Optional[Union[float, datetime]]) -> Optional[float]:
+        """Video time in seconds of a range bound given in video seconds or as a UTC datetime"""
+        if value is None or isinstance(value, (int, float)):
+            return value
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert(None)
+        return (timestamp - self.video_start_time).total_seconds()
+        
+    def get_time_range(self) -> Tuple[Optional[float], Optional[float]]:
+        """Start and end of the processed range in video seconds, None for an open end"""
+        start_seconds = self.to_video_seconds(self.start)
+        end_seconds = self.to_video_seconds(self.end)
+        if start_seconds is not None and end_seconds is not None and start_seconds > end_seconds:
+            raise ValueError("start must not be after end")
+        return start_seconds, end_seconds
+        
+    def slice_telemetry(self, df: 'pd.DataFrame', start_seconds: Optional[float],
+                        end_seconds: Optional[float]) -> 'pd.DataFrame':
+        """Log rows inside the range plus the nearest row on either side"""
+        df = df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+        times = df['timestamp'].values
+        first, last = 0, len(df)
+        if start_seconds is not None:
+            start_time = (self.video_start_time + pd.Timedelta(seconds=start_seconds)).to_datetime64()
+            first = max(0, int(np.searchsorted(times, start_time)) - 1)
+        if end_seconds is not None:
+            end_time = (self.video_start_time + pd.Timedelta(seconds=end_seconds)).to_datetime64()
+            last = min(len(df), int(np.searchsorted(times, end_time, side='right')) + 1)
+        if first >= last:
+            raise ValueError("The selected range is outside the flight log")
+        return df.iloc[first:last].reset_index(drop=True)
+        
+    def get_frame_range(self, timeline: FrameTimeline) -> Tuple[int, int]:
+        """First frame and end frame (exclusive) of the selected range"""
+        start_seconds, end_seconds = self.get_time_range()
+        start_frame = 0 if start_seconds is None else int(np.searchsorted(timeline.times, start_seconds - 1e-6))
+        end_frame = timeline.frame_count if end_seconds is None else \
+            int(np.searchsorted(timeline.times, end_seconds + 1e-6, side='right'))
+        return start_frame, max(start_frame, end_frame)
+        
+    def nearest_telemetry_rows(self, times_ns: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Match timestamps to the nearest log row in one vectorized pass
+
+        Args:
+            times_ns: UTC timestamps as int64 nanoseconds
+
+        Returns:
+            Tuple of (row index per timestamp, time difference in seconds per timestamp)
+        """
+        if self.telemetry_data is None:
+            raise Exception("Telemetry data not loaded")
+
+        # The sorted log is built once and shared by every later lookup
+        if self._telemetry_ns is None:
+            log_ns = self.telemetry_data['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+            self._telemetry_order = np.argsort(log_ns, kind='stable')
+            self._telemetry_ns = log_ns[self._telemetry_order]
+        log_ns = self._telemetry_ns
+
+        # Nearest neighbour on the sorted log: compare the rows either side of the insertion point
+        right = np.clip(np.searchsorted(log_ns, times_ns), 0, len(log_ns) - 1)
+        left = np.clip(right - 1, 0, len(log_ns) - 1)
+        left_diff = np.abs(times_ns - log_ns[left])
+        right_diff = np.abs(log_ns[right] - times_ns)
+        nearest = np.where(left_diff <= right_diff, left, right)
+        return self._telemetry_order[nearest], np.minimum(left_diff, right_diff) / 1e9
+
     def load_video(self) -> None:
-        """Load the video file"""
+        """Load the video file and its frame timeline"""
         self.video_capture = cv2.VideoCapture(self.video_path)
         if not self.video_capture.isOpened():
             raise Exception("Failed to open video file")
+        self.timeline = self.load_timeline(self.video_path, self.video_hash)
+            
+    def load_timeline(self, video_path: str, video_hash: Optional[str] = None) -> FrameTimeline:
+        """Frame timestamps and keyframes of a video, from the stored timelines when configured"""
+        if self.frame_timelines is not None:
+            return self.frame_timelines.get(video_path, video_hash)
+        return FrameTimelineHelper().build(video_path)
+            
+    def seek_frame(self, position: int, frame_number: int) -> int:
+        """
+        Move the capture so the next read returns frame_number, seeking only when a keyframe lies
+        between position and frame_number (see seek_capture)
+
+        Args:
+            position: Frame the next read would return, -1 when unknown
+            frame_number: Frame wanted next
+
+        Returns:
+            int: Frame the next read returns; less than frame_number at the end of the video
+        """
+        return seek_capture(self.video_capture, self.timeline, position, int(frame_number))
             
     def get_telemetry_at_timestamp(self, timestamp: datetime) -> Dict:
         """Get telemetry data closest to the given timestamp"""
         if self.telemetry_data is None:
             raise Exception("Telemetry data not loaded")
             
-        closest_row = self.telemetry_data.iloc[(self.telemetry_data['timestamp'] - timestamp).abs().argsort()[0]]
+        rows, _ = self.nearest_telemetry_rows(np.array([pd.Timestamp(timestamp).value], dtype=np.int64))
+        closest_row = self.telemetry_data.iloc[rows[0]]
         return {
             'latitude': closest_row['latitude'],
             'longitude': closest_row['longitude'],
@@ -169,48 +374,60 @@ class GeotaggerHelper:
             raise Exception("Video and telemetry data must be loaded first")
             
         saved_frames = []
-        fps = self.video_capture.get(cv2.CAP_PROP_FPS)
-        frame_count = 0
         
         # Get video duration and start time
-        total_frames = int(self.video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
-        video_duration = total_frames / fps
-        video_start_time = self.telemetry_data['timestamp'].iloc[0]
+        video_duration = self.timeline.duration
+        video_start_time = self.video_start_time
+        
+        # Seek once (to the keyframe before start, decoding forward) and stop at end
+        start_frame, end_frame = self.get_frame_range(self.timeline)
+        if 0 < start_frame < end_frame:
+            self.seek_frame(0, start_frame)
+        frame_count = start_frame
         
         print(f"Video duration: {video_duration} seconds")
-        print(f"Total frames to process: {total_frames}")
+        print(f"Total frames to process: {end_frame - start_frame}")
         
-        while True:
-            ret, frame = self.video_capture.read()
-            if not ret:
-                break
+        self.open_frame_ring()
+        try:
+            while frame_count < end_frame:
+                ret, frame, slot = self.read_frame()
+                if not ret:
+                    break
                 
-            # Get current video position in seconds
-            current_pos_ms = self.video_capture.get(cv2.CAP_PROP_POS_MSEC)
-            current_pos_sec = current_pos_ms / 1000.0
+                # Presentation time of the frame in seconds
+                current_pos_sec = self.timeline.time_of(frame_count)
             
-            # Calculate current timestamp
-            current_timestamp = video_start_time + pd.Timedelta(seconds=current_pos_sec)
+                # Calculate current timestamp
+                current_timestamp = video_start_time + pd.Timedelta(seconds=current_pos_sec)
             
-            # Get closest telemetry data
-            telemetry = self.get_telemetry_at_timestamp(current_timestamp)
+                # Get closest telemetry data
+                telemetry = self.get_telemetry_at_timestamp(current_timestamp)
             
-            # Save frame with EXIF data
-            saved_path = self.save_frame_with_exif(frame, telemetry, current_timestamp)
+                # Save frame with EXIF data
+                saved_path = self.save_frame_with_exif(frame, telemetry, current_timestamp, slot)
             
-            frame_info = {
-                'timestamp': current_timestamp.isoformat(),
-                'path': saved_path,
-                'telemetry': telemetry,
-                'frame_number': frame_count
-            }
-            saved_frames.append(frame_info)
+                frame_info = {
+                    'timestamp': current_timestamp.isoformat(),
+                    'path': saved_path,
+                    'telemetry': telemetry,
+                    'frame_number': frame_count
+                }
+                saved_frames.append(frame_info)
+                self.index_frame(frame_info)
             
-            frame_count += 1
-            if frame_count % 100 == 0:
-                print(f"Processed {frame_count} frames")
+                frame_count += 1
+                if frame_count % 100 == 0:
+                    print(f"Processed {frame_count} frames")
         
-        print(f"Total frames processed: {frame_count}")
+            # Every returned path exists once the encoders and uploads are done
+            self.close_frame_ring()
+            self.wait_for_storage()
+            self.flush_frame_index()
+        finally:
+            # A no-op after success; after a failure no encoder or store is left running
+            self.discard_frames()
+        print(f"Total frames processed: {frame_count - start_frame}")
         print(f"Total frames saved: {len(saved_frames)}")
         return saved_frames
 
@@ -220,16 +437,14 @@ class GeotaggerHelper:
             raise Exception("Video and telemetry data must be loaded first")
             
         saved_frames = []
-        fps = self.video_capture.get(cv2.CAP_PROP_FPS)
-        frame_count = 0
+        fps = self.timeline.fps
         
-        # Get all unique timestamps from CSV
+        # Get all unique timestamps from CSV (only the rows of the start/end range were loaded)
         csv_timestamps = self.telemetry_data['timestamp'].unique()
         print(f"Total unique timestamps in CSV: {len(csv_timestamps)}")
         
         # Calculate video duration
-        total_frames = int(self.video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
-        video_duration = total_frames / fps
+        video_duration = self.timeline.duration
         print(f"Video duration: {video_duration} seconds")
         
         # Calculate frame interval based on CSV frequency
@@ -238,16 +453,22 @@ class GeotaggerHelper:
         frame_interval = int(ideal_interval * fps)
         print(f"Calculated frame interval: {frame_interval} frames")
         
-        video_start_time = csv_timestamps[0]
+        video_start_time = self.video_start_time
+        
+        # Same range as the other paths: seek once (to the keyframe before start, decoding forward)
+        # and stop at end
+        start_frame, end_frame = self.get_frame_range(self.timeline)
+        if 0 < start_frame < end_frame:
+            self.seek_frame(0, start_frame)
+        frame_count = start_frame
         
-        while True:
+        while frame_count < end_frame:
             ret, frame = self.video_capture.read()
             if not ret:
                 break
                 
-            # Get current video position in seconds
-            current_pos_ms = self.video_capture.get(cv2.CAP_PROP_POS_MSEC)
-            current_pos_sec = current_pos_ms / 1000.0
+            # Presentation time of the frame in seconds
+            current_pos_sec = self.timeline.time_of(frame_count)
             
             # Find closest CSV timestamp
             current_timestamp = video_start_time + pd.Timedelta(seconds=current_pos_sec)
@@ -269,14 +490,19 @@ class GeotaggerHelper:
                     'telemetry': telemetry
                 }
                 saved_frames.append(frame_info)
+                self.index_frame(frame_info)
                 
             frame_count += 1
             
-        print(f"Total frames processed: {frame_count}")
+        self.wait_for_storage()
+        self.flush_frame_index()
+        print(f"Total frames processed: {frame_count - start_frame}")
         print(f"Total frames saved: {len(saved_frames)}")
         return saved_frames
 
     def __del__(self):
         """Cleanup resources"""
+        if self._frame_ring is not None:
+            self._frame_ring.close(cancel=True)
         if self.video_capture is not None:
             self.video_capture.release()
\ No newline at end of file
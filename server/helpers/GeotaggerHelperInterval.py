@@ -1,22 +1,29 @@
 from helpers.GeotaggerHelper import GeotaggerHelper
 
-import cv2
-import numpy as np
 import io
-from typing import List, Optional, Dict, Tuple
+from typing import List, Optional, Dict, Tuple, Union
 import base64
 import os
-import pandas as pd
 from datetime import datetime
 from flask import request, jsonify
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
-import piexif
-import piexif.helper
 from pathlib import Path
 
+from helpers.FrameIndexHelper import FrameIndexHelper
+from helpers.FrameStorageHelper import FrameStorage
+from helpers.FrameTimelineHelper import FrameTimelineHelper
+from helpers.FrameWriterHelper import FrameWriterHelper
+from helpers.LazyImportHelper import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
 class GeotaggerHelperInterval(GeotaggerHelper):
-    def __init__(self, csv_path: str, video_path: str, output_dir: str, frame_interval: float = 1):
+    def __init__(self, csv_path: str, video_path: str, output_dir: str, frame_interval: float = 1,
+                 frame_index: Optional[FrameIndexHelper] = None, video_hash: Optional[str] = None,
+                 start: Optional[Union[float, datetime]] = None, end: Optional[Union[float, datetime]] = None,
+                 frame_writer: Optional[FrameWriterHelper] = None, encode_workers: int = 0,
+                 storage: Optional[FrameStorage] = None, frame_timelines: Optional[FrameTimelineHelper] = None):
         """
         Initialize the GeotaggerHelperInterval with paths to CSV and video files
         
@@ -25,8 +32,19 @@ class GeotaggerHelperInterval(GeotaggerHelper):
             video_path: Path to the video file
             output_dir: Base directory for saving frames
             frame_interval: Interval in seconds between frame captures
+            frame_index: Spatial index that saved frames are recorded in
+            video_hash: Content hash of the video, stored with each indexed frame
+            start: Start of the processed range, in video seconds or as a UTC datetime; None for the beginning
+            end: End of the processed range, in video seconds or as a UTC datetime; None for the end
+            frame_writer: Output format of saved frames, JPEG by default
+            encode_workers: Processes that encode saved frames from a shared-memory frame ring, 0 to encode
+                in the decoding thread
+            storage: Where saved frames go, files under output_dir by default
+            frame_timelines: Stored frame timelines, reused across jobs on the same video; None indexes the
+                video for this job only
         """
-        super().__init__(csv_path, video_path, output_dir, frame_interval)
+        super().__init__(csv_path, video_path, output_dir, frame_interval, frame_index, video_hash, start, end,
+                         frame_writer, encode_workers, storage, frame_timelines)
         
     def process_video(self) -> List[Dict]:
         """Process video and save frames at specified intervals with EXIF data"""
@@ -34,13 +52,13 @@ class GeotaggerHelperInterval(GeotaggerHelper):
             raise Exception("Video and telemetry data must be loaded first")
             
         saved_frames = []
-        fps = self.video_capture.get(cv2.CAP_PROP_FPS)
-        frame_count = 0
+        timeline = self.timeline
+        fps = timeline.fps
         
         # Get video duration and start time
-        total_frames = int(self.video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
-        video_duration = total_frames / fps
-        video_start_time = self.telemetry_data['timestamp'].iloc[0]
+        total_frames = timeline.frame_count
+        video_duration = timeline.duration
+        video_start_time = self.video_start_time
         
         print(f"Video duration: {video_duration} seconds")
         print(f"Total frames: {total_frames}")
@@ -53,40 +71,59 @@ class GeotaggerHelperInterval(GeotaggerHelper):
             
         print(f"Frame step: {frame_step} frames")
         
-        current_frame = 0
+        start_frame, end_frame = self.get_frame_range(timeline)
+        if start_frame >= end_frame:
+            frame_numbers = np.zeros(0, dtype=np.int64)
+        else:
+            # The frame on screen every frame_step / fps seconds from the first one: frame_step frames
+            # apart at a constant frame rate, chosen by presentation time when the rate varies
+            start_time = timeline.time_of(start_frame)
+            sample_times = start_time + np.arange(0, timeline.times[end_frame - 1] - start_time + 1e-6,
+                                                  frame_step / fps)
+            frame_numbers = np.unique(timeline.frames_at(sample_times))
+        position = 0
         
-        while current_frame < total_frames:
-            # Set frame position
-            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
+        self.open_frame_ring()
+        try:
+            for current_frame in frame_numbers:
+                # Seek (to the keyframe before, decoding forward) only when a keyframe lies ahead
+                # of the target; otherwise decoding through the gap is cheaper
+                position = self.seek_frame(position, current_frame)
             
-            # Read frame
-            ret, frame = self.video_capture.read()
-            if not ret:
-                break
+                # Read frame
+                ret, frame, slot = self.read_frame()
+                position += 1
+                if not ret:
+                    break
                 
-            # Calculate current timestamp
-            current_pos_sec = current_frame / fps
-            current_timestamp = video_start_time + pd.Timedelta(seconds=current_pos_sec)
-            
-            # Get telemetry at timestamp
-            telemetry = self.get_telemetry_at_timestamp(current_timestamp)
+                # Calculate current timestamp
+                current_pos_sec = timeline.time_of(current_frame)
+                current_timestamp = video_start_time + pd.Timedelta(seconds=current_pos_sec)
             
-            # Save frame with EXIF data
-            saved_path = self.save_frame_with_exif(frame, telemetry, current_timestamp)
+                # Get telemetry at timestamp
+                telemetry = self.get_telemetry_at_timestamp(current_timestamp)
             
-            frame_info = {
-                'timestamp': current_timestamp.isoformat(),
-                'path': saved_path,
-                'telemetry': telemetry,
-                'frame_number': current_frame
-            }
-            saved_frames.append(frame_info)
+                # Save frame with EXIF data
+                saved_path = self.save_frame_with_exif(frame, telemetry, current_timestamp, slot)
             
-            # Move to next frame based on interval
-            current_frame += frame_step
+                frame_info = {
+                    'timestamp': current_timestamp.isoformat(),
+                    'path': saved_path,
+                    'telemetry': telemetry,
+                    'frame_number': int(current_frame)
+                }
+                saved_frames.append(frame_info)
+                self.index_frame(frame_info)
             
-            if len(saved_frames) % 10 == 0:
-                print(f"Processed {len(saved_frames)} frames")
+                if len(saved_frames) % 10 == 0:
+                    print(f"Processed {len(saved_frames)} frames")
         
+            # Every returned path exists once the encoders and uploads are done
+            self.close_frame_ring()
+            self.wait_for_storage()
+            self.flush_frame_index()
+        finally:
+            # A no-op after success; after a failure no encoder or store is left running
+            self.discard_frames()
         print(f"Total frames processed: {len(saved_frames)}")
         return saved_frames
\ No newline at end of file
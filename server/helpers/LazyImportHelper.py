@@ -0,0 +1,83 @@
+import importlib
+import importlib.util
+import time
+from typing import Dict, Optional
+
+"""
+Deferred imports of heavy dependencies
+    - lazy_import('cv2') returns a stand-in that imports the module on
+      first attribute access, so helpers can keep writing cv2.imread(...)
+      while importing app.py stays cheap
+    - warm_imports() loads all of them up front; the prefork server calls
+      it before forking so workers share the pages copy-on-write
+"""
+
+# Modules that take tens to hundreds of milliseconds to import
+HEAVY_MODULES = (
+    'numpy',
+    'cv2',
+    'pandas',
+    'av',
+    'PIL.Image',
+    'piexif',
+    'exif',
+    'geopy.distance',
+)
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            # import_module holds the import lock, so concurrent first uses are safe
+            module = self._module = importlib.import_module(self._name)
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str, optional: bool = False) -> Optional[LazyModule]:
+    """
+    Module stand-in that imports name on first use
+
+    Args:
+        name: Dotted module name
+        optional: Return None instead of a stand-in when the module is not installed
+
+    Returns:
+        Optional[LazyModule]: None only for a missing optional module
+    """
+    if optional:
+        try:
+            if importlib.util.find_spec(name) is None:
+                return None
+        except ImportError:  # Parent package missing
+            return None
+    return LazyModule(name)
+
+
+def warm_imports() -> Dict[str, float]:
+    """
+    Import every installed heavy module now
+
+    Returns:
+        Dict[str, float]: Milliseconds spent per module, missing modules are skipped
+    """
+    timings = {}
+    for name in HEAVY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
@@ -1,6 +1,9 @@
-from typing import List, Dict, Any
-import numpy as np
-from geopy.distance import geodesic
+from typing import List, Dict, Any, Iterator
+
+from helpers.LazyImportHelper import lazy_import
+
+np = lazy_import('numpy')
+geopy_distance = lazy_import('geopy.distance')
 
 class LocationHelper:
     def validate_timestamps(self, points: List[Dict[str, Any]]) -> bool:
@@ -28,8 +31,23 @@ class LocationHelper:
         """
         if len(points) < 2:
             return points
+        
+        return list(self.iter_interpolated_locations(points, interval_seconds))
 
-        interpolated = []
+    def iter_interpolated_locations(self, points: List[Dict[str, Any]], interval_seconds: int) -> Iterator[Dict[str, Any]]:
+        """
+        Interpolated locations in time order, produced one at a time so a long path is never held in memory.
+        
+        Args:
+            points (List[Dict]): List of points with timestamp, lat, lon
+            interval_seconds (int): Interval in seconds between interpolated points
+            
+        Yields:
+            Dict: Interpolated point with timestamp, lat, lon
+        """
+        if len(points) < 2:
+            yield from points
+            return
         
         # Convert all timestamps to float
         for point in points:
@@ -61,20 +79,18 @@ class LocationHelper:
                 lat = start_point['lat'] + progress * (end_point['lat'] - start_point['lat'])
                 lon = start_point['lon'] + progress * (end_point['lon'] - start_point['lon'])
                 
-                interpolated.append({
+                yield {
                     'timestamp': float(t),
                     'lat': lat,
                     'lon': lon
-                })
+                }
         
         # Add the last point
-        interpolated.append({
+        yield {
             'timestamp': float(points[-1]['timestamp']),
             'lat': points[-1]['lat'],
             'lon': points[-1]['lon']
-        })
-        
-        return interpolated
+        }
 
     def calculate_path_stats(self, points: List[Dict[str, Any]]) -> Dict[str, float]:
         """
@@ -86,32 +102,51 @@ class LocationHelper:
         Returns:
             Dict[str, float]: Statistics including distance, duration, speed
         """
-        if len(points) < 2:
+        stats = PathStatsAccumulator()
+        for point in points:
+            stats.add(point)
+        return stats.result()
+
+
+class PathStatsAccumulator:
+    """calculate_path_stats for points that arrive one at a time (e.g. while a response streams)"""
+
+    def __init__(self):
+        self.first = None
+        self.last = None
+        self.total_distance = 0
+        self.point_count = 0
+
+    def add(self, point: Dict[str, Any]) -> None:
+        """Add the next point of the path"""
+        if self.last is not None:
+            point1 = (self.last['lat'], self.last['lon'])
+            point2 = (point['lat'], point['lon'])
+            self.total_distance += geopy_distance.geodesic(point1, point2).meters
+        else:
+            self.first = point
+        self.last = point
+        self.point_count += 1
+
+    def result(self) -> Dict[str, float]:
+        """Statistics of the points added so far, as returned by calculate_path_stats"""
+        if self.point_count < 2:
             return {
                 'total_distance': 0,
                 'duration': 0,
                 'average_speed': 0,
-                'point_count': len(points)
+                'point_count': self.point_count
             }
         
-        total_distance = 0
-        
-        # Calculate total distance
-        for i in range(len(points) - 1):
-            point1 = (points[i]['lat'], points[i]['lon'])
-            point2 = (points[i + 1]['lat'], points[i + 1]['lon'])
-            distance = geodesic(point1, point2).meters
-            total_distance += distance
-        
         # Calculate duration
-        duration = points[-1]['timestamp'] - points[0]['timestamp']
+        duration = self.last['timestamp'] - self.first['timestamp']
         
         # Calculate average speed
-        average_speed = total_distance / duration if duration > 0 else 0
+        average_speed = self.total_distance / duration if duration > 0 else 0
         
         return {
-            'total_distance': total_distance,
+            'total_distance': self.total_distance,
             'duration': duration,
             'average_speed': average_speed,
-            'point_count': len(points)
+            'point_count': self.point_count
         }
\ No newline at end of file
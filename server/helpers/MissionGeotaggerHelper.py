@@ -0,0 +1,247 @@
+from helpers.GeotaggerHelper import GeotaggerHelper
+from helpers.FrameIndexHelper import FrameIndexHelper
+from helpers.FrameStorageHelper import FrameStorage
+from helpers.FrameTimelineHelper import FrameTimelineHelper
+from helpers.FrameWriterHelper import FrameWriterHelper
+from helpers.FrameReaderHelper import av, seek_capture
+from helpers.LazyImportHelper import lazy_import
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+"""
+Geotag all clips of one flight from a single flight log
+Input:
+    - CSV file (DJI flight log), parsed and indexed once
+    - Videos (the clips the camera split the recording into)
+Output:
+    - Frame every x seconds of every clip, with EXIF data (latitude, longitude)
+    - One manifest: per-clip alignment and all saved frames in time order
+
+Each clip is placed on the log timeline by, in order of preference:
+    - offset: seconds after the first log row, given by the caller
+    - creation_time: the container's creation time plus clock_offset
+    - sequential: right after the previous clip ends (the first clip
+      starts at the first log row)
+"""
+
+class MissionGeotaggerHelper(GeotaggerHelper):
+    def __init__(self, csv_path: str, videos: List[Dict], output_dir: str, frame_interval: float = 1,
+                 clock_offset: float = 0, max_time_diff: Optional[float] = 5, max_workers: Optional[int] = None,
+                 frame_index: Optional[FrameIndexHelper] = None, frame_writer: Optional[FrameWriterHelper] = None,
+                 storage: Optional[FrameStorage] = None, frame_timelines: Optional[FrameTimelineHelper] = None):
+        """
+        Initialize the MissionGeotaggerHelper
+
+        Args:
+            csv_path: Path to the CSV file containing telemetry data
+            videos: One dict per clip with name, path, video_hash and an optional offset in seconds
+            output_dir: Base directory for saving frames
+            frame_interval: Interval in seconds between frame captures, 0 for every frame
+            clock_offset: Seconds added to each clip's creation time to get log (UTC) time
+            max_time_diff: Frames further than this many seconds from any log row are skipped, None for no limit
+            max_workers: Clips processed at the same time
+            frame_index: Spatial index that saved frames are recorded in
+            frame_writer: Output format of saved frames, JPEG by default
+            storage: Where saved frames go, files under output_dir by default
+            frame_timelines: Stored frame timelines, reused across jobs on the same clip; None indexes each
+                clip for this job only
+        """
+        super().__init__(csv_path, None, output_dir, frame_interval, frame_index=frame_index,
+                         frame_writer=frame_writer, storage=storage, frame_timelines=frame_timelines)
+        self.videos = videos
+        # Frame timeline per clip path, loaded by read_clip_info
+        self.clip_timelines = {}
+        self.clock_offset = clock_offset
+        self.max_time_diff = max_time_diff
+        self.max_workers = max_workers or max(1, min(len(videos), os.cpu_count() or 1))
+
+    def read_creation_time(self, video_path: str) -> Optional['pd.Timestamp']:
+        """Container creation time as naive UTC, None when missing or PyAV is not installed"""
+        if av is None:
+            return None
+        try:
+            with av.open(video_path) as container:
+                value = container.metadata.get('creation_time')
+                if not value and container.streams.video:
+                    value = container.streams.video[0].metadata.get('creation_time')
+        except Exception:
+            return None
+        if not value:
+            return None
+        try:
+            created = pd.Timestamp(value)
+        except ValueError:
+            return None
+        return created.tz_convert(None) if created.tzinfo is not None else created
+
+    def read_clip_info(self, video_path: str, video_hash: Optional[str] = None) -> Dict:
+        """Frame rate, frame count and duration of a clip, from its frame timeline (which fails for an
+        unreadable clip)"""
+        timeline = self.load_timeline(video_path, video_hash)
+        if timeline.fps <= 0:
+            raise Exception("Video has no frame rate")
+        self.clip_timelines[video_path] = timeline
+        return {'fps': timeline.fps, 'frame_count': timeline.frame_count, 'duration': timeline.duration}
+
+    def align_clips(self) -> List[Dict]:
+        """
+        Place every clip on the log timeline
+
+        Returns:
+            List[Dict]: Per clip (input order) its name, start and end time, and the alignment used
+        """
+        if self.telemetry_data is None:
+            raise Exception("Telemetry data not loaded")
+
+        log_start = self.telemetry_data['timestamp'].min()
+        previous_end = log_start
+        clips = []
+        for index, video in enumerate(self.videos):
+            clip = {'index': index, 'name': video['name'], 'video_hash': video.get('video_hash')}
+            try:
+                clip.update(self.read_clip_info(video['path'], video.get('video_hash')))
+            except Exception as e:
+                clip.update({'status': 'error', 'error': str(e)})
+                clips.append(clip)
+                continue
+
+            offset = video.get('offset')
+            created = self.read_creation_time(video['path']) if offset is None else None
+            if offset is not None:
+                start = log_start + pd.Timedelta(seconds=float(offset))
+                clip['alignment'] = 'offset'
+            elif created is not None:
+                start = created + pd.Timedelta(seconds=self.clock_offset)
+                clip['alignment'] = 'creation_time'
+            else:
+                start = previous_end
+                clip['alignment'] = 'sequential'
+
+            end = start + pd.Timedelta(seconds=clip['duration'])
+            previous_end = end
+            clip.update({'start': start, 'end': end, 'offset': (start - log_start).total_seconds()})
+            clips.append(clip)
+        return clips
+
+    def process_clip(self, clip: Dict, video_path: str) -> List[Dict]:
+        """
+        Save the frames of one aligned clip
+
+        Args:
+            clip: Entry from align_clips
+            video_path: Path to the clip
+
+        Returns:
+            List[Dict]: Saved frames; clip['unmatched'] counts frames outside the log
+        """
+        timeline = self.clip_timelines[video_path]
+        fps = clip['fps']
+        frame_step = max(1, int(round(fps * self.frame_interval)))
+        if timeline.frame_count == 0:
+            frame_numbers = np.zeros(0, dtype=np.int64)
+        else:
+            # The frame on screen every frame_step / fps seconds: frame_step frames apart at a constant rate
+            sample_times = np.arange(0, timeline.times[-1] + 1e-6, frame_step / fps)
+            frame_numbers = np.unique(timeline.frames_at(sample_times))
+
+        # All telemetry lookups for the clip in one pass over the shared log index
+        times_ns = clip['start'].value + np.round(timeline.times[frame_numbers] * 1e9).astype(np.int64)
+        rows, diffs = self.nearest_telemetry_rows(times_ns)
+        columns = self.telemetry_data[['latitude', 'longitude', 'altitude(feet)']].to_numpy()
+
+        saved_frames = []
+        unmatched = 0
+        video = cv2.VideoCapture(video_path)
+        if not video.isOpened():
+            raise Exception("Failed to open video file")
+        try:
+            position = 0
+            for frame_number, time_ns, row, diff in zip(frame_numbers, times_ns, rows, diffs):
+                if self.max_time_diff is not None and diff > self.max_time_diff:
+                    unmatched += 1
+                    continue
+
+                # Seek only when a keyframe lies between the decoder and the frame, else decode forward
+                position = seek_capture(video, timeline, position, int(frame_number))
+                ret, frame = video.read()
+                position += 1
+                if not ret:
+                    break
+
+                latitude, longitude, altitude = columns[row]
+                telemetry = {'latitude': latitude, 'longitude': longitude, 'altitude': altitude}
+                timestamp = pd.Timestamp(int(time_ns))
+                saved_path = self.save_frame_with_exif(frame, telemetry, timestamp)
+
+                saved_frames.append({
+                    'timestamp': timestamp.isoformat(),
+                    'path': saved_path,
+                    'telemetry': telemetry,
+                    'frame_number': int(frame_number),
+                    'time_diff': float(diff),
+                    'clip': clip['name']
+                })
+        finally:
+            video.release()
+
+        clip['unmatched'] = unmatched
+        print(f"Clip {clip['name']}: {len(saved_frames)} frames saved, {unmatched} outside the flight log")
+        return saved_frames
+
+    def process_mission(self) -> Dict:
+        """Align all clips and process them concurrently
+
+        Returns:
+            Dict: clips (alignment, frame counts, status per clip) and saved_frames of all clips in time order
+        """
+        if self.telemetry_data is None:
+            raise Exception("Telemetry data must be loaded first")
+
+        clips = self.align_clips()
+        # Build the shared log index before the workers use it
+        self.nearest_telemetry_rows(np.zeros(1, dtype=np.int64))
+
+        saved_frames = []
+        clip_frames = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='mission') as pool:
+            futures = {
+                clip['index']: pool.submit(self.process_clip, clip, self.videos[clip['index']]['path'])
+                for clip in clips if clip.get('status') != 'error'
+            }
+            for clip in clips:
+                future = futures.get(clip['index'])
+                if future is None:
+                    continue
+                try:
+                    frames = future.result()
+                    clip_frames[clip['index']] = frames
+                    saved_frames.extend(frames)
+                    clip.update({'status': 'ok', 'frames': len(frames)})
+                except Exception as e:
+                    clip.update({'status': 'error', 'error': str(e)})
+
+        # Uploads of all clips run on while the clips are decoded
+        self.wait_for_storage()
+
+        # Index frames only once they are stored, so a search never returns a missing frame
+        if self.frame_index is not None:
+            for clip in clips:
+                frames = clip_frames.get(clip['index'])
+                if frames:
+                    self.frame_index.record_frames(frames, clip['video_hash'])
+
+        for clip in clips:
+            for key in ('start', 'end'):
+                if key in clip:
+                    clip[key] = clip[key].isoformat()
+
+        saved_frames.sort(key=lambda frame: frame['timestamp'])
+        print(f"Total clips: {len(clips)}")
+        print(f"Total frames saved: {len(saved_frames)}")
+        return {'clips': clips, 'saved_frames': saved_frames}
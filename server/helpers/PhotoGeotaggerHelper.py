@@ -0,0 +1,174 @@
+from helpers.GeotaggerHelper import GeotaggerHelper
+from helpers.ExifReaderHelper import ExifReaderHelper
+from helpers.FrameCacheHelper import FrameCacheHelper
+from helpers.FrameIndexHelper import FrameIndexHelper
+from helpers.FrameStorageHelper import FrameStorage
+from helpers.LazyImportHelper import lazy_import
+
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+piexif = lazy_import('piexif')
+
+"""
+Geotag existing photos from a flight log
+Input:
+    - CSV file (DJI flight log)
+    - Photos (JPEG)
+Output:
+    - Copies of the photos with GPS EXIF spliced in (no re-encode), named
+      after the upload plus a hash of its content, so photos that share a
+      name (counters that reset, several cameras) never overwrite each other
+"""
+
+class PhotoGeotaggerHelper(GeotaggerHelper):
+    def __init__(self, csv_path: str, photos: List[Tuple[str, str]], output_dir: str,
+                 clock_offset: float = 0, max_time_diff: Optional[float] = 5, max_workers: Optional[int] = None,
+                 frame_index: Optional[FrameIndexHelper] = None, storage: Optional[FrameStorage] = None):
+        """
+        Initialize the PhotoGeotaggerHelper
+
+        Args:
+            csv_path: Path to the CSV file containing telemetry data
+            photos: List of (name, path) for each photo
+            output_dir: Base directory for saving tagged photos
+            clock_offset: Seconds added to each photo's DateTimeOriginal to get log (UTC) time
+            max_time_diff: Photos further than this many seconds from any log row are skipped, None for no limit
+            max_workers: Threads used to read and write photos
+            frame_index: Spatial index that tagged photos are recorded in
+            storage: Where tagged photos go, files under output_dir by default
+        """
+        super().__init__(csv_path, None, output_dir, frame_index=frame_index, storage=storage)
+        self.photos = photos
+        self.clock_offset = clock_offset
+        self.max_time_diff = max_time_diff
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+
+    def read_photo_time(self, path: str) -> Optional[datetime]:
+        """Read DateTimeOriginal from the photo header only"""
+        _, tags = ExifReaderHelper().read(path)
+        if not tags or not tags.get('datetime_original'):
+            return None
+        return datetime.strptime(tags['datetime_original'], '%Y:%m:%d %H:%M:%S')
+
+    def match_photos(self, photo_times: List[Optional[datetime]]) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Match every photo to the nearest log row in one vectorized pass
+
+        Args:
+            photo_times: DateTimeOriginal per photo, None when missing
+
+        Returns:
+            Tuple of (row index per photo, time difference in seconds per photo);
+            photos without a time get index -1 and an infinite difference
+        """
+        if self.telemetry_data is None:
+            raise Exception("Telemetry data not loaded")
+
+        has_time = np.array([t is not None for t in photo_times], dtype=bool)
+        offset = pd.Timedelta(seconds=self.clock_offset)
+        photo_ns = np.array(
+            [(pd.Timestamp(t) + offset).value if t is not None else 0 for t in photo_times],
+            dtype=np.int64
+        )
+        nearest, diff_seconds = self.nearest_telemetry_rows(photo_ns)
+
+        rows = np.where(has_time, nearest, -1)
+        diff_seconds = np.where(has_time, diff_seconds, np.inf)
+        return rows, diff_seconds
+
+    def splice_gps_exif(self, image_bytes: bytes, telemetry: Dict) -> bytes:
+        """Replace the GPS IFD in the photo's EXIF, keeping all other tags and the pixel data"""
+        try:
+            exif_dict = piexif.load(image_bytes)
+        except Exception:
+            exif_dict = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
+
+        exif_dict["GPS"] = self.create_gps_ifd(telemetry)
+        output = io.BytesIO()
+        piexif.insert(piexif.dump(exif_dict), image_bytes, output)
+        return output.getvalue()
+
+    def photo_filename(self, name: str, image_bytes: bytes) -> str:
+        """Output filename: the upload's name with the first 12 hex digits of its SHA-256 appended"""
+        stem, extension = os.path.splitext(os.path.basename(name))
+        return f"{stem}_{FrameCacheHelper.hash_bytes(image_bytes)[:12]}{extension}"
+
+    def tag_photo(self, name: str, path: str, telemetry: Dict, timestamp: datetime) -> str:
+        """Store a tagged copy of one photo and return its path"""
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+
+        tagged_bytes = self.splice_gps_exif(image_bytes, telemetry)
+
+        # Waited for here, so a failed upload is reported for this photo only
+        stored = self.storage.put(self.frame_key(timestamp, self.photo_filename(name, image_bytes)), tagged_bytes)
+        self.storage.wait([stored])
+        return stored.result()
+
+    def process_photos(self) -> List[Dict]:
+        """Read photo times, match them to the log and tag the photos in parallel
+
+        Returns:
+            List[Dict]: One entry per photo, in input order, with status ok, unmatched or error
+        """
+        if self.telemetry_data is None:
+            raise Exception("Telemetry data must be loaded first")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            photo_times = list(pool.map(lambda photo: self._safe_read_time(photo[1]), self.photos))
+
+            rows, diffs = self.match_photos(photo_times)
+
+            columns = self.telemetry_data[['latitude', 'longitude', 'altitude(feet)']].to_numpy()
+            log_times = self.telemetry_data['timestamp']
+
+            results = [None] * len(self.photos)
+            futures = {}
+            for index, ((name, path), row, diff) in enumerate(zip(self.photos, rows, diffs)):
+                if row < 0:
+                    results[index] = {'name': name, 'status': 'error', 'error': 'No DateTimeOriginal in EXIF'}
+                    continue
+                if self.max_time_diff is not None and diff > self.max_time_diff:
+                    results[index] = {'name': name, 'status': 'unmatched', 'time_diff': float(diff)}
+                    continue
+
+                latitude, longitude, altitude = columns[row]
+                telemetry = {'latitude': latitude, 'longitude': longitude, 'altitude': altitude}
+                timestamp = log_times.iloc[row]
+                futures[index] = (pool.submit(self.tag_photo, name, path, telemetry, timestamp), telemetry, timestamp, diff)
+
+            for index, (future, telemetry, timestamp, diff) in futures.items():
+                name = self.photos[index][0]
+                try:
+                    results[index] = {
+                        'name': name,
+                        'status': 'ok',
+                        'path': future.result(),
+                        'timestamp': timestamp.isoformat(),
+                        'time_diff': float(diff),
+                        'telemetry': telemetry
+                    }
+                except Exception as e:
+                    results[index] = {'name': name, 'status': 'error', 'error': str(e)}
+
+        for result in results:
+            if result['status'] == 'ok':
+                self.index_frame(result)
+        self.flush_frame_index()
+
+        tagged = sum(1 for result in results if result['status'] == 'ok')
+        print(f"Total photos: {len(self.photos)}")
+        print(f"Total photos tagged: {tagged}")
+        return results
+
+    def _safe_read_time(self, path: str) -> Optional[datetime]:
+        try:
+            return self.read_photo_time(path)
+        except Exception:
+            return None
@@ -0,0 +1,189 @@
+import json
+import zlib
+from collections.abc import Iterator as IteratorType
+from typing import Any, Iterable, Iterator, Optional
+
+from flask import Response, request, stream_with_context
+
+from helpers.LazyImportHelper import lazy_import
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; falls back to the json module
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is offered instead
+    brotli = None
+
+np = lazy_import('numpy')
+
+"""
+Large JSON responses
+    - Serialized with orjson (NumPy scalars and arrays natively), one
+      list element at a time, so the body is never built as one string
+    - Compressed with brotli or gzip, negotiated from Accept-Encoding
+    - Sent in chunks of about CHUNK_SIZE bytes
+    - Iterators (generators) are written as arrays while they are consumed,
+      and callables are called when reached, so a response can carry items
+      produced during the send and a summary of them after the items
+    - NDJSON responses send one line per item as soon as it is produced
+"""
+
+CHUNK_SIZE = 64 * 1024
+# Levels picked with benchmarks/bench_json_response.py: most of the size
+# reduction for a fraction of the CPU time of the maximum levels
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 2
+# Containers this deep are written piece by piece; anything deeper is one dumps call
+STREAM_DEPTH = 2
+
+
+def _default(value: Any) -> Any:
+    """Fallback serializer for the json module"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize value to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(',', ':')).encode()
+
+
+class ResponseHelper:
+    def negotiate_encoding(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """
+        Pick the content encoding from an Accept-Encoding header
+
+        Returns:
+            Optional[str]: 'br', 'gzip' or None for identity
+        """
+        accepted = {}
+        for part in (accept_encoding or '').split(','):
+            name, _, params = part.strip().partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                accepted[name.strip().lower()] = quality
+
+        wildcard = accepted.get('*', 0.0)
+        for encoding in (('br',) if brotli is not None else ()) + ('gzip',):
+            if accepted.get(encoding, wildcard) > 0:
+                return encoding
+        return None
+
+    def iter_json(self, value: Any, depth: int = STREAM_DEPTH) -> Iterator[bytes]:
+        """Yield the JSON encoding of value in pieces"""
+        if callable(value):
+            yield from self.iter_json(value(), depth)
+        elif isinstance(value, IteratorType):
+            # Consumed while sending: items are never all in memory
+            yield b'['
+            for index, item in enumerate(value):
+                if index:
+                    yield b','
+                yield from self.iter_json(item, depth - 1)
+            yield b']'
+        elif depth > 0 and isinstance(value, dict):
+            yield b'{'
+            for index, (key, item) in enumerate(value.items()):
+                if index:
+                    yield b','
+                yield dumps(str(key))
+                yield b':'
+                yield from self.iter_json(item, depth - 1)
+            yield b'}'
+        elif depth > 0 and isinstance(value, (list, tuple)):
+            yield b'['
+            for index, item in enumerate(value):
+                if index:
+                    yield b','
+                yield from self.iter_json(item, depth - 1)
+            yield b']'
+        else:
+            yield dumps(value)
+
+    def iter_chunks(self, pieces: Iterator[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+        """Group pieces into CHUNK_SIZE chunks and compress them with encoding"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            compress, finish = compressor.process, compressor.finish
+        elif encoding == 'gzip':
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip header
+            compress, finish = compressor.compress, compressor.flush
+        else:
+            compress, finish = None, None
+
+        buffer = []
+        size = 0
+        for piece in pieces:
+            buffer.append(piece)
+            size += len(piece)
+            if size >= CHUNK_SIZE:
+                chunk = b''.join(buffer)
+                buffer, size = [], 0
+                chunk = compress(chunk) if compress else chunk
+                if chunk:
+                    yield chunk
+
+        chunk = b''.join(buffer)
+        if compress:
+            chunk = compress(chunk) + finish()
+        if chunk:
+            yield chunk
+
+    def json_response(self, value: Any, status: int = 200) -> Response:
+        """
+        Streamed, compressed JSON response
+
+        Args:
+            value: Anything dumps can serialize
+            status: HTTP status code
+
+        Returns:
+            Response: Body is produced while it is sent
+        """
+        encoding = self.negotiate_encoding(request.headers.get('Accept-Encoding'))
+        body = self.iter_chunks(self.iter_json(value), encoding)
+
+        # Keep the request context (and its admission slot) until the body is sent
+        response = Response(stream_with_context(body), status=status, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    def ndjson_response(self, lines: Iterable[Any], status: int = 200) -> Response:
+        """
+        Streamed newline delimited JSON response, one line per item
+
+        Lines are not compressed or grouped, so each reaches the client as soon as it is produced.
+
+        Args:
+            lines: Items to send, consumed while the response is sent
+            status: HTTP status code
+
+        Returns:
+            Response: application/x-ndjson body
+        """
+        body = (dumps(line) + b'\n' for line in lines)
+        # Keep the request context (and its admission slot) until the body is sent
+        return Response(stream_with_context(body), status=status, mimetype='application/x-ndjson')
+
+    def wants_ndjson(self) -> bool:
+        """True if the request prefers application/x-ndjson over application/json"""
+        return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == \
+            'application/x-ndjson'
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+"""
+Memoized geotagging results
+Key:
+    - Video content hash
+    - Flight log content hash
+    - Helper class
+    - Job parameters
+Value:
+    - The saved_frames manifest; the frames themselves stay where the
+      helper wrote them and are only referenced by path (or storage URL)
+An entry is dropped as soon as one of its frames is missing.
+"""
+
+class ResultCacheHelper:
+    def __init__(self, cache_dir: str, max_entries: int = 256,
+                 frames_exist: Optional[Callable[[Iterable[str]], bool]] = None):
+        """
+        Initialize the ResultCacheHelper
+
+        Args:
+            cache_dir: Directory for the manifests
+            max_entries: Manifests kept; the least recently used are removed first
+            frames_exist: Checks that all manifest paths still exist (FrameStorage.exists_all),
+                local files by default
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.frames_exist = frames_exist or (lambda paths: all(os.path.exists(path) for path in paths))
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(video_hash: str, csv_hash: str, helper_name: str, params: Dict[str, Any]) -> str:
+        """Build the cache key for a geotagging job"""
+        job = json.dumps([video_hash, csv_hash, helper_name, params], sort_keys=True)
+        return hashlib.sha256(job.encode()).hexdigest()
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return the cached saved_frames for key, or None on a miss or when frames were deleted"""
+        path = self._manifest_path(key)
+        try:
+            with open(path, 'r') as f:
+                saved_frames = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if not self.frames_exist(frame['path'] for frame in saved_frames):
+            self._remove(path)
+            with self._lock:
+                self.invalidations += 1
+                self.misses += 1
+            return None
+
+        try:
+            # Touch so the LRU order follows use
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return saved_frames
+
+    def put(self, key: str, saved_frames: List[Dict]) -> None:
+        """Store the saved_frames manifest for key"""
+        path = self._manifest_path(key)
+        try:
+            # Write to a temporary name first so readers never see a partial file
+            with tempfile.NamedTemporaryFile('w', delete=False, dir=self.cache_dir, suffix='.part') as temp_file:
+                json.dump(saved_frames, temp_file, default=str)
+                temp_path = temp_file.name
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing result cache entry: {str(e)}")
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used manifests beyond max_entries"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+
+        for _, path in sorted(entries)[:max(0, len(entries) - self.max_entries)]:
+            self._remove(path)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and the number of stored manifests"""
+        entries = sum(1 for name in os.listdir(self.cache_dir) if name.endswith('.json'))
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': entries,
+                'max_entries': self.max_entries
+            }
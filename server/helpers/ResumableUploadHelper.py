@@ -0,0 +1,271 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import BinaryIO, Dict, Optional
+
+"""
+Resumable uploads (tus-style) into a content-addressed blob store
+    - create: reserve an upload of a known length; if the client sends the
+      SHA-256 of a file that is already stored, the upload completes at once
+    - append: write a chunk at the current offset; a dropped connection
+      keeps everything received so far
+    - status: current offset, so the client knows where to resume
+Finished uploads are moved to blob_dir/<sha256> and can be referenced by
+hash from any processing endpoint.
+"""
+
+CHUNK_SIZE = 1024 * 1024
+# Unfinished uploads untouched for this long are removed
+UPLOAD_EXPIRY_SECONDS = 24 * 60 * 60
+
+
+def is_content_hash(value: Optional[str]) -> bool:
+    """True for a lowercase SHA-256 hex digest"""
+    return bool(value) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+class ResumableUploadHelper:
+    def __init__(self, upload_dir: str, blob_dir: str):
+        """
+        Initialize the ResumableUploadHelper
+
+        Args:
+            upload_dir: Directory for unfinished uploads (<id>.part and <id>.json)
+            blob_dir: Content-addressed store for finished uploads
+        """
+        self.upload_dir = upload_dir
+        self.blob_dir = blob_dir
+        os.makedirs(self.upload_dir, exist_ok=True)
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        # Running hash per upload so a chunk only hashes its own bytes;
+        # rebuilt from the part file after a restart
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def get_blob_path(self, content_hash: str) -> Optional[str]:
+        """Path of a stored blob, or None if no file with that hash was uploaded"""
+        if not is_content_hash(content_hash):
+            return None
+        path = os.path.join(self.blob_dir, content_hash)
+        return path if os.path.exists(path) else None
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.upload_dir, f"{upload_id}.part")
+
+    def _info_path(self, upload_id: str) -> str:
+        return os.path.join(self.upload_dir, f"{upload_id}.json")
+
+    def _write_info(self, upload_id: str, info: Dict) -> None:
+        temp_path = f"{self._info_path(upload_id)}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(info, f)
+        os.replace(temp_path, self._info_path(upload_id))
+
+    def _read_info(self, upload_id: str) -> Optional[Dict]:
+        # Upload ids are uuid4 hex; anything else never touches the disk
+        if len(upload_id) != 32 or any(c not in '0123456789abcdef' for c in upload_id):
+            return None
+        try:
+            with open(self._info_path(upload_id), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def create(self, length: int, filename: Optional[str] = None, content_hash: Optional[str] = None) -> Dict:
+        """
+        Reserve a new upload
+
+        Args:
+            length: Total size in bytes
+            filename: Original file name, kept for reference
+            content_hash: SHA-256 of the whole file, if the client knows it
+
+        Returns:
+            Dict: Upload status (see status)
+        """
+        if length < 0:
+            raise ValueError("Upload-Length must not be negative")
+        if content_hash is not None and not is_content_hash(content_hash):
+            raise ValueError("Upload hash must be a lowercase SHA-256 hex digest")
+
+        self.purge_expired()
+
+        upload_id = uuid.uuid4().hex
+        info = {
+            'upload_id': upload_id,
+            'length': length,
+            'filename': filename,
+            'expected_hash': content_hash,
+            'hash': None,
+            'created': time.time()
+        }
+
+        blob_path = self.get_blob_path(content_hash) if content_hash else None
+        if blob_path is not None and os.path.getsize(blob_path) == length:
+            # Known file: nothing to send
+            info['hash'] = content_hash
+        else:
+            open(self._part_path(upload_id), 'wb').close()
+
+        self._write_info(upload_id, info)
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Optional[Dict]:
+        """
+        Current state of an upload
+
+        Returns:
+            Optional[Dict]: upload_id, offset, length, complete and hash, None for an unknown id
+        """
+        info = self._read_info(upload_id)
+        if info is None:
+            return None
+
+        if info['hash']:
+            offset = info['length']
+        else:
+            try:
+                offset = os.path.getsize(self._part_path(upload_id))
+            except OSError:
+                return None
+
+        return {
+            'upload_id': upload_id,
+            'offset': offset,
+            'length': info['length'],
+            'filename': info['filename'],
+            'complete': bool(info['hash']),
+            'hash': info['hash']
+        }
+
+    def append(self, upload_id: str, offset: int, stream: BinaryIO) -> Optional[Dict]:
+        """
+        Write a chunk at offset, reading the stream in small pieces
+
+        Args:
+            upload_id: Id returned by create
+            offset: Offset the client believes the upload is at
+            stream: Request body
+
+        Returns:
+            Optional[Dict]: Upload status after the write, None for an unknown id
+        """
+        info = self._read_info(upload_id)
+        if info is None:
+            return None
+        if info['hash']:
+            raise ValueError("Upload is already complete")
+
+        part_path = self._part_path(upload_id)
+        try:
+            part = open(part_path, 'r+b')
+        except OSError:
+            return None
+
+        # Active uploads do not expire
+        os.utime(self._info_path(upload_id))
+
+        with part:
+            # One writer per upload, also across worker processes
+            fcntl.flock(part.fileno(), fcntl.LOCK_EX)
+            current = os.fstat(part.fileno()).st_size
+            if offset != current:
+                raise OffsetMismatchError(current)
+
+            file_hash = self._running_hash(upload_id, part, current)
+            remaining = info['length'] - current
+            part.seek(current)
+            try:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    if len(chunk) > remaining:
+                        raise ValueError("Chunk exceeds Upload-Length")
+                    part.write(chunk)
+                    file_hash.update(chunk)
+                    remaining -= len(chunk)
+            finally:
+                # Keep whatever arrived before a dropped connection
+                part.flush()
+                with self._lock:
+                    self._hashes[upload_id] = (part.tell(), file_hash)
+
+            if remaining == 0:
+                self._finish(upload_id, info, file_hash.hexdigest())
+
+        return self.status(upload_id)
+
+    def _running_hash(self, upload_id: str, part: BinaryIO, offset: int):
+        """Hash of the first offset bytes, reusing the in-memory state when it is current"""
+        with self._lock:
+            cached = self._hashes.pop(upload_id, None)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+
+        file_hash = hashlib.sha256()
+        part.seek(0)
+        remaining = offset
+        while remaining > 0:
+            chunk = part.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            file_hash.update(chunk)
+            remaining -= len(chunk)
+        return file_hash
+
+    def _finish(self, upload_id: str, info: Dict, content_hash: str) -> None:
+        """Move a complete upload into the blob store"""
+        part_path = self._part_path(upload_id)
+        with self._lock:
+            self._hashes.pop(upload_id, None)
+
+        if info['expected_hash'] and info['expected_hash'] != content_hash:
+            os.unlink(part_path)
+            os.unlink(self._info_path(upload_id))
+            raise ValueError("Uploaded content does not match the announced hash")
+
+        blob_path = os.path.join(self.blob_dir, content_hash)
+        if os.path.exists(blob_path):
+            # Same content uploaded before
+            os.unlink(part_path)
+        else:
+            os.replace(part_path, blob_path)
+
+        info['hash'] = content_hash
+        self._write_info(upload_id, info)
+        print(f"Upload {upload_id} complete: {content_hash}")
+
+    def delete(self, upload_id: str) -> bool:
+        """Abort an upload; stored blobs are kept"""
+        if self._read_info(upload_id) is None:
+            return False
+        with self._lock:
+            self._hashes.pop(upload_id, None)
+        for path in (self._part_path(upload_id), self._info_path(upload_id)):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        return True
+
+    def purge_expired(self) -> None:
+        """Remove upload records (and unfinished parts) older than UPLOAD_EXPIRY_SECONDS"""
+        cutoff = time.time() - UPLOAD_EXPIRY_SECONDS
+        for name in os.listdir(self.upload_dir):
+            path = os.path.join(self.upload_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+            except OSError:
+                continue
+            with self._lock:
+                self._hashes.pop(os.path.splitext(name)[0], None)
+
+
+class OffsetMismatchError(Exception):
+    def __init__(self, offset: int):
+        super().__init__(f"Upload-Offset does not match the current offset {offset}")
+        self.offset = offset
@@ -0,0 +1,140 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from helpers.ExifReaderHelper import ExifReaderHelper
+from helpers.FrameCacheHelper import FrameCacheHelper
+from helpers.LazyImportHelper import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+
+"""
+Thumbnails of geotagged frames
+    - A few fixed widths, generated on first access
+    - Cached by source content hash in a FrameCacheHelper (memory + disk)
+    - JPEGs are decoded once, at the reduced scale (libjpeg DCT scaling)
+      picked from the width in their header, so a full resolution frame is
+      never materialized
+    - Formats cv2 can not read (AVIF in most OpenCV builds) are decoded
+      with Pillow
+"""
+
+# Size name -> maximum width
+THUMBNAIL_SIZES = {
+    'thumb': 320,
+    'small': 640,
+    'medium': 1280,
+}
+
+# Names of cv2 constants, looked up on use so cv2 loads lazily
+THUMBNAIL_PARAMS = [
+    'IMWRITE_JPEG_QUALITY', 80,
+    'IMWRITE_JPEG_OPTIMIZE', 0,
+    'IMWRITE_JPEG_PROGRESSIVE', 0,
+]
+
+# cv2 flags that decode a JPEG at 1/2, 1/4 and 1/8 scale
+REDUCED_READ_FLAGS = (
+    (8, 'IMREAD_REDUCED_COLOR_8'),
+    (4, 'IMREAD_REDUCED_COLOR_4'),
+    (2, 'IMREAD_REDUCED_COLOR_2'),
+)
+
+# Content hashes remembered per (path, mtime, size)
+MAX_HASH_ENTRIES = 10000
+
+
+class ThumbnailHelper:
+    def __init__(self, cache: FrameCacheHelper):
+        """
+        Initialize the ThumbnailHelper
+
+        Args:
+            cache: Cache for encoded thumbnails
+        """
+        self.cache = cache
+        self._hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def content_hash(self, path: str) -> str:
+        """SHA-256 of a file, recomputed only when its mtime or size changes"""
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            content_hash = self._hashes.get(key)
+            if content_hash is not None:
+                self._hashes.move_to_end(key)
+                return content_hash
+
+        content_hash = FrameCacheHelper.hash_file(path)
+        with self._lock:
+            self._hashes[key] = content_hash
+            while len(self._hashes) > MAX_HASH_ENTRIES:
+                self._hashes.popitem(last=False)
+        return content_hash
+
+    def get_thumbnail(self, path: str, size_name: str, content_hash: Optional[str] = None) -> Optional[bytes]:
+        """
+        Return the encoded thumbnail of an image, generating it on first access
+
+        Args:
+            path: Source image
+            size_name: Key of THUMBNAIL_SIZES
+            content_hash: Source content hash, if already known
+
+        Returns:
+            Optional[bytes]: JPEG bytes, None if the image can not be read
+        """
+        max_width = THUMBNAIL_SIZES[size_name]
+        content_hash = content_hash or self.content_hash(path)
+        key = f"{content_hash}_{size_name}"
+
+        encoded = self.cache.get(key)
+        if encoded is not None:
+            return encoded
+
+        image = self._read_reduced(path, max_width)
+        if image is None:
+            return None
+
+        height, width = image.shape[:2]
+        if width > max_width:
+            image = cv2.resize(image, (max_width, int(height * max_width / width)), interpolation=cv2.INTER_AREA)
+
+        params = [getattr(cv2, param) if isinstance(param, str) else param for param in THUMBNAIL_PARAMS]
+        success, buffer = cv2.imencode('.jpg', image, params)
+        if not success:
+            return None
+
+        encoded = buffer.tobytes()
+        self.cache.put(key, encoded)
+        return encoded
+
+    def _read_reduced(self, path: str, max_width: int):
+        """Decode at the smallest DCT scale that is still at least max_width wide"""
+        try:
+            _, size = ExifReaderHelper().read_size(path)
+        except (OSError, ValueError):
+            size = None
+
+        flag = cv2.IMREAD_COLOR
+        if size is not None:
+            for scale, name in REDUCED_READ_FLAGS:
+                if size[0] // scale >= max_width:
+                    flag = getattr(cv2, name)
+                    break
+
+        image = cv2.imread(path, flag)
+        return image if image is not None else self._read_with_pillow(path)
+
+    def _read_with_pillow(self, path: str):
+        """Decode with Pillow into a BGR array, None if it can not read the image either"""
+        try:
+            with Image.open(path) as image:
+                rgb = np.asarray(image.convert('RGB'))
+        except Exception:
+            return None
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
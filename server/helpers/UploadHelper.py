@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from flask import Request
+
+"""
+Streaming upload spool
+    - Multipart file parts are written straight to a spool file in chunks
+      as the request body is parsed, never collected into one bytes object
+    - A SHA-256 content hash is computed while the chunks are written
+    - Helpers receive the spool file path; the file is removed when the
+      request closes unless it was moved away first
+"""
+
+class HashingSpoolFile:
+    def __init__(self, spool_dir: str, suffix: str = ''):
+        """
+        Create an empty spool file
+
+        Args:
+            spool_dir: Directory for spool files
+            suffix: File suffix, e.g. the uploaded file's extension
+        """
+        os.makedirs(spool_dir, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=spool_dir, suffix=suffix, delete=False)
+        self.path = self._file.name
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._detached = False
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        """SHA-256 of everything written so far"""
+        return self._hash.hexdigest()
+
+    def move_to(self, path: str) -> str:
+        """Move the spooled file to path; it is no longer removed on close"""
+        self._file.flush()
+        os.replace(self.path, path)
+        self.path = path
+        self._detached = True
+        return path
+
+    def close(self) -> None:
+        self._file.close()
+        if not self._detached:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __getattr__(self, name):
+        # read, seek, tell, flush, readable, ... go to the underlying file
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class SpoolingRequest(Request):
+    """Flask request that spools every uploaded file part through HashingSpoolFile"""
+
+    spool_dir = os.path.join(tempfile.gettempdir(), 'video-geotagger', 'upload_spool')
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None):
+        suffix = os.path.splitext(filename or '')[1][:16]
+        return HashingSpoolFile(self.spool_dir, suffix)
+
+
+class UploadHelper:
+    def get_path(self, file_storage) -> str:
+        """Path of an uploaded file on disk"""
+        stream = file_storage.stream
+        if not isinstance(stream, HashingSpoolFile):
+            raise Exception("Upload was not spooled to disk")
+        stream.flush()
+        return stream.path
+
+    def get_hash(self, file_storage) -> str:
+        """SHA-256 of an uploaded file, computed while it was received"""
+        stream = file_storage.stream
+        if not isinstance(stream, HashingSpoolFile):
+            raise Exception("Upload was not spooled to disk")
+        return stream.hexdigest()
+
+    def move_to(self, file_storage, path: str) -> str:
+        """Take ownership of an uploaded file by moving it to path"""
+        stream = file_storage.stream
+        if isinstance(stream, HashingSpoolFile):
+            return stream.move_to(path)
+        file_storage.save(path)
+        return path
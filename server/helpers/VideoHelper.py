@@ -1,196 +1,334 @@
-import cv2
-import numpy as np
-import io
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Dict, Tuple
 import base64
 import tempfile
 import os
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+
+from helpers.FrameCacheHelper import FrameCacheHelper
+from helpers.FrameReaderHelper import Cv2FrameReader, PyAVFrameReader, scaled_size, av
+from helpers.FrameTimelineHelper import FrameTimeline, FrameTimelineHelper
+from helpers.LazyImportHelper import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+# Named encode profiles: fast previews for thumbnails, high quality for archiving.
+# Parameter names are cv2 constants, resolved on first encode so cv2 loads lazily
+ENCODE_PROFILES = {
+    'preview': {
+        'extension': '.jpg',
+        'mime_type': 'image/jpeg',
+        'params': [
+            'IMWRITE_JPEG_QUALITY', 80,
+            'IMWRITE_JPEG_OPTIMIZE', 0,  # Baseline Huffman tables
+            'IMWRITE_JPEG_PROGRESSIVE', 0,
+        ]
+    },
+    'preview_webp': {
+        'extension': '.webp',
+        'mime_type': 'image/webp',
+        'params': [
+            'IMWRITE_WEBP_QUALITY', 75,
+        ]
+    },
+    'archive': {
+        'extension': '.jpg',
+        'mime_type': 'image/jpeg',
+        'params': [
+            'IMWRITE_JPEG_QUALITY', 95,  # Higher quality (0-100)
+            'IMWRITE_JPEG_OPTIMIZE', 1,   # Enable optimization
+            'IMWRITE_JPEG_PROGRESSIVE', 1,  # Use progressive JPEG
+            'IMWRITE_JPEG_LUMA_QUALITY', 90,  # Luma quality
+            'IMWRITE_JPEG_CHROMA_QUALITY', 90,  # Chroma quality
+        ]
+    }
+}
+
+@lru_cache(maxsize=None)
+def get_encode_params(encode_profile: str) -> Tuple[int, ...]:
+    """cv2.imencode parameters of an encode profile"""
+    return tuple(getattr(cv2, param) if isinstance(param, str) else param
+                 for param in ENCODE_PROFILES[encode_profile]['params'])
+
+# Encoder pool shared by all requests; cv2.resize and cv2.imencode release the GIL
+ENCODER_WORKERS = min(8, os.cpu_count() or 1)
+# Decoded frames waiting for or being encoded, across all requests
+MAX_FRAMES_IN_FLIGHT = ENCODER_WORKERS * 2
+
+_encoder_pool = ThreadPoolExecutor(max_workers=ENCODER_WORKERS, thread_name_prefix='frame-encoder')
+_encoder_slots = threading.BoundedSemaphore(MAX_FRAMES_IN_FLIGHT)
+
+# 'auto' uses PyAV when it is installed and falls back to cv2
+PREVIEW_DECODERS = ('auto', 'pyav', 'cv2')
 
 class VideoHelper:
-    def __init__(self):
+    def __init__(self, store_dir: Optional[str] = None, frame_cache: Optional[FrameCacheHelper] = None,
+                 encode_profile: str = 'preview', preview_decoder: str = 'auto',
+                 frame_timelines: Optional[FrameTimelineHelper] = None):
+        if encode_profile not in ENCODE_PROFILES:
+            raise ValueError(f"Unknown encode profile: {encode_profile}")
+        if preview_decoder not in PREVIEW_DECODERS:
+            raise ValueError(f"Unknown preview decoder: {preview_decoder}")
+        
         self.supported_formats = ['.mp4', '.avi', '.mov', '.mkv']
+        self.store_dir = store_dir or os.path.join(tempfile.gettempdir(), 'video-geotagger', 'videos')
+        self.frame_cache = frame_cache
+        self.preview_max_width = 1280
+        self.encode_profile = encode_profile
+        # 'pyav' decodes straight to preview size, 'cv2' decodes full frames and resizes
+        self.preview_decoder = preview_decoder
+        # Exact frame timestamps and keyframes per video; None maps time to frames by the frame rate
+        self.frame_timelines = frame_timelines
+
+    def store_video(self, video_path: str, video_hash: Optional[str] = None) -> str:
+        """
+        Persist a video under its content hash so frames can be fetched later.
         
-    def _bytes_to_video(self, video_bytes: bytes) -> Optional[cv2.VideoCapture]:
-        """Convert bytes to VideoCapture object."""
-        try:
-            # Create a temporary file to store the video
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-                temp_file.write(video_bytes)
-                temp_path = temp_file.name
-            
-            # Create video capture object from the temporary file
-            video = cv2.VideoCapture(temp_path)
+        Args:
+            video_path (str): Path of the uploaded video
+            video_hash (Optional[str]): SHA-256 of the video if already known
             
-            # Delete the temporary file
-            os.unlink(temp_path)
+        Returns:
+            str: Video id (SHA-256 hex digest of the content)
+        """
+        video_id = video_hash or FrameCacheHelper.hash_file(video_path)
+        stored_path = self.get_stored_video_path(video_id)
+        
+        if not os.path.exists(stored_path):
+            os.makedirs(self.store_dir, exist_ok=True)
+            # Link (or copy) to a temporary name first so readers never see a partial file
+            temp_path = f"{stored_path}.{os.getpid()}.{threading.get_ident()}.part"
+            try:
+                os.link(video_path, temp_path)
+            except OSError:
+                shutil.copyfile(video_path, temp_path)
+            os.replace(temp_path, stored_path)
+            
+        return video_id
+    
+    def get_stored_video_path(self, video_id: str) -> str:
+        """Return the path of a stored video."""
+        return os.path.join(self.store_dir, f"{video_id}.mp4")
+    
+    def _preview_size(self, width: int, height: int) -> Tuple[int, int]:
+        """Return the output size of a preview frame."""
+        return scaled_size(width, height, self.preview_max_width)
+    
+    def _get_timeline(self, video_path: str, video_hash: Optional[str] = None) -> Optional[FrameTimeline]:
+        """Frame timeline of a video, None when no timeline helper is configured."""
+        if self.frame_timelines is None:
+            return None
+        return self.frame_timelines.get(video_path, video_hash)
+    
+    def _open_preview_reader(self, video_path: str, timeline: Optional[FrameTimeline] = None):
+        """
+        Open a frame reader for preview extraction.
+        
+        Args:
+            video_path (str): Video path
+            timeline (Optional[FrameTimeline]): Frame timeline of the video
             
-            if not video.isOpened():
-                return None
-                
-            return video
-        except Exception as e:
-            print(f"Error converting bytes to video: {str(e)}")
+        Returns:
+            PyAVFrameReader or Cv2FrameReader, None if the video can not be opened
+        """
+        if self.preview_decoder != 'cv2':
+            if av is not None:
+                try:
+                    return PyAVFrameReader(video_path, self.preview_max_width, timeline)
+                except Exception as e:
+                    print(f"Falling back to cv2 preview decode: {str(e)}")
+            elif self.preview_decoder == 'pyav':
+                print("PyAV is not installed, falling back to cv2 preview decode")
+        
+        video = cv2.VideoCapture(video_path)
+        if not video.isOpened():
             return None
+        
+        return Cv2FrameReader(video, timeline)
+    
+    def _resize_for_preview(self, frame: 'np.ndarray') -> 'np.ndarray':
+        """Downscale frame to the preview width, keeping the aspect ratio."""
+        height, width = frame.shape[:2]
+        new_width, new_height = self._preview_size(width, height)
+        if (new_width, new_height) != (width, height):
+            frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
+        return frame
     
-    def _frame_to_base64(self, frame: np.ndarray) -> Optional[str]:
+    def _frame_to_base64(self, frame: 'np.ndarray') -> Optional[str]:
         """Convert frame to base64 string with proper image data URI."""
+        buffer = self._encode_frame(frame)
+        if buffer is None:
+            return None
+        
+        return self._to_data_uri(buffer)
+    
+    def _to_data_uri(self, buffer: bytes) -> str:
+        """Convert encoded frame bytes to a base64 image data URI."""
+        base64_data = base64.b64encode(buffer).decode('utf-8')
+        return f"data:{self.get_mime_type()};base64,{base64_data}"
+    
+    def get_mime_type(self) -> str:
+        """Mime type of frames encoded with the current profile."""
+        return ENCODE_PROFILES[self.encode_profile]['mime_type']
+    
+    def _cache_key(self, video_hash: Optional[str], frame_number: int, output_size: Tuple[int, int]) -> Optional[str]:
+        """Frame cache key, or None when caching is disabled."""
+        if self.frame_cache is None or video_hash is None:
+            return None
+        return FrameCacheHelper.make_key(video_hash, frame_number, output_size, self.encode_profile)
+    
+    def _read_preview_frame(self, reader, frame_number: int, cache_key: Optional[str]) -> Optional[Future]:
+        """
+        Get an encoded preview frame, consulting the frame cache before decoding.
+        
+        Decoding happens on the calling thread; resizing and encoding run on the
+        shared encoder pool so the caller can move on to the next frame.
+        
+        Args:
+            reader: Frame reader from _open_preview_reader
+            frame_number (int): Frame to extract
+            cache_key (Optional[str]): Frame cache key, None to skip the cache
+            
+        Returns:
+            Optional[Future]: Future of the encoded frame, or None if the frame can not be read
+        """
+        if cache_key is not None:
+            encoded = self.frame_cache.get(cache_key)
+            if encoded is not None:
+                future = Future()
+                future.set_result(encoded)
+                return future
+        
+        frame = reader.read(frame_number)
+        if frame is None:
+            return None
+        
+        return self._submit_encode(frame, cache_key)
+    
+    def _submit_encode(self, frame: 'np.ndarray', cache_key: Optional[str]) -> Future:
+        """Queue a decoded frame on the encoder pool, blocking while the pool is full."""
+        # Back-pressure: at most MAX_FRAMES_IN_FLIGHT decoded frames are held at once
+        _encoder_slots.acquire()
         try:
-            # Convert BGR to RGB
-            # frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)        
-            # # Encode frame as JPEG
-            # _, buffer = cv2.imencode('.jpg', frame_rgb, [
-            #     cv2.IMWRITE_JPEG_QUALITY, 85,
-            #     cv2.IMWRITE_JPEG_OPTIMIZE, 1
-            # ])
-            # # Convert to base64 and add data URI prefix
-            # base64_data = base64.b64encode(buffer).decode('utf-8')
-            # base64_frame = f"data:image/jpeg;base64,{base64_data}"
-            
-            # Convert BGR to RGB
-            frame_rgb = frame
-            
-            # Encode frame as JPEG with better quality settings
-            encode_params = [
-                cv2.IMWRITE_JPEG_QUALITY, 95,  # Higher quality (0-100)
-                cv2.IMWRITE_JPEG_OPTIMIZE, 1,   # Enable optimization
-                cv2.IMWRITE_JPEG_PROGRESSIVE, 1,  # Use progressive JPEG
-                cv2.IMWRITE_JPEG_LUMA_QUALITY, 90,  # Luma quality
-                cv2.IMWRITE_JPEG_CHROMA_QUALITY, 90,  # Chroma quality
-            ]
-            
-            # First resize if the image is too large
-            height, width = frame_rgb.shape[:2]
-            # Define dimension thresholds with quality tiers
-            dimensions = {
-                '8K': 7680,  # 8K UHD: 7680x4320
-                '6K': 6144,  # 6K: 6144x3456
-                '5K': 5120,  # 5K: 5120x2880
-                '4K': 3840,  # 4K UHD: 3840x2160
-                '2K': 2560,  # 2K: 2560x1440
-                'FHD': 1920  # Full HD: 1920x1080
-            }
+            future = _encoder_pool.submit(self._encode_preview, frame, cache_key)
+        except Exception:
+            _encoder_slots.release()
+            raise
+        future.add_done_callback(lambda _: _encoder_slots.release())
+        return future
+    
+    def _encode_preview(self, frame: 'np.ndarray', cache_key: Optional[str]) -> Optional[bytes]:
+        """Resize and encode a decoded frame, storing the result in the frame cache."""
+        # Resize frame if it's too large
+        frame = self._resize_for_preview(frame)
+        
+        encoded = self._encode_frame(frame)
+        if encoded is not None and cache_key is not None:
+            self.frame_cache.put(cache_key, encoded)
+        
+        return encoded
+    
+    def _encode_frame(self, frame: 'np.ndarray') -> Optional[bytes]:
+        """Encode frame with the current encode profile."""
+        try:
+            profile = ENCODE_PROFILES[self.encode_profile]
             
-            # Choose appropriate max dimension based on input size
-            max_dimension = dimensions['5K']
+            # Frames are already downscaled by the callers, so encode as-is
+            success, buffer = cv2.imencode(profile['extension'], frame, get_encode_params(self.encode_profile))
+            if not success:
+                return None
             
-            # Only resize if the image exceeds the max dimension
-            if width > max_dimension or height > max_dimension:
-                if width > height:
-                    new_width = max_dimension
-                    new_height = int(height * (max_dimension / width))
-                else:
-                    new_height = max_dimension
-                    new_width = int(width * (max_dimension / height))
-                
-                frame_rgb = cv2.resize(
-                    frame_rgb, 
-                    (new_width, new_height), 
-                    interpolation=cv2.INTER_LANCZOS4
-                )
-                
-                # Adjust quality parameters for very large images
-                if max_dimension > dimensions['4K']:
-                    encode_params = [
-                        cv2.IMWRITE_JPEG_QUALITY, 90,  # Slightly lower quality for huge images
-                        cv2.IMWRITE_JPEG_OPTIMIZE, 1,
-                        cv2.IMWRITE_JPEG_PROGRESSIVE, 1,
-                        cv2.IMWRITE_JPEG_LUMA_QUALITY, 85,
-                        cv2.IMWRITE_JPEG_CHROMA_QUALITY, 85,
-                    ]
-            
-            # Encode with optimized parameters
-            _, buffer = cv2.imencode('.jpg', frame_rgb, encode_params)
-            
-            # Convert to base64 and add data URI prefix
-            base64_data = base64.b64encode(buffer).decode('utf-8')
-            base64_frame = f"data:image/jpeg;base64,{base64_data}"
-            
-            return base64_frame
+            return buffer.tobytes()
         except Exception as e:
-            print(f"Error converting frame to base64: {str(e)}")
+            print(f"Error encoding frame: {str(e)}")
             return None
 
-    def split_video_to_frames(self, video_bytes: bytes, max_frames: int = 30, frame_interval: int = 1) -> List[str]:
+    def split_video_to_frames(self, video_path: str, max_frames: int = 30, frame_interval: int = 1,
+                              video_hash: Optional[str] = None) -> List[str]:
         """
         Split video into frames and return them as base64 encoded strings.
         
         Args:
-            video_bytes (bytes): Video file in bytes
+            video_path (str): Video path
             max_frames (int): Maximum number of frames to extract
             frame_interval (int): Interval between frames to extract
+            video_hash (Optional[str]): SHA-256 of the video if already known
             
         Returns:
             List[str]: List of base64 encoded frames with data URI prefix
         """
         try:
-            # Convert bytes to video
-            video = self._bytes_to_video(video_bytes)
-            if video is None:
+            # Frames already encoded for this video are served from the cache
+            if (self.frame_cache or self.frame_timelines) and video_hash is None:
+                video_hash = FrameCacheHelper.hash_file(video_path)
+            reader = self._open_preview_reader(video_path, self._get_timeline(video_path, video_hash))
+            if reader is None:
                 return []
             
-            # Get total frame count
-            total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            try:
+                # Get total frame count
+                total_frames = reader.frame_count
             
-            # Calculate optimal frame interval if total frames is less than desired
-            if total_frames < max_frames:
-                frame_interval = 1
-            else:
-                # Adjust frame interval to get better distribution
-                frame_interval = max(1, total_frames // max_frames)
+                # Calculate optimal frame interval if total frames is less than desired
+                if total_frames < max_frames:
+                    frame_interval = 1
+                else:
+                    # Adjust frame interval to get better distribution
+                    frame_interval = max(1, total_frames // max_frames)
             
-            frames = []
-            frame_count = 0
+                output_size = self._preview_size(reader.width, reader.height)
             
-            while frame_count < total_frames:
-                # Set frame position
-                video.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
-                
-                # Read frame
-                success, frame = video.read()
-                
-                if not success:
-                    break
+                futures = []
+                frame_count = 0
+            
+                while frame_count < total_frames:
+                    cache_key = self._cache_key(video_hash, frame_count, output_size)
+                    future = self._read_preview_frame(reader, frame_count, cache_key)
                 
-                # Resize frame if it's too large
-                height, width = frame.shape[:2]
-                if width > 1280:  # Max width threshold
-                    scale = 1280 / width
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
+                    if future is None:
+                        break
                 
-                # Convert frame to base64
-                base64_frame = self._frame_to_base64(frame)
+                    futures.append(future)
                 
-                if base64_frame:
-                    frames.append(base64_frame)
-                    
                     # Check if we've reached max frames
-                    if len(frames) >= max_frames:
+                    if len(futures) >= max_frames:
                         break
                 
-                # Move to next frame position
-                frame_count += frame_interval
-            
-            # Release video capture
-            video.release()
-            
-            return frames
+                    # Move to next frame position
+                    frame_count += frame_interval
+            
+                # Collect in submission order; convert frames to base64
+                frames = []
+                for future in futures:
+                    encoded = future.result()
+                    if encoded is not None:
+                        frames.append(self._to_data_uri(encoded))
+                return frames
+            finally:
+                # Release video capture, also when a read or an encode fails
+                reader.release()
             
         except Exception as e:
             print(f"Error splitting video to frames: {str(e)}")
             return []
 
-    def get_video_metadata(self, video_bytes: bytes) -> dict:
+    def get_video_metadata(self, video_path: str) -> dict:
         """
         Get video metadata.
         
+        Args:
+            video_path (str): Video path
+            
         Returns:
             dict: Dictionary containing video metadata
         """
         try:
-            video = self._bytes_to_video(video_bytes)
-            if video is None:
+            video = cv2.VideoCapture(video_path)
+            if not video.isOpened():
                 return {}
             
             # Get video properties
@@ -199,6 +337,7 @@ class VideoHelper:
             width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
             height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
             duration = frame_count / fps if fps > 0 else 0
+            codec = self._get_codec_info(video)
             
             # Release video capture
             video.release()
@@ -210,29 +349,49 @@ class VideoHelper:
                 'height': height,
                 'duration': round(duration, 2),
                 'duration_formatted': self._format_duration(duration),
-                'codec': self._get_codec_info(video_bytes)
+                'codec': codec
             }
             
         except Exception as e:
             print(f"Error getting video metadata: {str(e)}")
             return {}
             
-    def _get_codec_info(self, video_bytes: bytes) -> str:
+    def _get_codec_info(self, video: 'cv2.VideoCapture') -> str:
         """Get video codec information."""
         try:
-            video = self._bytes_to_video(video_bytes)
-            if video is None:
-                return "unknown"
-            
             # Get the codec value
             fourcc = int(video.get(cv2.CAP_PROP_FOURCC))
             codec = chr(fourcc & 0xFF) + chr((fourcc >> 8) & 0xFF) + chr((fourcc >> 16) & 0xFF) + chr((fourcc >> 24) & 0xFF)
             
-            video.release()
             return codec.strip()
         except:
             return "unknown"
             
+    def estimate_peak_memory(self, metadata: dict, output_frames: int = 0, inline: bool = False) -> int:
+        """
+        Rough peak memory of a frame extraction job, for admission control.
+        
+        Args:
+            metadata (dict): Result of get_video_metadata
+            output_frames (int): Frames returned in the response
+            inline (bool): Frames are returned as base64 data URIs
+            
+        Returns:
+            int: Estimated bytes
+        """
+        width = metadata.get('width', 0)
+        height = metadata.get('height', 0)
+        
+        # Full resolution BGR frames held by the decoder and the encoder queue
+        decoded = width * height * 3 * (MAX_FRAMES_IN_FLIGHT + 2)
+        if not inline:
+            return decoded
+        
+        # Encoded previews (about a tenth of the raw size), their base64 text and the JSON copy
+        preview_width, preview_height = self._preview_size(width, height)
+        encoded = preview_width * preview_height * 3 // 10
+        return decoded + output_frames * encoded * 4 // 3 * 2
+    
     def _format_duration(self, duration: float) -> str:
         """Format duration in seconds to HH:MM:SS format."""
         hours = int(duration // 3600)
@@ -244,61 +403,223 @@ class VideoHelper:
         else:
             return f"{minutes:02d}:{seconds:02d}"
         
-    def extract_frames_at_timestamps(self, video_bytes: bytes, timestamps: List[float]) -> List[str]:
+    def extract_frames_at_timestamps(self, video_path: str, timestamps: List[float],
+                                     video_hash: Optional[str] = None) -> List[str]:
         """
         Extract frames at specific timestamps from video.
         
         Args:
-            video_bytes (bytes): Video file in bytes
+            video_path (str): Video path
             timestamps (List[float]): List of timestamps in seconds
+            video_hash (Optional[str]): SHA-256 of the video if already known
             
         Returns:
             List[str]: List of base64 encoded frames with data URI prefix
         """
         try:
-            # Convert bytes to video
-            video = self._bytes_to_video(video_bytes)
-            if video is None:
-                return []
+            return list(self.iter_frames_at_timestamps(video_path, timestamps, video_hash))
             
+        except Exception as e:
+            print(f"Error extracting frames at timestamps: {str(e)}")
+            return []
+    
+    def iter_frames_at_timestamps(self, video_path: str, timestamps: Iterable[float],
+                                  video_hash: Optional[str] = None) -> Iterator[Optional[str]]:
+        """
+        Extract frames at timestamps, yielding each one as soon as it is encoded.
+        
+        One reader walks the video; with timestamps in ascending order it only decodes forward
+        (seeking across keyframes). At most MAX_FRAMES_IN_FLIGHT frames are pending at a time,
+        so memory does not grow with the number of timestamps or the video duration.
+        
+        Args:
+            video_path (str): Video path
+            timestamps (Iterable[float]): Timestamps in seconds, consumed lazily
+            video_hash (Optional[str]): SHA-256 of the video if already known
+            
+        Yields:
+            Optional[str]: Base64 encoded frame with data URI prefix per timestamp, None where no
+                frame could be read; nothing if the video can not be opened
+        """
+        # Frames already encoded for this video are served from the cache
+        if (self.frame_cache or self.frame_timelines) and video_hash is None:
+            video_hash = FrameCacheHelper.hash_file(video_path)
+        timeline = self._get_timeline(video_path, video_hash)
+        reader = self._open_preview_reader(video_path, timeline)
+        if reader is None:
+            return
+        
+        try:
             # Get video properties
-            fps = video.get(cv2.CAP_PROP_FPS)
-            if fps <= 0:
-                return []
-                
-            frames = []
+            fps = reader.fps
+            if fps <= 0 and timeline is None:
+                return
+            
+            output_size = self._preview_size(reader.width, reader.height)
+            
+            pending = deque()
+            last_frame_number, last_future = None, None
             
             for timestamp in timestamps:
-                # Convert timestamp to frame number
-                frame_number = int(timestamp * fps)
-                
-                # Set frame position
-                video.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-                
-                # Read frame
-                success, frame = video.read()
+                # Convert timestamp to frame number: the frame on screen at that time
+                frame_number = timeline.frame_at(timestamp) if timeline is not None else int(timestamp * fps)
                 
-                if not success:
-                    frames.append(None)
-                    continue
-                
-                # Resize frame if it's too large
-                height, width = frame.shape[:2]
-                if width > 1280:  # Max width threshold
-                    scale = 1280 / width
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
+                if frame_number == last_frame_number:
+                    # Timestamps closer than a frame share it
+                    future = last_future
+                else:
+                    cache_key = self._cache_key(video_hash, frame_number, output_size)
+                    future = self._read_preview_frame(reader, frame_number, cache_key)
+                    last_frame_number, last_future = frame_number, future
+                pending.append(future)
                 
-                # Convert frame to base64
-                base64_frame = self._frame_to_base64(frame)
-                frames.append(base64_frame)
+                # Hand back finished frames in timestamp order; wait for the oldest once the pipeline is full
+                while pending and (len(pending) > MAX_FRAMES_IN_FLIGHT or pending[0] is None or pending[0].done()):
+                    yield self._result_to_data_uri(pending.popleft())
             
+            while pending:
+                yield self._result_to_data_uri(pending.popleft())
+                
+        finally:
             # Release video capture
-            video.release()
+            reader.release()
+    
+    def _result_to_data_uri(self, future: Optional[Future]) -> Optional[str]:
+        """Data URI of an encode future, None for a frame that could not be read."""
+        encoded = future.result() if future is not None else None
+        return self._to_data_uri(encoded) if encoded is not None else None
+
+    def _stored_video_timeline(self, video_id: str) -> Optional[FrameTimeline]:
+        """Frame timeline of a stored video by id, from its frame rate without a timeline helper."""
+        video_path = self.get_stored_video_path(video_id)
+        if not os.path.exists(video_path):
+            return None
+        
+        # Stored videos are named by their content hash
+        timeline = self._get_timeline(video_path, video_id)
+        if timeline is not None:
+            return timeline
+        
+        video = cv2.VideoCapture(video_path)
+        if not video.isOpened():
+            return None
+        fps = video.get(cv2.CAP_PROP_FPS)
+        total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        video.release()
+        
+        if fps <= 0:
+            return None
+        return FrameTimeline.constant_rate(fps, total_frames)
+    
+    def describe_split_frames(self, video_id: str, max_frames: int = 30, frame_interval: int = 1) -> List[Dict]:
+        """
+        Pick the same frames as split_video_to_frames without decoding them.
+        
+        Args:
+            video_id (str): Id returned by store_video
+            max_frames (int): Maximum number of frames to extract
+            frame_interval (int): Interval between frames to extract
             
-            return frames
+        Returns:
+            List[Dict]: Frame descriptors with frame_number and timestamp
+        """
+        timeline = self._stored_video_timeline(video_id)
+        if timeline is None:
+            return []
+        
+        total_frames = timeline.frame_count
+        
+        # Same distribution as split_video_to_frames
+        if total_frames < max_frames:
+            frame_interval = 1
+        else:
+            frame_interval = max(1, total_frames // max_frames)
+        
+        frame_numbers = list(range(0, total_frames, frame_interval))[:max_frames]
+        return [
+            {
+                'frame_number': frame_number,
+                'timestamp': timeline.time_of(frame_number)
+            }
+            for frame_number in frame_numbers
+        ]
+    
+    def describe_frames_at_timestamps(self, video_id: str, timestamps: List[float]) -> List[Optional[Dict]]:
+        """
+        Resolve timestamps to frame numbers without decoding any frame.
+        
+        Args:
+            video_id (str): Id returned by store_video
+            timestamps (List[float]): List of timestamps in seconds
             
-        except Exception as e:
-            print(f"Error extracting frames at timestamps: {str(e)}")
-            return []
\ No newline at end of file
+        Returns:
+            List[Optional[Dict]]: Frame descriptors, None for timestamps outside the video
+        """
+        return list(self.iter_describe_frames_at_timestamps(video_id, timestamps))
+    
+    def iter_describe_frames_at_timestamps(self, video_id: str, timestamps: Iterable[float]) -> Iterator[Optional[Dict]]:
+        """
+        describe_frames_at_timestamps for timestamps consumed lazily.
+        
+        Args:
+            video_id (str): Id returned by store_video
+            timestamps (Iterable[float]): Timestamps in seconds
+            
+        Yields:
+            Optional[Dict]: Frame descriptor per timestamp, None outside the video; nothing if the video can not be read
+        """
+        timeline = self._stored_video_timeline(video_id)
+        if timeline is None or timeline.frame_count == 0:
+            return
+        
+        for timestamp in timestamps:
+            # Convert timestamp to frame number: the frame on screen at that time
+            frame_number = timeline.frame_at(timestamp)
+            if frame_number < 0 or timestamp >= timeline.duration:
+                yield None
+                continue
+            yield {'frame_number': frame_number}
+    
+    def get_encoded_frame(self, video_id: str, frame_number: int) -> Optional[bytes]:
+        """
+        Decode and encode a single preview frame, using the frame cache.
+        
+        Args:
+            video_id (str): Id returned by store_video
+            frame_number (int): Frame to extract
+            
+        Returns:
+            Optional[bytes]: Encoded frame, or None if the frame can not be read
+        """
+        video_path = self.get_stored_video_path(video_id)
+        if not os.path.exists(video_path):
+            return None
+        
+        # Stored videos are named by their content hash. The timeline knows the frame size, so a
+        # cached frame is returned without opening the container
+        timeline = self._get_timeline(video_path, video_id)
+        checked_key = None
+        if timeline is not None and timeline.width > 0 and timeline.height > 0:
+            checked_key = self._cache_key(video_id, frame_number, self._preview_size(timeline.width, timeline.height))
+            if checked_key is not None:
+                encoded = self.frame_cache.get(checked_key)
+                if encoded is not None:
+                    return encoded
+        
+        reader = self._open_preview_reader(video_path, timeline)
+        if reader is None:
+            return None
+        
+        try:
+            output_size = self._preview_size(reader.width, reader.height)
+            cache_key = self._cache_key(video_id, frame_number, output_size)
+            if cache_key is not None and cache_key == checked_key:
+                # Already a miss; decode without asking the cache again
+                frame = reader.read(frame_number)
+                future = self._submit_encode(frame, cache_key) if frame is not None else None
+            else:
+                future = self._read_preview_frame(reader, frame_number, cache_key)
+        finally:
+            reader.release()
+        
+        return future.result() if future is not None else None